@@ -1,12 +1,20 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, jsonify, render_template, request
 
+from .spotify_cache import CachedSpotifyClient, create_response_cache
 from .spotify_client import create_spotify_client
+from .spotify_harvest import build_full_history_taste_profile
 from .taste_profile import build_taste_profile
 
 
 def create_app():
     app = Flask(__name__)
 
+    # Shared across requests: raw Spotify payloads, keyed per user
+    spotify_cache = create_response_cache()
+
+    def cached_spotify_client():
+        return CachedSpotifyClient(create_spotify_client(), spotify_cache)
+
     @app.get("/")
     def home():
         return render_template("index.html")
@@ -15,9 +23,13 @@ def create_app():
     def health_check():
         return jsonify({"status": "ok", "service": "music-soulmate-backend"})
 
+    @app.get("/cache-stats")
+    def get_cache_stats():
+        return jsonify({"spotify_cache": spotify_cache.stats()})
+
     @app.get("/me")
     def get_me():
-        sp = create_spotify_client()
+        sp = cached_spotify_client()
         user = sp.current_user()
 
         images = user.get("images") or []
@@ -35,7 +47,7 @@ def create_app():
 
     @app.get("/top-artists")
     def get_top_artists():
-        sp = create_spotify_client()
+        sp = cached_spotify_client()
         results = sp.current_user_top_artists(
             limit=10,
             time_range="short_term"  # last ~4 weeks
@@ -59,7 +71,7 @@ def create_app():
 
     @app.get("/top-tracks")
     def get_top_tracks():
-        sp = create_spotify_client()
+        sp = cached_spotify_client()
         results = sp.current_user_top_tracks(
             limit=10,
             time_range="short_term"
@@ -80,8 +92,12 @@ def create_app():
 
     @app.get("/taste-profile")
     def get_taste_profile():
-        sp = create_spotify_client()
-        taste_profile = build_taste_profile(sp)
+        sp = cached_spotify_client()
+        if request.args.get("history") == "full":
+            # Every page, short/medium/long term (more requests, richer profile)
+            taste_profile = build_full_history_taste_profile(sp)
+        else:
+            taste_profile = build_taste_profile(sp)
         return jsonify({"taste_profile": taste_profile})
 
     return app
@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Spotify returns at most 50 items per top-artists/top-tracks page.
+# We always fetch the full first page and slice, so /top-artists (limit=10)
+# and /taste-profile (limit=20) can share one cached payload.
+SPOTIFY_PAGE_LIMIT = 50
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class SQLiteCacheStore:
+    """
+    Optional persistent layer for ResponseCache.
+
+    Survives Flask restarts (debug reloader!) so a fresh process doesn't have
+    to burn Spotify quota re-fetching data we already have on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spotify_cache ("
+            " key TEXT PRIMARY KEY,"
+            " stored_at REAL NOT NULL,"
+            " value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at, value FROM spotify_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, stored_at: float, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spotify_cache (key, stored_at, value) VALUES (?, ?, ?)",
+                (key, stored_at, json.dumps(value)),
+            )
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LRU with TTL + stale-while-revalidate.
+
+    - fresh   (age <= ttl):                  served from cache
+    - stale   (ttl < age <= ttl + stale_ttl): served from cache, refreshed in background
+    - expired (age > ttl + stale_ttl):       loaded synchronously
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0,
+        stale_ttl_seconds: float = 86400.0,
+        store: Optional[SQLiteCacheStore] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "store_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    def _put_locked(self, key: str, stored_at: float, value: Any) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.store is None:
+            return None
+
+        entry = self.store.get(key)
+        if entry is not None:
+            with self._lock:
+                self._stats["store_hits"] += 1
+                self._put_locked(key, entry[0], entry[1])
+        return entry
+
+    def _load(self, key: str, loader: Callable[[], Any]) -> Any:
+        value = loader()
+        stored_at = self._clock()
+        with self._lock:
+            self._put_locked(key, stored_at, value)
+        if self.store is not None:
+            self.store.set(key, stored_at, value)
+        return value
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+
+        def run():
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                # Keep serving the stale value; the next request will try again.
+                print(f"Spotify cache refresh failed for {key}: {e}")
+                with self._lock:
+                    self._stats["refresh_errors"] += 1
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        entry = self._lookup(key)
+        now = self._clock()
+
+        if entry is not None:
+            stored_at, value = entry
+            age = now - stored_at
+            if age <= self.ttl_seconds:
+                with self._lock:
+                    self._stats["hits"] += 1
+                return value
+            if age <= self.ttl_seconds + self.stale_ttl_seconds:
+                with self._lock:
+                    self._stats["stale_hits"] += 1
+                self._refresh_in_background(key, loader)
+                return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return self._load(key, loader)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["stale_hits"] + out["misses"]
+        out["hit_rate"] = round((out["hits"] + out["stale_hits"]) / lookups, 4) if lookups else 0.0
+        out["ttl_seconds"] = self.ttl_seconds
+        out["stale_ttl_seconds"] = self.stale_ttl_seconds
+        out["persistent"] = self.store is not None
+        return out
+
+
+def _page_url(url: Optional[str], limit: int, offset: int) -> Optional[str]:
+    """url with its limit/offset query params replaced (None if there's no url)."""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(limit=str(limit), offset=str(offset))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _user_cache_scope(sp) -> Optional[str]:
+    """
+    Per-user cache namespace, derived from the OAuth token so we can key /me
+    itself without calling Spotify first.
+
+    The refresh token is stable across hourly access-token refreshes. None
+    when there's no cached token: every payload here is user-specific, so
+    without a per-user scope nothing is cached.
+    """
+    token_info = None
+    auth_manager = getattr(sp, "auth_manager", None)
+    if auth_manager is not None and hasattr(auth_manager, "get_cached_token"):
+        try:
+            token_info = auth_manager.get_cached_token()
+        except Exception:
+            token_info = None
+
+    secret = ""
+    if isinstance(token_info, dict):
+        secret = token_info.get("refresh_token") or token_info.get("access_token") or ""
+    if not secret:
+        return None
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+class CachedSpotifyClient:
+    """
+    Drop-in wrapper for the handful of spotipy calls this app uses.
+
+    Raw Spotify payloads are cached per user, so every route (and
+    build_taste_profile, which just takes an 'sp') reads the same data.
+    Clients without a cached OAuth token go straight to Spotify.
+    """
+
+    def __init__(self, sp, cache: ResponseCache):
+        self._sp = sp
+        self._cache = cache
+        self._scope = _user_cache_scope(sp)
+
+    def _get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        if self._scope is None:
+            return loader()
+        return self._cache.get_or_load(f"{self._scope}:{key}", loader)
+
+    def current_user(self) -> Dict[str, Any]:
+        return self._get_or_load("me", self._sp.current_user)
+
+    def _top(self, kind: str, limit: int, offset: int, time_range: str) -> Dict[str, Any]:
+        fetch = getattr(self._sp, f"current_user_top_{kind}")
+
+        # Anything past the first page is rare; don't cache it.
+        if offset or limit > SPOTIFY_PAGE_LIMIT:
+            return fetch(limit=limit, offset=offset, time_range=time_range)
+
+        page = self._get_or_load(
+            f"top_{kind}:{time_range}",
+            lambda: fetch(limit=SPOTIFY_PAGE_LIMIT, offset=0, time_range=time_range),
+        )
+
+        items = page.get("items") or []
+        sliced = dict(page)
+        sliced["items"] = items[:limit]
+        sliced["limit"] = limit
+        sliced["offset"] = 0
+        # total is the whole list on Spotify's side, not this page
+        sliced["total"] = page.get("total", len(items))
+        sliced["next"] = None
+        if sliced["total"] > limit:
+            sliced["next"] = _page_url(page.get("href") or page.get("next"), limit, limit)
+        sliced["previous"] = None
+        return sliced
+
+    def current_user_top_artists(
+        self, limit: int = 20, offset: int = 0, time_range: str = "medium_term"
+    ) -> Dict[str, Any]:
+        return self._top("artists", limit, offset, time_range)
+
+    def current_user_top_tracks(
+        self, limit: int = 20, offset: int = 0, time_range: str = "medium_term"
+    ) -> Dict[str, Any]:
+        return self._top("tracks", limit, offset, time_range)
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    Build the app-wide cache from env vars:
+      SPOTIFY_CACHE_TTL_SECONDS        (default 3600)
+      SPOTIFY_CACHE_STALE_TTL_SECONDS  (default 86400 - top data changes ~daily)
+      SPOTIFY_CACHE_MAX_ENTRIES        (default 256)
+      SPOTIFY_CACHE_PATH               (optional SQLite file for persistence)
+    """
+    path = os.environ.get("SPOTIFY_CACHE_PATH")
+    return ResponseCache(
+        max_entries=int(_env_float("SPOTIFY_CACHE_MAX_ENTRIES", 256)),
+        ttl_seconds=_env_float("SPOTIFY_CACHE_TTL_SECONDS", 3600.0),
+        stale_ttl_seconds=_env_float("SPOTIFY_CACHE_STALE_TTL_SECONDS", 86400.0),
+        store=SQLiteCacheStore(path) if path else None,
+    )
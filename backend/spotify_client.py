@@ -1,8 +1,10 @@
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 
-def create_spotify_client():
+def create_spotify_client(cache_path=None, open_browser=True):
     return spotipy.Spotify(auth_manager=SpotifyOAuth(
         scope="user-top-read",
-        redirect_uri="http://127.0.0.1:3000/callback"
+        redirect_uri="http://127.0.0.1:3000/callback",
+        cache_path=cache_path,
+        open_browser=open_browser,
     ))
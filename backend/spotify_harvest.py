@@ -0,0 +1,222 @@
+"""
+Full-history Spotify harvesting.
+
+build_taste_profile only looks at the first 20 medium-term items. This pulls
+every page (50 per page) of top artists + top tracks for short/medium/long
+term in parallel, with bounded concurrency and 429 backoff, then dedupes
+across time ranges and feeds the result into the normal profile builder.
+
+Run against the local stub (no OAuth needed):
+    python -m backend.spotify_harvest --stub
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .taste_profile import build_taste_profile_from_items
+
+TIME_RANGES = ("short_term", "medium_term", "long_term")
+PAGE_SIZE = 50
+KINDS = ("artists", "tracks")
+# favorite_artists / sample_tracks kept from a full harvest (quick profile: 5)
+FULL_HISTORY_FAVORITES = 50
+
+
+def retry_after_seconds(exc: Exception, attempt: int, base_delay: float) -> Optional[float]:
+    """
+    How long to wait before retrying, or None if the error isn't retryable.
+
+    Works with spotipy.SpotifyException (http_status + headers) without
+    importing spotipy, so the stub and tests don't need it.
+    """
+    status = getattr(exc, "http_status", None)
+    if status == 429:
+        headers = getattr(exc, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After") or headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return base_delay * (2 ** attempt)
+    if isinstance(status, int) and status >= 500:
+        return base_delay * (2 ** attempt)
+    return None
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+
+    def request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def retry(self, delay: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+
+
+def _fetch_page(
+    sp,
+    kind: str,
+    time_range: str,
+    offset: int,
+    counters: _Counters,
+    max_retries: int,
+    base_delay: float,
+    sleep: Callable[[float], None],
+) -> Dict[str, Any]:
+    fetch = getattr(sp, f"current_user_top_{kind}")
+    attempt = 0
+    while True:
+        counters.request()
+        try:
+            return fetch(limit=PAGE_SIZE, offset=offset, time_range=time_range)
+        except Exception as e:
+            delay = retry_after_seconds(e, attempt, base_delay)
+            if delay is None or attempt >= max_retries:
+                raise
+            counters.retry(delay)
+            sleep(delay)
+            attempt += 1
+
+
+def _dedupe(pages_by_range: Dict[str, List[Dict[str, Any]]], time_ranges) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Merge ranges in the order given (short -> medium -> long by default),
+    keeping each item's first (most recent) position. Items are keyed by
+    Spotify id, falling back to name.
+    """
+    seen: Dict[str, Dict[str, Any]] = {}
+    per_range: Dict[str, int] = {}
+
+    for tr in time_ranges:
+        items = pages_by_range.get(tr) or []
+        per_range[tr] = len(items)
+        for it in items:
+            key = it.get("id") or it.get("name")
+            if not key:
+                continue
+            if key not in seen:
+                seen[key] = dict(it, time_ranges=[tr])
+            elif tr not in seen[key]["time_ranges"]:
+                seen[key]["time_ranges"].append(tr)
+
+    return list(seen.values()), per_range
+
+
+def harvest_top_items(
+    sp,
+    time_ranges=TIME_RANGES,
+    max_workers: int = 4,
+    max_retries: int = 5,
+    base_delay: float = 0.5,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Any]:
+    """
+    Returns:
+      {
+        "artists": [...],   # deduped Spotify artist objects (+ "time_ranges")
+        "tracks":  [...],   # deduped Spotify track objects (+ "time_ranges")
+        "per_range": {"artists": {...}, "tracks": {...}},  # items before dedupe
+        "stats": {"requests", "retries", "backoff_seconds", "wall_time_ms"},
+      }
+    """
+    started = time.perf_counter()
+    counters = _Counters()
+    pages: Dict[Tuple[str, str], Dict[int, List[Dict[str, Any]]]] = {}
+
+    def fetch(kind: str, tr: str, offset: int) -> Dict[str, Any]:
+        return _fetch_page(sp, kind, tr, offset, counters, max_retries, base_delay, sleep)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        # Pass 1: first page of every (kind, range) tells us the totals
+        first = {
+            (kind, tr): pool.submit(fetch, kind, tr, 0)
+            for kind in KINDS
+            for tr in time_ranges
+        }
+
+        rest = []
+        for key, fut in first.items():
+            page = fut.result()
+            pages[key] = {0: page.get("items") or []}
+            total = int(page.get("total") or 0)
+            for offset in range(PAGE_SIZE, total, PAGE_SIZE):
+                rest.append((key, offset, pool.submit(fetch, key[0], key[1], offset)))
+
+        # Pass 2: every remaining page, all in flight together
+        for key, offset, fut in rest:
+            pages[key][offset] = fut.result().get("items") or []
+
+    result: Dict[str, Any] = {"per_range": {}}
+    for kind in KINDS:
+        by_range = {
+            tr: [it for off in sorted(pages[(kind, tr)]) for it in pages[(kind, tr)][off]]
+            for tr in time_ranges
+        }
+        result[kind], result["per_range"][kind] = _dedupe(by_range, time_ranges)
+
+    result["stats"] = {
+        "requests": counters.requests,
+        "retries": counters.retries,
+        "backoff_seconds": round(counters.backoff_seconds, 3),
+        "wall_time_ms": round((time.perf_counter() - started) * 1000.0, 2),
+    }
+    return result
+
+
+def build_full_history_taste_profile(sp, **harvest_kwargs) -> Dict[str, Any]:
+    """
+    Harvest every page for every time range, then build the usual profile
+    with up to FULL_HISTORY_FAVORITES favorite artists and sample tracks.
+    """
+    harvest = harvest_top_items(sp, **harvest_kwargs)
+    profile = build_taste_profile_from_items(
+        harvest["artists"], harvest["tracks"], favorites_limit=FULL_HISTORY_FAVORITES
+    )
+    profile["harvest_stats"] = dict(
+        harvest["stats"],
+        artists=len(harvest["artists"]),
+        tracks=len(harvest["tracks"]),
+    )
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Harvest full Spotify top-item history.")
+    parser.add_argument("--stub", action="store_true", help="use the local Spotify stub")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub per-request latency")
+    parser.add_argument("--items", type=int, default=300, help="stub items per time range")
+    args = parser.parse_args()
+
+    if args.stub:
+        from .spotify_stub import StubSpotify
+
+        sp = StubSpotify(items_per_range=args.items, latency_seconds=args.latency_ms / 1000.0)
+    else:
+        from .spotify_client import create_spotify_client
+
+        sp = create_spotify_client()
+
+    harvest = harvest_top_items(sp, max_workers=args.workers)
+    print(json.dumps(
+        {
+            "artists": len(harvest["artists"]),
+            "tracks": len(harvest["tracks"]),
+            "per_range": harvest["per_range"],
+            "stats": harvest["stats"],
+        },
+        indent=2,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Local stand-in for the slice of the Spotify Web API this app uses.
+
+Mimics spotipy's method names and paging shape (items/total/limit/offset),
+so harvesting, caching and sync code can be exercised without OAuth or quota:
+- optional per-request latency
+- optional injected 429s with a Retry-After header (like SpotifyException)
+- request counters
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+TIME_RANGES = ("short_term", "medium_term", "long_term")
+
+_GENRES = [
+    "pop", "k-pop", "r&b", "indie pop", "bedroom pop", "art pop", "hip hop",
+    "k-rap", "alt z", "dance pop", "rock", "indie rock", "edm", "soul", "jazz",
+]
+
+
+class StubRateLimited(Exception):
+    """Shaped like spotipy.SpotifyException for a 429."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"http status: 429, retry after {retry_after}s")
+        self.http_status = 429
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+def _fake_artist(n: int) -> Dict[str, Any]:
+    rng = random.Random(n)
+    return {
+        "id": f"artist{n}",
+        "name": f"Artist {n}",
+        "genres": rng.sample(_GENRES, k=rng.randint(1, 3)),
+        "images": [],
+    }
+
+
+def _fake_track(n: int, artist: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": f"track{n}",
+        "name": f"Song {n}",
+        "artists": [{"id": artist["id"], "name": artist["name"]}],
+        "external_urls": {"spotify": f"https://open.spotify.com/track/track{n}"},
+        "preview_url": None,
+    }
+
+
+class StubSpotify:
+    """
+    Deterministic fake listening history for one user.
+
+    Each time range is a window over a shared catalog, so ranges overlap the
+    way real short/medium/long-term data does (good for testing dedup).
+    """
+
+    def __init__(
+        self,
+        user_id: str = "stub-user",
+        items_per_range: int = 120,
+        latency_seconds: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after_seconds: float = 0.01,
+        seed: int = 0,
+    ):
+        self.user_id = user_id
+        self.latency_seconds = latency_seconds
+        self.rate_limit_every = rate_limit_every
+        self.retry_after_seconds = retry_after_seconds
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+
+        offsets = {"short_term": 0, "medium_term": items_per_range // 3, "long_term": items_per_range // 2}
+        self._artists: Dict[str, List[Dict[str, Any]]] = {}
+        self._tracks: Dict[str, List[Dict[str, Any]]] = {}
+        for tr in TIME_RANGES:
+            start = seed + offsets[tr]
+            artists = [_fake_artist(n) for n in range(start, start + items_per_range)]
+            self._artists[tr] = artists
+            self._tracks[tr] = [
+                _fake_track(n, artists[i % len(artists)])
+                for i, n in enumerate(range(start, start + items_per_range))
+            ]
+
+    def _request(self) -> None:
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            with self._lock:
+                self.rate_limited += 1
+            raise StubRateLimited(self.retry_after_seconds)
+
+    @staticmethod
+    def _page(items: List[Dict[str, Any]], limit: int, offset: int) -> Dict[str, Any]:
+        limit = max(1, min(int(limit), 50))
+        return {
+            "items": items[offset:offset + limit],
+            "total": len(items),
+            "limit": limit,
+            "offset": offset,
+        }
+
+    def current_user(self) -> Dict[str, Any]:
+        self._request()
+        return {
+            "id": self.user_id,
+            "display_name": self.user_id,
+            "external_urls": {"spotify": f"https://open.spotify.com/user/{self.user_id}"},
+            "images": [],
+            "followers": {"total": 0},
+        }
+
+    def current_user_top_artists(
+        self, limit: int = 20, offset: int = 0, time_range: str = "medium_term"
+    ) -> Dict[str, Any]:
+        self._request()
+        return self._page(self._artists[time_range], limit, offset)
+
+    def current_user_top_tracks(
+        self, limit: int = 20, offset: int = 0, time_range: str = "medium_term"
+    ) -> Dict[str, Any]:
+        self._request()
+        return self._page(self._tracks[time_range], limit, offset)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited}
@@ -0,0 +1,319 @@
+"""
+Background Spotify sync: keeps stored profiles fresh without anyone
+re-running save_taste_profile_locally.py or re-POSTing /taste-profile.
+
+Each run walks the profile store (the Lambda's, lambda/storage.py) for users
+last synced - or, if never synced, last updated - more than
+SPOTIFY_SYNC_MAX_AGE_HOURS ago, fetches their Spotify data with bounded
+concurrency, rebuilds the profile through build_taste_profile and writes
+back only profiles whose content actually changed:
+
+- changed:   full item rewrite, conditional on the updated_at we read, so
+             a POST /taste-profile that lands mid-sync wins
+- unchanged: only a synced_at marker - updated_at is left alone, like
+             POST /taste-profile does for no-op saves (caches and
+             changed_since() key on it)
+
+A 429 (or 5xx) from Spotify pauses every worker until its Retry-After has
+passed (quota is per app, not per user); other errors are counted per user
+and the run carries on. Users without a cached OAuth token (never logged in
+on this machine, or revoked) are skipped as no_token - the worker never
+starts an interactive login.
+
+Env vars:
+  SPOTIFY_SYNC_MAX_AGE_HOURS   re-sync users older than this (default 24)
+  SPOTIFY_SYNC_WORKERS         users synced in parallel (default 4)
+  SPOTIFY_TOKEN_CACHE_DIR      per-user spotipy token caches, "<dir>/.cache-<user_id>"
+                               (default: current directory)
+
+Run from the repo root with:
+    python -m backend.sync_worker --stub --users 200          # stub Spotify + in-memory store
+    python -m backend.sync_worker --every-minutes 60          # PROFILE_STORE + real Spotify, hourly
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .spotify_harvest import retry_after_seconds
+from .taste_profile import build_taste_profile
+
+# The store and item shape are the Lambda's (flat modules in lambda/)
+_LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda")
+if _LAMBDA_DIR not in sys.path:
+    sys.path.insert(0, _LAMBDA_DIR)
+
+from profile_items import build_profile_item, stored_content_hash, taste_profile_body  # noqa: E402
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+MAX_AGE_HOURS = _env_float("SPOTIFY_SYNC_MAX_AGE_HOURS", 24.0)
+WORKERS = max(1, int(_env_float("SPOTIFY_SYNC_WORKERS", 4)))
+TOKEN_CACHE_DIR = os.environ.get("SPOTIFY_TOKEN_CACHE_DIR", "")
+
+
+class MissingSpotifyToken(Exception):
+    """The user has no usable cached OAuth token; syncing them needs a login."""
+
+
+class RateLimitGate:
+    """Shared pause: after a 429 nobody calls Spotify until Retry-After has passed."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._until = 0.0
+        self.pauses = 0
+        self.waited_seconds = 0.0
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._until - self._clock()
+                if delay <= 0:
+                    return
+                self.waited_seconds += delay
+            self._sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            until = self._clock() + seconds
+            if until > self._until:
+                self._until = until
+                self.pauses += 1
+
+
+class _GatedSpotify:
+    """Wraps a client so every call waits on the gate and retries 429/5xx."""
+
+    def __init__(self, sp, gate: RateLimitGate, max_retries: int, base_delay: float):
+        self._sp = sp
+        self._gate = gate
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self.requests = 0
+        self.retries = 0
+
+    def __getattr__(self, name: str):
+        fn = getattr(self._sp, name)
+
+        def call(*args, **kwargs):
+            attempt = 0
+            while True:
+                self._gate.wait()
+                self.requests += 1
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    delay = retry_after_seconds(e, attempt, self._base_delay)
+                    if delay is None or attempt >= self._max_retries:
+                        raise
+                    self.retries += 1
+                    self._gate.pause(delay)
+                    attempt += 1
+
+        return call
+
+
+def spotify_client_for(user_id: str):
+    """
+    Real client from the user's cached OAuth token (written when they logged
+    in). Raises MissingSpotifyToken instead of falling back to spotipy's
+    interactive login, which would block the worker.
+    """
+    from .spotify_client import create_spotify_client
+
+    cache_path = os.path.join(TOKEN_CACHE_DIR or ".", f".cache-{user_id}")
+    if not os.path.exists(cache_path):
+        raise MissingSpotifyToken(user_id)
+    sp = create_spotify_client(cache_path=cache_path, open_browser=False)
+    auth = sp.auth_manager
+    # Refreshes an expired access token; None if there's nothing usable
+    if not auth.validate_token(auth.cache_handler.get_cached_token()):
+        raise MissingSpotifyToken(user_id)
+    return sp
+
+
+def profile_body(taste_profile: Dict[str, Any], existing: Dict[str, Any]) -> Dict[str, Any]:
+    """POST /taste-profile body for a freshly built profile (display name/bio kept)."""
+    body = taste_profile_body(taste_profile)
+    for key in ("display_name", "bio"):
+        if isinstance(existing.get(key), str):
+            body[key] = existing[key]
+    return body
+
+
+def _last_synced(item: Dict[str, Any]) -> str:
+    return max(str(item.get("synced_at") or ""), str(item.get("updated_at") or ""))
+
+
+def stale_items(store, cutoff: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Items last synced/updated before cutoff (ISO timestamp), in scan order."""
+    n = 0
+    for item in store.scan_all():
+        if limit is not None and n >= limit:
+            return
+        if isinstance(item.get("user_id"), str) and _last_synced(item) < cutoff:
+            n += 1
+            yield item
+
+
+def sync_user(
+    store,
+    existing: Dict[str, Any],
+    sp,
+    now: Optional[str] = None,
+) -> str:
+    """Rebuild one user's profile from Spotify. Returns saved / unchanged / conflict."""
+    user_id = existing["user_id"]
+    now = now or datetime.now(timezone.utc).isoformat()
+    data = profile_body(build_taste_profile(sp), existing)
+    item = build_profile_item(user_id, data, now, connections=existing.get("connections"))
+    expected = {"updated_at": existing.get("updated_at")}
+
+    if stored_content_hash(existing) == item["content_hash"]:
+        ok = store.update(user_id, {"synced_at": now}, expected=expected)
+        return "unchanged" if ok else "conflict"
+
+    item["synced_at"] = now
+    updates = {k: v for k, v in item.items() if k != "user_id"}
+    return "saved" if store.update(user_id, updates, expected=expected) else "conflict"
+
+
+def run_sync(
+    store,
+    client_for: Callable[[str], Any] = spotify_client_for,
+    max_age_hours: float = MAX_AGE_HOURS,
+    workers: int = WORKERS,
+    limit: Optional[int] = None,
+    max_retries: int = 5,
+    base_delay: float = 0.5,
+    gate: Optional[RateLimitGate] = None,
+) -> Dict[str, Any]:
+    """
+    One sync pass. client_for(user_id) returns a spotipy-shaped client for
+    that user, or raises MissingSpotifyToken. Returns counts plus
+    users_per_minute.
+    """
+    started = time.perf_counter()
+    gate = gate or RateLimitGate()
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=max_age_hours)).isoformat()
+    counts = {"saved": 0, "unchanged": 0, "conflict": 0, "no_token": 0, "error": 0}
+    errors: List[Dict[str, str]] = []
+    calls = {"requests": 0, "retries": 0}
+    lock = threading.Lock()
+
+    def one(existing: Dict[str, Any]) -> None:
+        user_id = existing["user_id"]
+        sp: Optional[_GatedSpotify] = None
+        try:
+            sp = _GatedSpotify(client_for(user_id), gate, max_retries, base_delay)
+            status = sync_user(store, existing, sp)
+        except MissingSpotifyToken:
+            status = "no_token"
+        except Exception as e:
+            status = "error"
+            with lock:
+                if len(errors) < 20:
+                    errors.append({"user_id": user_id, "error": f"{type(e).__name__}: {e}"})
+        with lock:
+            counts[status] += 1
+            if sp is not None:
+                calls["requests"] += sp.requests
+                calls["retries"] += sp.retries
+
+    # At most 2x workers users queued, so the scan doesn't run ahead of the syncs
+    slots = threading.BoundedSemaphore(max(1, workers) * 2)
+    futures = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for existing in stale_items(store, cutoff, limit):
+            slots.acquire()
+            fut = pool.submit(one, existing)
+            fut.add_done_callback(lambda _f: slots.release())
+            futures.append(fut)
+    for fut in futures:
+        fut.result()
+
+    elapsed = time.perf_counter() - started
+    users = sum(counts.values())
+    return dict(
+        counts,
+        users=users,
+        cutoff=cutoff,
+        spotify_requests=calls["requests"],
+        spotify_retries=calls["retries"],
+        rate_limit_pauses=gate.pauses,
+        rate_limit_wait_seconds=round(gate.waited_seconds, 3),
+        seconds=round(elapsed, 3),
+        users_per_minute=round(users / elapsed * 60.0, 1) if elapsed > 0 else 0.0,
+        errors=errors,
+    )
+
+
+# -------------------------
+# Local demo: stub Spotify + in-memory store
+# -------------------------
+def _stub_setup(n_users: int, latency_ms: float):
+    from storage import create_profile_storage
+
+    from .spotify_stub import StubSpotify
+
+    def client_for(user_id: str) -> StubSpotify:
+        n = int(user_id.rsplit("_", 1)[-1])
+        return StubSpotify(
+            user_id=user_id,
+            items_per_range=20,
+            latency_seconds=latency_ms / 1000.0,
+            seed=n * 7,
+        )
+
+    store = create_profile_storage("memory")
+    old = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    store.put_many([
+        build_profile_item(f"stub_user_{n:05d}", {"top_artists": ["Placeholder"]}, old)
+        for n in range(n_users)
+    ])
+    return store, client_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-sync stale profiles from Spotify.")
+    parser.add_argument("--stub", action="store_true", help="stub Spotify + in-memory store")
+    parser.add_argument("--users", type=int, default=200, help="stub users")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub per-request latency")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-age-hours", type=float, default=MAX_AGE_HOURS)
+    parser.add_argument("--limit", type=int, default=None, help="max users per run")
+    parser.add_argument("--every-minutes", type=float, default=0, help="keep running on this schedule")
+    args = parser.parse_args()
+
+    if args.stub:
+        store, client_for = _stub_setup(args.users, args.latency_ms)
+    else:
+        from storage import create_profile_storage
+
+        store, client_for = create_profile_storage(), spotify_client_for
+
+    while True:
+        report = run_sync(store, client_for, args.max_age_hours, args.workers, args.limit)
+        print(json.dumps(report, indent=2))
+        if not args.every_minutes:
+            return
+        time.sleep(args.every_minutes * 60.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from collections import Counter
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 
 def build_taste_profile(sp) -> Dict[str, Any]:
@@ -15,20 +15,38 @@ def build_taste_profile(sp) -> Dict[str, Any]:
     top_artists_data = sp.current_user_top_artists(limit=20)
     top_tracks_data = sp.current_user_top_tracks(limit=20)
 
+    return build_taste_profile_from_items(
+        top_artists_data["items"], top_tracks_data["items"]
+    )
+
+
+def build_taste_profile_from_items(
+    top_artists: List[Dict[str, Any]],
+    top_tracks: List[Dict[str, Any]],
+    favorites_limit: int = 5,
+) -> Dict[str, Any]:
+    """
+    Same profile as build_taste_profile, from raw Spotify artist/track objects.
+
+    Lets callers that already have the payloads (full-history harvest, cache)
+    skip the Spotify round trip. favorites_limit caps favorite_artists and
+    sample_tracks (5 for the quick profile; the full-history harvest keeps
+    more, so matching sees the whole history, not just genre counts).
+    """
     # ---- Favorite genres ----
     genre_counts = Counter()
-    for artist in top_artists_data["items"]:
+    for artist in top_artists:
         for genre in artist.get("genres") or []:
             genre_counts[genre] += 1
 
     favorite_genres = [g for g, _ in genre_counts.most_common(5)]
 
     # ---- Favorite artists ----
-    favorite_artists = [a.get("name") for a in top_artists_data["items"][:5]]
+    favorite_artists = [a.get("name") for a in top_artists[:favorites_limit]]
 
     # ---- Sample tracks ----
     sample_tracks = []
-    for t in top_tracks_data["items"][:5]:
+    for t in top_tracks[:favorites_limit]:
         artists = t.get("artists", [])
         main_artist_name = artists[0]["name"] if artists else "Unknown artist"
         sample_tracks.append(
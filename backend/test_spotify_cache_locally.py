@@ -0,0 +1,161 @@
+"""
+Local test for the Spotify response cache (TTL, stale-while-revalidate,
+eviction) and the per-user scoping of CachedSpotifyClient.
+
+Run from the repo root with:
+    python -m backend.test_spotify_cache_locally
+"""
+
+import threading
+import time
+
+from .spotify_cache import CachedSpotifyClient, ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Loader:
+    """Counts calls; returns "<name>-<n>" and signals each completed call."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        return f"{self.name}-{self.calls}"
+
+
+class _AuthManager:
+    def __init__(self, token):
+        self.token = token
+
+    def get_cached_token(self):
+        return self.token
+
+
+class _FakeSpotify:
+    def __init__(self, user: str, token=None):
+        self.user = user
+        self.auth_manager = _AuthManager(token)
+        self.requests = 0
+
+    def current_user(self):
+        self.requests += 1
+        return {"id": self.user}
+
+    def current_user_top_artists(self, limit=20, offset=0, time_range="medium_term"):
+        self.requests += 1
+        items = [{"name": f"{self.user} artist {n}"} for n in range(offset, min(offset + limit, 80))]
+        href = "https://api.spotify.com/v1/me/top/artists?time_range=medium_term"
+        return {
+            "items": items,
+            "limit": limit,
+            "offset": offset,
+            "total": 80,
+            "href": f"{href}&limit={limit}&offset={offset}",
+            "next": f"{href}&limit={limit}&offset={offset + limit}" if offset + limit < 80 else None,
+            "previous": None,
+        }
+
+
+def test_fresh_then_expired():
+    clock = _Clock()
+    cache = ResponseCache(ttl_seconds=10, stale_ttl_seconds=0, clock=clock)
+    load = _Loader("me")
+
+    assert cache.get_or_load("k", load) == "me-1"
+    clock.now += 10
+    assert cache.get_or_load("k", load) == "me-1"  # age == ttl: still fresh
+    clock.now += 1
+    assert cache.get_or_load("k", load) == "me-2"  # past ttl + stale_ttl: loaded again
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["refreshes"]) == (1, 2, 0)
+
+
+def test_stale_served_while_refreshing():
+    clock = _Clock()
+    cache = ResponseCache(ttl_seconds=10, stale_ttl_seconds=100, clock=clock)
+    load = _Loader("top")
+    cache.get_or_load("k", load)
+
+    clock.now += 50
+    load.called.clear()
+    assert cache.get_or_load("k", load) == "top-1"  # stale value straight away
+    assert load.called.wait(5)
+    for _ in range(500):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+    assert cache.get_or_load("k", load) == "top-2"  # refreshed value is fresh
+    stats = cache.stats()
+    assert (stats["stale_hits"], stats["refreshes"], stats["hits"]) == (1, 1, 1)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2, clock=_Clock())
+    a, b, c = _Loader("a"), _Loader("b"), _Loader("c")
+    cache.get_or_load("a", a)
+    cache.get_or_load("b", b)
+    cache.get_or_load("a", a)  # a is now most recently used
+    cache.get_or_load("c", c)  # evicts b
+    cache.get_or_load("a", a)
+    cache.get_or_load("b", b)
+    assert (a.calls, b.calls, c.calls) == (1, 2, 1)
+    assert cache.stats()["evictions"] == 2
+
+
+def test_clients_are_scoped_per_user():
+    cache = ResponseCache(clock=_Clock())
+    alice = CachedSpotifyClient(_FakeSpotify("alice", {"refresh_token": "r-alice"}), cache)
+    bob = CachedSpotifyClient(_FakeSpotify("bob", {"refresh_token": "r-bob"}), cache)
+
+    assert alice.current_user_top_artists(limit=5)["items"][0]["name"] == "alice artist 0"
+    assert bob.current_user_top_artists(limit=5)["items"][0]["name"] == "bob artist 0"
+    assert len(alice.current_user_top_artists(limit=10)["items"]) == 10  # sliced from the cached page
+    assert alice._sp.requests == 1 and bob._sp.requests == 1
+
+
+def test_sliced_pages_link_to_the_next_slice():
+    cache = ResponseCache(clock=_Clock())
+    client = CachedSpotifyClient(_FakeSpotify("erin", {"refresh_token": "r-erin"}), cache)
+
+    page = client.current_user_top_artists(limit=10)
+    assert (page["limit"], page["offset"], page["total"]) == (10, 0, 80)
+    assert page["next"].endswith("time_range=medium_term&limit=10&offset=10")
+    # Following next goes to Spotify and lines up with the slice
+    following = client.current_user_top_artists(limit=10, offset=10)
+    assert following["items"][0]["name"] == "erin artist 10"
+
+
+def test_no_token_is_never_cached():
+    cache = ResponseCache(clock=_Clock())
+    first = CachedSpotifyClient(_FakeSpotify("carol"), cache)
+    second = CachedSpotifyClient(_FakeSpotify("dave"), cache)
+
+    assert first.current_user() == {"id": "carol"}
+    assert second.current_user() == {"id": "dave"}
+    assert second.current_user_top_artists(limit=3)["items"][0]["name"] == "dave artist 0"
+    assert cache.stats()["entries"] == 0
+
+
+def main():
+    test_fresh_then_expired()
+    test_stale_served_while_refreshing()
+    test_lru_eviction()
+    test_clients_are_scoped_per_user()
+    test_sliced_pages_link_to_the_next_slice()
+    test_no_token_is_never_cached()
+    print("\n✅ Spotify cache tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Local end-to-end test for the background Spotify sync, against the Spotify
+stub and the in-memory profile store.
+
+Run from the repo root with:
+    python -m backend.test_sync_worker_locally
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from .spotify_stub import StubSpotify
+from .sync_worker import MissingSpotifyToken, RateLimitGate, profile_body, run_sync, sync_user
+from .taste_profile import build_taste_profile
+
+from profile_items import build_profile_item  # noqa: E402  (lambda/, put on sys.path by sync_worker)
+from storage import create_profile_storage  # noqa: E402
+
+
+def _ago(**kwargs) -> str:
+    return (datetime.now(timezone.utc) - timedelta(**kwargs)).isoformat()
+
+
+def _client_for(**stub_kwargs):
+    def client_for(user_id: str) -> StubSpotify:
+        return StubSpotify(user_id=user_id, items_per_range=20, seed=int(user_id[-2:]) * 5, **stub_kwargs)
+
+    return client_for
+
+
+def _seed_store():
+    """u00-u09: 2 days old, half already match Spotify; u10-u11: fresh."""
+    store = create_profile_storage("memory")
+    client_for = _client_for()
+    items = []
+    for n in range(12):
+        user_id = f"u{n:02d}"
+        if n < 10 and n % 2 == 0:
+            body = profile_body(build_taste_profile(client_for(user_id)), {"display_name": f"User {n}"})
+        else:
+            body = {"top_artists": ["Placeholder"], "display_name": f"User {n}"}
+        item = build_profile_item(user_id, body, _ago(days=2) if n < 10 else _ago(minutes=5), connections=["u11"])
+        items.append(item)
+    store.put_many(items)
+    return store, client_for
+
+
+def test_sync_writes_only_changed_profiles():
+    store, client_for = _seed_store()
+    before = {it["user_id"]: it for it in store.scan_all()}
+
+    report = run_sync(store, client_for, max_age_hours=24, workers=3)
+    assert (report["users"], report["saved"], report["unchanged"], report["error"]) == (10, 5, 5, 0)
+    assert report["spotify_requests"] == 20 and report["users_per_minute"] > 0
+
+    after = {it["user_id"]: it for it in store.scan_all()}
+    for n in range(12):
+        old, new = before[f"u{n:02d}"], after[f"u{n:02d}"]
+        if n >= 10:
+            assert new == old
+        elif n % 2 == 0:
+            # Unchanged: only the marker, updated_at untouched
+            assert new["updated_at"] == old["updated_at"] and new["synced_at"] > old["updated_at"]
+        else:
+            assert new["updated_at"] > old["updated_at"] and new["content_hash"] != old["content_hash"]
+            assert new["display_name"] == f"User {n}" and new["connections"] == ["u11"]
+            assert new["profile"]["sample"]["top_artists"][0].startswith("Artist ")
+
+    # Everyone was just synced: nothing left to do
+    assert run_sync(store, client_for, max_age_hours=24)["users"] == 0
+
+
+def test_sync_backs_off_and_yields_to_concurrent_saves():
+    store, _ = _seed_store()
+    report = run_sync(
+        store, _client_for(rate_limit_every=2, retry_after_seconds=0.01), max_age_hours=24, workers=2, limit=4
+    )
+    assert report["users"] == 4 and report["error"] == 0
+    assert report["spotify_retries"] > 0 and report["rate_limit_pauses"] > 0
+
+    # A POST /taste-profile landed after the worker read the item
+    existing = store.get("u05")
+    store.update("u05", {"updated_at": _ago(seconds=1)})
+    assert sync_user(store, existing, _client_for()("u05")) == "conflict"
+    assert store.get("u05")["profile"] == existing["profile"]
+
+
+def test_client_failures_are_counted_per_user():
+    store, client_for = _seed_store()
+
+    def flaky_client_for(user_id: str) -> StubSpotify:
+        if user_id == "u01":
+            raise FileNotFoundError("token cache unreadable")
+        if user_id == "u02":
+            raise MissingSpotifyToken(user_id)
+        return client_for(user_id)
+
+    report = run_sync(store, flaky_client_for, max_age_hours=24, workers=3)
+    assert (report["users"], report["error"], report["no_token"]) == (10, 1, 1)
+    assert report["saved"] + report["unchanged"] == 8
+    assert [e["user_id"] for e in report["errors"]] == ["u01"]
+
+
+def test_gate_pauses_everyone():
+    now = [0.0]
+    slept = []
+
+    def sleep(s):
+        slept.append(s)
+        now[0] += s
+
+    gate = RateLimitGate(clock=lambda: now[0], sleep=sleep)
+    gate.wait()
+    gate.pause(2.0)
+    gate.pause(1.0)  # shorter: doesn't shorten the pause
+    gate.wait()
+    assert slept == [2.0] and gate.pauses == 1
+
+
+def main():
+    test_sync_writes_only_changed_profiles()
+    test_sync_backs_off_and_yields_to_concurrent_saves()
+    test_client_failures_are_counted_per_user()
+    test_gate_pauses_everyone()
+
+    store, client_for = _seed_store()
+    report = run_sync(store, _client_for(latency_seconds=0.02), max_age_hours=24, workers=4)
+    print("=== Sync report (stub, 20ms latency) ===")
+    print(json.dumps(report, indent=2))
+    print("\n✅ Sync worker tests passed.")
+
+
+if __name__ == "__main__":
+    main()
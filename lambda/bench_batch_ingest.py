@@ -0,0 +1,103 @@
+"""
+Benchmark: onboarding N users through POST /taste-profile (one invocation
+per user) vs POST /taste-profiles/batch (one invocation per batch).
+
+Runs against the in-memory table with a simulated round-trip latency per
+DynamoDB call, and reports users/second, invocations and DynamoDB calls
+per user for both routes. Half the users already exist (with connections),
+so the batch route's batch_get path is exercised too.
+
+Run this from inside the 'lambda' folder with:
+    python bench_batch_ingest.py
+    python bench_batch_ingest.py --users 2000 --batch-size 250 --latency-ms 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from storage import create_profile_storage  # noqa: E402
+from synthetic_profiles import SyntheticCatalog, generate_build_input  # noqa: E402
+
+
+def make_bodies(n_users: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    catalog = SyntheticCatalog(seed=seed)
+    return [
+        {"user_id": f"onboard_{i:07d}", "display_name": f"User {i}", "items": generate_build_input(rng, catalog, 10)}
+        for i in range(n_users)
+    ]
+
+
+def _event(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {"requestContext": {"http": {"method": "POST", "path": path}}, "body": json.dumps(body)}
+
+
+def run_route(route: str, bodies: List[Dict[str, Any]], batch_size: int, latency_s: float) -> Dict[str, Any]:
+    handler.store = create_profile_storage("memory")
+    table = handler.store.table
+    # Half the users are already onboarded and have a connection to keep
+    handler.store.put_many(
+        [{"user_id": b["user_id"], "connections": ["someone"], "updated_at": "2026-01-01T00:00:00+00:00"}
+         for b in bodies[::2]]
+    )
+    table.calls.clear()
+    table.latency_seconds = latency_s
+
+    if route == "single":
+        events = [_event("/taste-profile", b) for b in bodies]
+    else:
+        events = [_event("/taste-profiles/batch", {"users": bodies[i:i + batch_size]})
+                  for i in range(0, len(bodies), batch_size)]
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for event in events:
+            resp = handler.lambda_handler(event, None)
+            assert resp["statusCode"] == 200, resp
+    wall = time.perf_counter() - started
+
+    calls = dict(sorted(table.calls.items()))
+    table.latency_seconds = 0.0
+    assert all(handler.store.get(b["user_id"])["connections"] == ["someone"] for b in bodies[::2])
+    return {
+        "route": "POST /taste-profile" if route == "single" else f"POST /taste-profiles/batch ({batch_size}/call)",
+        "users": len(bodies),
+        "invocations": len(events),
+        "users_per_second": round(len(bodies) / wall, 1),
+        "ms_per_invocation": round(wall * 1000.0 / len(events), 2),
+        "ddb_calls_per_user": round(sum(calls.values()) / len(bodies), 3),
+        "ddb_calls": calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs batch taste-profile ingestion benchmark.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--latency-ms", type=float, default=3.0, help="simulated DynamoDB round trip")
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    bodies = make_bodies(args.users, args.seed)
+    rows = [run_route(route, bodies, args.batch_size, args.latency_ms / 1000.0) for route in ("single", "batch")]
+    print(json.dumps(rows, indent=2))
+    single, batch = rows
+    print(f"\nusers/s {single['users_per_second']} -> {batch['users_per_second']} "
+          f"({batch['users_per_second'] / single['users_per_second']:.1f}x), "
+          f"DynamoDB calls/user {single['ddb_calls_per_user']} -> {batch['ddb_calls_per_user']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: GET /matches bursts with a per-request table scan vs the
+stale-while-revalidate candidate snapshot (candidate_snapshot.py).
+
+Fires several bursts of concurrent /matches calls at one warm handler
+(threads, like the Flask deployment). Bursts are spaced past the snapshot
+TTL, so every burst after the first lands on expired data. Reports latency,
+scan pages per request and the snapshot's refresh stats.
+
+Run this from inside the 'lambda' folder with:
+    python bench_candidate_snapshot.py
+    python bench_candidate_snapshot.py --users 5000 --bursts 5 --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from candidate_snapshot import CandidateSnapshot  # noqa: E402
+from load_test import CountingStorage, make_event, percentile, seed_store  # noqa: E402
+from score_cache import PairScoreCache  # noqa: E402
+
+
+def run_bursts(args: argparse.Namespace, ttl_seconds: float) -> Dict[str, Any]:
+    store = CountingStorage(seed_store("memory", args.users, args.seed))
+    handler.store = store
+    handler.pair_cache = PairScoreCache(0)  # measure the scan, not score reuse
+    handler.candidate_snapshot = CandidateSnapshot(
+        lambda: store.scan_all(), ttl_seconds=ttl_seconds, max_stale_seconds=args.max_stale
+    )
+
+    rng = random.Random(args.seed)
+    user_ids = [f"synthetic_{i:07d}" for i in range(args.users)]
+    latencies: List[float] = []
+
+    def invoke(event: Dict[str, Any]) -> float:
+        t0 = time.perf_counter()
+        resp = handler.lambda_handler(event, None)
+        assert resp["statusCode"] == 200, resp
+        return (time.perf_counter() - t0) * 1000.0
+
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.bursts):
+            events = [make_event("matches", rng, user_ids) for _ in range(args.concurrency)]
+            latencies += list(pool.map(invoke, events))
+            time.sleep(args.gap)
+
+    latencies.sort()
+    calls = store.snapshot()
+    return {
+        "mode": f"snapshot ttl={ttl_seconds}s" if ttl_seconds else "scan per request",
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "scan_pages_per_request": round(calls["scan_page"] / len(latencies), 2),
+        "candidate_snapshot": handler.candidate_snapshot.stats() if ttl_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate snapshot (stale-while-revalidate) benchmark.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--bursts", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttl", type=float, default=0.5, help="snapshot TTL in seconds")
+    parser.add_argument("--max-stale", type=float, default=60.0)
+    parser.add_argument("--gap", type=float, default=1.0, help="seconds between bursts (> ttl to hit stale data)")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rows = [run_bursts(args, 0.0), run_bursts(args, args.ttl)]
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
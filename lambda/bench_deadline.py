@@ -0,0 +1,115 @@
+"""
+Benchmark: GET /matches with a latency budget (?budget_ms=) on a table too
+big to score within it.
+
+For each budget, replays the same requests against one warm handler and
+reports latency percentiles, how often the answer was partial, the share of
+candidates covered, and how much of the full (unbudgeted) top-k the partial
+answers kept. Runs the per-request scan path and the candidate-snapshot
+path (bound-ordered, so cut-offs keep the likeliest matches).
+
+Run this from inside the 'lambda' folder with:
+    python bench_deadline.py
+    python bench_deadline.py --users 20000 --budgets 25,50,100,0
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from candidate_snapshot import CandidateSnapshot  # noqa: E402
+from load_test import percentile, seed_store  # noqa: E402
+from score_cache import PairScoreCache  # noqa: E402
+
+import time  # noqa: E402
+
+
+def _event(user_id: str, budget_ms: Optional[int]) -> Dict[str, Any]:
+    qs = {"limit": "10"}
+    if budget_ms is not None:
+        qs["budget_ms"] = str(budget_ms)
+    return {
+        "requestContext": {"http": {"method": "GET", "path": f"/matches/{user_id}"}},
+        "pathParameters": {"user_id": user_id},
+        "queryStringParameters": qs,
+    }
+
+
+def run(mode: str, users: List[str], budget_ms: Optional[int], full: Dict[str, List[str]]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    partial = 0
+    covered: List[float] = []
+    kept: List[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in users:
+            t0 = time.perf_counter()
+            resp = handler.lambda_handler(_event(user_id, budget_ms), None)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            body = json.loads(resp["body"])
+            ids = [m["user_id"] for m in body["matches"]]
+            if user_id not in full:
+                full[user_id] = ids
+                total = body["candidates_covered"]
+                full[user_id + "#total"] = [total]
+            partial += bool(body["partial"])
+            covered.append(body["candidates_covered"] / max(1, full[user_id + "#total"][0]))
+            kept.append(len(set(ids) & set(full[user_id])) / max(1, len(full[user_id])))
+    latencies.sort()
+    return {
+        "mode": mode,
+        "budget_ms": budget_ms,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1),
+        "partial_rate": round(partial / len(users), 2),
+        "covered_mean": round(sum(covered) / len(covered), 3),
+        "top_k_kept_mean": round(sum(kept) / len(kept), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deadline-aware /matches benchmark.")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--budgets", default="25,50,100", help="budget_ms values to try")
+    parser.add_argument("--seed", type=int, default=23)
+    args = parser.parse_args()
+
+    handler.store = seed_store("memory", args.users, args.seed)
+    handler.pair_cache = PairScoreCache(0)
+    rng = random.Random(args.seed)
+    users = [f"synthetic_{rng.randrange(args.users):07d}" for _ in range(args.requests)]
+    budgets = [int(b) for b in args.budgets.split(",") if b.strip()]
+
+    rows = []
+    for mode in ("scan", "snapshot"):
+        ttl = 3600.0 if mode == "snapshot" else 0.0
+        handler.candidate_snapshot = CandidateSnapshot(lambda: handler.store.scan_all(), ttl_seconds=ttl)
+        if ttl:
+            handler.candidate_snapshot.get()  # warm, so budgets measure scoring
+        full: Dict[str, List[str]] = {}
+        rows.append(run(mode, users, None, full))
+        rows += [run(mode, users, b, full) for b in budgets]
+
+    print(f"users={args.users:,}  requests={args.requests} per row")
+    print(f"{'mode':>9} {'budget':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'partial':>8} {'covered':>8} {'top-k kept':>11}")
+    for r in rows:
+        budget = "-" if r["budget_ms"] is None else r["budget_ms"]
+        print(
+            f"{r['mode']:>9} {budget:>7} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8} "
+            f"{r['partial_rate']:>8.0%} {r['covered_mean']:>8.1%} {r['top_k_kept_mean']:>11.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
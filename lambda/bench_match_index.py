@@ -0,0 +1,124 @@
+"""
+Benchmark: match_index.MatchIndex with vocabulary pruning (no posting
+lists for singleton tokens, hot tokens as per-user bits) vs the same index
+posting every token, and vs ranking.top_k_pruned over the features, on a
+Zipf-distributed synthetic corpus.
+
+Reports memory held by each index (tracemalloc), build time, how the
+vocabulary splits (posted / singleton / hot), and per-query p50/p95 for
+top-k. Every query is checked to return the same top-k as top_k_pruned.
+
+Run this from inside the 'lambda' folder with:
+    python bench_match_index.py
+    python bench_match_index.py --users 50000 --queries 50 --hot-fraction 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from load_test import percentile
+from match_index import KINDS, MatchIndex
+from matching import extract_features, score_features
+from profile_items import profile_for_scoring
+from ranking import RANK_FIELDS, top_k_pruned
+from synthetic_profiles import generate_items
+
+
+def build(features: List[Any], **kwargs) -> Tuple[MatchIndex, float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index = MatchIndex(features, **kwargs)
+    seconds = time.perf_counter() - t0
+    kib = tracemalloc.get_traced_memory()[0] / 1024.0
+    tracemalloc.stop()
+    return index, seconds, kib
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match index vocabulary pruning benchmark.")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--hot-fraction", type=float, default=0.05)
+    parser.add_argument("--scan-queries", type=int, default=5, help="queries for the top_k_pruned baseline")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    features = [extract_features(profile_for_scoring(it)) for it in generate_items(args.users, seed=args.seed)]
+    queries = random.Random(args.seed).sample(range(args.users), args.queries)
+
+    pruned, pruned_s, pruned_kib = build(features, hot_fraction=args.hot_fraction)
+    full, full_s, full_kib = build(features, hot_fraction=None, prune_singletons=False)
+
+    stats = pruned.stats()
+    report: Dict[str, Any] = {
+        "users": args.users,
+        "vocabulary": {
+            kind: {
+                "posted": stats[kind]["posted"],
+                "singletons": stats[kind]["singletons"],
+                "hot": len(stats[kind]["hot"]),
+            }
+            for kind in KINDS
+        },
+        "size_groups": stats["groups"],
+        "full_index_kib": round(full_kib),
+        "pruned_index_kib": round(pruned_kib),
+        "memory_saved": round(1 - pruned_kib / full_kib, 3),
+        "full_build_s": round(full_s, 2),
+        "pruned_build_s": round(pruned_s, 2),
+        "latency": [],
+    }
+
+    for rank_by, field in RANK_FIELDS.items():
+        times: Dict[str, List[float]] = {"pruned": [], "full": [], "scan": []}
+        touched: List[int] = []
+        for n, q in enumerate(queries):
+            me = features[q]
+
+            def score(i: int) -> Dict[str, Any]:
+                return score_features(me, features[i])
+
+            def exclude(i: int) -> bool:
+                return i == q
+
+            results = {}
+            for name, index in (("pruned", pruned), ("full", full)):
+                t0 = time.perf_counter()
+                got, qstats = index.top_k(me, args.k, score, rank_by=rank_by, exclude=exclude)
+                times[name].append((time.perf_counter() - t0) * 1000.0)
+                results[name] = [(i, s[field]) for i, s in got]
+                if name == "pruned":
+                    touched.append(qstats["touched"])
+            if n < args.scan_queries:
+                t0 = time.perf_counter()
+                got, _ = top_k_pruned(me, features, args.k, rank_by=rank_by, exclude=exclude)
+                times["scan"].append((time.perf_counter() - t0) * 1000.0)
+                results["scan"] = [(i, s[field]) for i, s in got]
+                assert results["scan"] == results["pruned"], (rank_by, q)
+            assert results["full"] == results["pruned"], (rank_by, q)
+
+        for values in times.values():
+            values.sort()
+        report["latency"].append({
+            "rank_by": rank_by,
+            "k": args.k,
+            "touched_mean": round(sum(touched) / len(touched)),
+            "pruned_p50_ms": round(percentile(times["pruned"], 50), 2),
+            "pruned_p95_ms": round(percentile(times["pruned"], 95), 2),
+            "full_p50_ms": round(percentile(times["full"], 50), 2),
+            "full_p95_ms": round(percentile(times["full"], 95), 2),
+            "top_k_pruned_p50_ms": round(percentile(times["scan"], 50), 1),
+        })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
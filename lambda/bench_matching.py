@@ -0,0 +1,153 @@
+"""
+Micro-benchmarks for the matching hot path.
+
+Covers _norm, the _extract_* functions, compute_match_score and
+build_taste_profile, on synthetic Zipf-distributed profiles in every shape
+matching.py accepts. Results are saved as JSON so runs can be compared.
+
+Run this from inside the 'lambda' folder with:
+    python bench_matching.py                                  # writes bench_results/matching-<ts>.json
+    python bench_matching.py --compare bench_results/old.json # flags regressions
+    python bench_matching.py --quick                          # fewer samples (CI smoke run)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from build_taste_profile import build_taste_profile
+from matching import _extract_artists, _extract_genres, _extract_tracks, _norm, compute_match_score
+from synthetic_profiles import SHAPES, SyntheticCatalog, generate_build_input, generate_profile
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_results")
+
+
+def measure(fn: Callable[[], Any], ops_per_call: int, repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Calls fn in a loop until min_time has passed, `repeat` times.
+    Reports per-op nanoseconds (median + best of the repeats).
+    """
+    # Calibrate loop count so each sample takes ~min_time
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - t0 >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        samples.append(elapsed / (loops * ops_per_call) * 1e9)
+
+    median = statistics.median(samples)
+    return {
+        "ns_per_op": round(median, 1),
+        "best_ns_per_op": round(min(samples), 1),
+        "ops_per_sec": round(1e9 / median, 1) if median else 0.0,
+        "samples": repeat,
+    }
+
+
+def build_cases(seed: int) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    rng = random.Random(seed)
+    catalog = SyntheticCatalog(seed=seed)
+
+    profiles = {shape: [generate_profile(rng, catalog, shape, 10, 10) for _ in range(200)] for shape in SHAPES}
+    all_profiles = [p for shape in SHAPES for p in profiles[shape]]
+    pairs = [(rng.choice(all_profiles), rng.choice(all_profiles)) for _ in range(200)]
+    strings = [catalog.track_title(rng, catalog.artist_zipf.sample(rng)) for _ in range(500)]
+    build_inputs = [generate_build_input(rng, catalog, 20) for _ in range(50)]
+
+    cases: Dict[str, Tuple[Callable[[], Any], int]] = {}
+
+    cases["norm"] = (lambda: [_norm(s) for s in strings], len(strings))
+    for shape in SHAPES:
+        ps = profiles[shape]
+        cases[f"extract_artists[{shape}]"] = (lambda ps=ps: [_extract_artists(p) for p in ps], len(ps))
+        cases[f"extract_genres[{shape}]"] = (lambda ps=ps: [_extract_genres(p) for p in ps], len(ps))
+        cases[f"extract_tracks[{shape}]"] = (lambda ps=ps: [_extract_tracks(p) for p in ps], len(ps))
+    cases["compute_match_score"] = (lambda: [compute_match_score(a, b) for a, b in pairs], len(pairs))
+    cases["build_taste_profile"] = (lambda: [build_taste_profile(x) for x in build_inputs], len(build_inputs))
+    return cases
+
+
+def run(seed: int, repeat: int, min_time: float) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, (fn, ops) in build_cases(seed).items():
+        results[name] = measure(fn, ops, repeat, min_time)
+        print(f"{name:<32} {results[name]['ns_per_op']:>12,.1f} ns/op")
+    return {
+        "suite": "matching",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    print(f"\n{'case':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, cur in current["results"].items():
+        base = (baseline.get("results") or {}).get(name)
+        if not base:
+            continue
+        change = (cur["ns_per_op"] - base["ns_per_op"]) / base["ns_per_op"]
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<32} {base['ns_per_op']:>12,.1f} {cur['ns_per_op']:>12,.1f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matching micro-benchmarks.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per sample")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--out", help="result JSON path (default: bench_results/matching-<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.repeat, args.min_time = 3, 0.01
+
+    report = run(args.seed, args.repeat, args.min_time)
+
+    out = args.out
+    if not out:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = os.path.join(RESULTS_DIR, f"matching-{stamp}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to: {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: overlapped vs sequential reads in GET /matches and POST /connect.
+
+Seeds the in-memory table stand-in with synthetic users, injects a fixed
+per-call latency (simulated DynamoDB round trip) and compares wall time
+with IO overlap on (default) and off (IO_OVERLAP=0 behaviour).
+
+Run this from inside the 'lambda' folder with:
+    python bench_overlap.py
+    python bench_overlap.py --users 5000 --latency-ms 5,20,50
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from local_table import LocalTable  # noqa: E402
+from storage import DynamoProfileStorage  # noqa: E402
+from synthetic_profiles import generate_items  # noqa: E402
+
+
+def _time_call(event, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resp = handler.lambda_handler(json.loads(json.dumps(event)), None)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        assert resp["statusCode"] == 200, resp
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlapped I/O benchmark.")
+    parser.add_argument("--users", type=int, default=3000, help="table size (1000 items per scan page)")
+    parser.add_argument("--latency-ms", default="0,20,100")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    table = LocalTable()
+    store = DynamoProfileStorage(table, name="memory")
+    store.put_many(list(generate_items(args.users, seed=3)))
+    handler.store = store
+
+    matches_event = {
+        "requestContext": {"http": {"method": "GET", "path": "/matches/synthetic_0000001"}},
+        "pathParameters": {"user_id": "synthetic_0000001"},
+    }
+    connect_event = {
+        "requestContext": {"http": {"method": "POST", "path": "/connect"}},
+        "body": json.dumps({"from_user_id": "synthetic_0000002", "to_user_id": "synthetic_0000003"}),
+    }
+
+    print(f"users={args.users}  scan pages={-(-args.users // 1000)}  median of {args.repeat}")
+    print(f"{'latency':>8} {'route':<9} {'sequential ms':>14} {'overlapped ms':>14} {'saved':>7}")
+    for latency_ms in [float(x) for x in args.latency_ms.split(",")]:
+        table.latency_seconds = latency_ms / 1000.0
+        for route, event in (("matches", matches_event), ("connect", connect_event)):
+            results = {}
+            for overlap in (False, True):
+                handler.OVERLAP_IO = overlap
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[overlap] = _time_call(event, args.repeat)
+            saved = 1.0 - results[True] / results[False] if results[False] else 0.0
+            print(f"{latency_ms:>6.0f}ms {route:<9} {results[False]:>14.1f} {results[True]:>14.1f} {saved:>6.0%}")
+    handler.OVERLAP_IO = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark: GET /matches with and without the pair-score cache (score_cache.py)
+under a Zipf request mix.
+
+A few popular users browse /matches far more often than the long tail, and
+a small fraction of requests re-save a profile (new content -> new
+fingerprint -> those pairs must be rescored). Reports latency, throughput
+and cache hit rate for both configurations.
+
+Run this from inside the 'lambda' folder with:
+    python bench_pair_cache.py
+    python bench_pair_cache.py --users 5000 --requests 300 --write-ratio 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from load_test import percentile, seed_store  # noqa: E402
+from score_cache import PairScoreCache  # noqa: E402
+from synthetic_profiles import SyntheticCatalog, ZipfSampler, generate_build_input  # noqa: E402
+
+
+def make_mix(n_users: int, requests: int, write_ratio: float, zipf_s: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    catalog = SyntheticCatalog(seed=seed)
+    zipf = ZipfSampler(n_users, zipf_s)
+    events = []
+    for _ in range(requests):
+        user_id = f"synthetic_{zipf.sample(rng):07d}"
+        if rng.random() < write_ratio:
+            body = {"user_id": user_id, "items": generate_build_input(rng, catalog, 10)}
+            events.append(
+                {"requestContext": {"http": {"method": "POST", "path": "/taste-profile"}}, "body": json.dumps(body)}
+            )
+        else:
+            events.append(
+                {
+                    "requestContext": {"http": {"method": "GET", "path": f"/matches/{user_id}"}},
+                    "pathParameters": {"user_id": user_id},
+                    "queryStringParameters": {"limit": "10"},
+                }
+            )
+    return events
+
+
+def run_mix(events: List[Dict[str, Any]], n_users: int, cache_entries: int, seed: int) -> Dict[str, Any]:
+    # Fresh store per run so both configurations see the same writes
+    handler.store = seed_store("memory", n_users, seed)
+    handler.pair_cache = PairScoreCache(cache_entries)
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for event in events:
+            t0 = time.perf_counter()
+            resp = handler.lambda_handler(event, None)
+            if event["requestContext"]["http"]["method"] == "GET":
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            assert resp["statusCode"] == 200, resp
+    wall = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        "cache_entries": cache_entries,
+        "match_requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "requests_per_second": round(len(events) / wall, 1),
+        "pair_cache": handler.pair_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pair-score cache benchmark (Zipf request mix).")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="fraction of requests that re-save a profile")
+    parser.add_argument("--zipf-s", type=float, default=1.1, help="request skew over users")
+    parser.add_argument("--cache-entries", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    events = make_mix(args.users, args.requests, args.write_ratio, args.zipf_s, args.seed)
+    rows = [run_mix(events, args.users, entries, args.seed) for entries in (0, args.cache_entries)]
+
+    print(json.dumps(rows, indent=2))
+    off, on = rows
+    if on["p50_ms"]:
+        print(
+            f"\np50 {off['p50_ms']} -> {on['p50_ms']} ms ({off['p50_ms'] / on['p50_ms']:.1f}x), "
+            f"hit rate {on['pair_cache']['hit_rate']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark for the profile_store save path.
+
+Compares:
+  - float->Decimal conversion: old copy-everything recursion vs the
+    single-walk copy-on-write version, on large nested profiles
+  - N x save_profile (one put_item each) vs save_profiles (batch_writer)
+    against the in-memory table stand-in
+
+Run this from inside the 'lambda' folder with:
+    python bench_profile_store.py
+"""
+
+import random
+import time
+from decimal import Decimal
+from typing import Any, Dict
+
+from local_table import LocalTable
+from profile_store import _to_dynamodb_types, save_profile, save_profiles
+
+
+def _legacy_to_dynamodb_types(value: Any) -> Any:
+    """The pre-optimization implementation, kept here as the baseline."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _legacy_to_dynamodb_types(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_legacy_to_dynamodb_types(v) for v in value]
+    return value
+
+
+def make_profile(rng: random.Random, artists: int, with_floats: bool) -> Dict[str, Any]:
+    genres = [f"genre {rng.randint(0, 300)}" for _ in range(40)]
+    profile: Dict[str, Any] = {
+        "summary": {"favorite_artist": "Artist 1", "favorite_genre": genres[0], "description": "x" * 120},
+        "stats": {"artist_count": artists, "track_count": artists * 2, "genre_variety": len(set(genres))},
+        "top_genres": [{"genre": g, "count": rng.randint(1, 9)} for g in genres],
+        "sample": {
+            "top_artists": [f"Artist {rng.randint(0, 5000)}" for _ in range(artists)],
+            "top_tracks": [f"Song {i} – Artist {rng.randint(0, 5000)}" for i in range(artists * 2)],
+        },
+        "history": [
+            {"time_range": tr, "artists": [{"name": f"Artist {i}", "rank": i} for i in range(artists)]}
+            for tr in ("short_term", "medium_term", "long_term")
+        ],
+    }
+    if with_floats:
+        # Realistic: only a small corner of the profile carries floats
+        profile["genre_weights"] = {g: round(rng.random(), 4) for g in genres[:10]}
+    return profile
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_conversion(n_profiles: int = 200, artists: int = 200) -> None:
+    rng = random.Random(42)
+    print(f"=== float->Decimal conversion ({n_profiles} profiles, {artists} artists each) ===")
+    print(f"{'case':<14} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+    for with_floats in (False, True):
+        profiles = [make_profile(rng, artists, with_floats) for _ in range(n_profiles)]
+
+        # Same output either way
+        for p in profiles[:5]:
+            assert _to_dynamodb_types(p) == _legacy_to_dynamodb_types(p)
+
+        legacy = _time(lambda: [_legacy_to_dynamodb_types(p) for p in profiles], 5)
+        new = _time(lambda: [_to_dynamodb_types(p) for p in profiles], 5)
+        label = "sparse floats" if with_floats else "no floats"
+        print(f"{label:<14} {legacy * 1000:>10.2f} {new * 1000:>10.2f} {legacy / new:>7.1f}x")
+
+
+def bench_batch_save(n_profiles: int = 2000) -> None:
+    rng = random.Random(7)
+    profiles = {f"user_{i:05d}": make_profile(rng, 20, True) for i in range(n_profiles)}
+
+    single_table = LocalTable()
+    t0 = time.perf_counter()
+    for user_id, profile in profiles.items():
+        save_profile(user_id, profile, table=single_table)
+    single = time.perf_counter() - t0
+
+    batch_table = LocalTable()
+    t0 = time.perf_counter()
+    save_profiles(profiles, table=batch_table)
+    batch = time.perf_counter() - t0
+
+    assert len(single_table) == len(batch_table) == n_profiles
+    print(f"\n=== Saving {n_profiles} profiles (local table) ===")
+    print(f"save_profile  x{n_profiles}: {single * 1000:8.1f} ms  calls={dict(single_table.calls)}")
+    print(f"save_profiles        : {batch * 1000:8.1f} ms  calls={dict(batch_table.calls)}")
+    print("(the local table has no network cost - on DynamoDB the win is round trips, see calls)")
+
+
+def main():
+    bench_conversion()
+    bench_batch_save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: upper-bound pruned top-k (ranking.top_k_pruned) vs scoring every
+candidate, on synthetic profiles with features already extracted (the
+candidate snapshot / shard worker case).
+
+Reports, per ranking field and k: the fraction of candidates pruned
+without a full score, and the per-query time of both versions. Every query
+is checked to return the same top-k.
+
+Run this from inside the 'lambda' folder with:
+    python bench_pruning.py
+    python bench_pruning.py --users 50000 --queries 20 --k 10,25
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, List
+
+from matching import extract_features, score_features
+from profile_items import profile_for_scoring
+from ranking import RANK_FIELDS, top_k_pruned
+from synthetic_profiles import generate_items
+
+
+def run(features: List[Any], rank_by: str, k: int, queries: List[int]) -> Dict[str, Any]:
+    field = RANK_FIELDS[rank_by]
+    ratios: List[float] = []
+    full_ms: List[float] = []
+    pruned_ms: List[float] = []
+    for q in queries:
+        me = features[q]
+
+        t0 = time.perf_counter()
+        scored = [(i, score_features(me, f)) for i, f in enumerate(features) if i != q]
+        scored.sort(key=lambda t: t[1][field], reverse=True)
+        expected = [i for i, _s in scored[:k]]
+        full_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        t0 = time.perf_counter()
+        got, stats = top_k_pruned(me, features, k, rank_by=rank_by, exclude=lambda i: i == q)
+        pruned_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        assert [i for i, _s in got] == expected, (rank_by, k, q)
+        ratios.append(stats["pruned"] / stats["candidates"])
+
+    full, pruned = statistics.median(full_ms), statistics.median(pruned_ms)
+    return {
+        "rank_by": rank_by,
+        "k": k,
+        "pruned_ratio_mean": round(statistics.mean(ratios), 3),
+        "pruned_ratio_min": round(min(ratios), 3),
+        "full_ms_p50": round(full, 2),
+        "pruned_ms_p50": round(pruned, 2),
+        "speedup": round(full / pruned, 2) if pruned else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upper-bound pruning benchmark.")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--k", default="1,10,25")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--json", help="also write rows as JSON")
+    args = parser.parse_args()
+
+    features = [extract_features(profile_for_scoring(it)) for it in generate_items(args.users, seed=args.seed)]
+    queries = random.Random(args.seed).sample(range(args.users), args.queries)
+
+    rows = [
+        run(features, rank_by, int(k), queries)
+        for rank_by in RANK_FIELDS
+        for k in args.k.split(",")
+        if k.strip()
+    ]
+
+    print(f"users={args.users:,}  queries={args.queries}  (same top-k as the full sort for every query)")
+    print(f"{'rank_by':>14} {'k':>3} {'pruned':>7} {'min':>6} {'full ms':>8} {'pruned ms':>10} {'speedup':>8}")
+    for r in rows:
+        print(
+            f"{r['rank_by']:>14} {r['k']:>3} {r['pruned_ratio_mean']:>7.1%} {r['pruned_ratio_min']:>6.1%} "
+            f"{r['full_ms_p50']:>8} {r['pruned_ms_p50']:>10} {r['speedup']:>8}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
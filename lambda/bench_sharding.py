@@ -0,0 +1,122 @@
+"""
+Benchmark: sharded scatter-gather /matches (sharding.py) from 1 to 16 shards.
+
+Seeds a SQLite file with synthetic users, then for each shard count starts
+one worker process per shard and reports:
+  - load_s:         time for every worker to load + extract its shard
+  - p50/p95 ms:     coordinator latency per query (scatter + gather + merge)
+  - max_shard_ms:   median of the slowest shard's CPU time per query - what
+                    latency converges to when every shard has its own core
+  - shard_kib:      Python heap held by each shard's items + features (max)
+  - rss_kib:        max RSS per worker process, interpreter included (mean)
+
+With fewer cores than shards the workers time-share, so p50 stops improving
+past the core count while per-shard memory keeps dropping.
+
+Run this from inside the 'lambda' folder with:
+    python bench_sharding.py
+    python bench_sharding.py --users 100000 --shards 1,2,4,8,16 --queries 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from load_test import percentile
+from matching import extract_features
+from profile_items import profile_for_scoring
+from sharding import ShardPool
+from storage import SQLiteProfileStorage
+from synthetic_profiles import generate_items
+
+
+def seed_sqlite(n_users: int, seed: int) -> str:
+    path = os.path.join(tempfile.mkdtemp(), "shards.sqlite3")
+    store = SQLiteProfileStorage(path)
+    batch: List[Dict[str, Any]] = []
+    for item in generate_items(n_users, seed=seed):
+        batch.append(item)
+        if len(batch) >= 5000:
+            store.put_many(batch)
+            batch = []
+    if batch:
+        store.put_many(batch)
+    return path
+
+
+def run_shards(path: str, n_shards: int, queries: int, n_users: int, seed: int) -> Dict[str, Any]:
+    store = SQLiteProfileStorage(path)
+    rng = random.Random(seed)
+    requesters = [store.get(f"synthetic_{rng.randrange(n_users):07d}") for _ in range(queries)]
+    features = [extract_features(profile_for_scoring(me)) for me in requesters]
+
+    t0 = time.perf_counter()
+    with ShardPool(n_shards, ("sqlite", path), trace_memory=True) as pool:
+        pool.wait_ready()
+        load_s = time.perf_counter() - t0
+
+        latencies: List[float] = []
+        slowest: List[float] = []
+        for me, f in zip(requesters, features):
+            t = time.perf_counter()
+            _, coverage = pool.top_k(f, me["user_id"], 10)
+            latencies.append((time.perf_counter() - t) * 1000.0)
+            slowest.append(max(coverage["shard_ms"]))
+        stats = pool.stats()
+
+    latencies.sort()
+    rss = [s["max_rss_kib"] for s in stats]
+    return {
+        "shards": n_shards,
+        "users": n_users,
+        "load_s": round(load_s, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "max_shard_ms": round(statistics.median(slowest), 2),
+        "candidates_per_shard": max(s["candidates"] for s in stats),
+        "shard_kib": max(s["loaded_kib"] for s in stats),
+        "rss_kib_mean": round(statistics.mean(rss)),
+        "rss_kib_max": max(rss),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded matching benchmark.")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--shards", default="1,2,4,8,16")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=9)
+    parser.add_argument("--json", help="also write rows as JSON")
+    args = parser.parse_args()
+
+    path = seed_sqlite(args.users, args.seed)
+    rows = []
+    for n in [int(x) for x in args.shards.split(",") if x.strip()]:
+        rows.append(run_shards(path, n, args.queries, args.users, args.seed))
+        print(f"shards={n} done")
+
+    print(f"\nusers={args.users:,}  queries={args.queries}  cores={os.cpu_count()}")
+    print(
+        f"{'shards':>6} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'max shard ms':>13} "
+        f"{'cands/shard':>12} {'heap KiB/shard':>15} {'rss KiB/shard':>14}"
+    )
+    for r in rows:
+        print(
+            f"{r['shards']:>6} {r['load_s']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['max_shard_ms']:>13} "
+            f"{r['candidates_per_shard']:>12,} {r['shard_kib']:>15,} {r['rss_kib_mean']:>14,}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: polling GET /matches for new matches - a full /matches each time
+vs ?since=<watermark> (only profiles updated since the last poll are
+scored, then merged into the previous top-k).
+
+Each round: one full /matches for the requester, a few profile writes
+(POST /taste-profile), then the same poll both ways. The incremental
+ranking is checked against the full one (same scores, best first).
+Reports p50/p95 per poll, how many candidates each one scored and how
+many ?since= polls fell back to a full /matches (counted in its latency).
+
+Run this from inside the 'lambda' folder with:
+    python bench_since.py
+    python bench_since.py --users 20000 --rounds 10 --writes 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+import handler  # noqa: E402
+from load_test import percentile, seed_store  # noqa: E402
+from score_cache import PairScoreCache  # noqa: E402
+from synthetic_profiles import SyntheticCatalog, generate_build_input  # noqa: E402
+
+
+def get_matches(user_id: str, limit: int, since: str = "") -> Tuple[float, Dict[str, Any]]:
+    qs = {"limit": str(limit)}
+    if since:
+        qs["since"] = since
+    event = {
+        "requestContext": {"http": {"method": "GET", "path": f"/matches/{user_id}"}},
+        "pathParameters": {"user_id": user_id},
+        "queryStringParameters": qs,
+    }
+    t0 = time.perf_counter()
+    resp = handler.lambda_handler(event, None)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    assert resp["statusCode"] == 200, resp
+    return elapsed, json.loads(resp["body"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full vs incremental (?since=) /matches polling benchmark.")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=10, help="profile writes between polls")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog = SyntheticCatalog(seed=args.seed)
+    handler.store = seed_store("memory", args.users, args.seed)
+    # Cold pair cache for both: each poll pays for the scoring it does
+    handler.pair_cache = PairScoreCache(0)
+    # Writes land synchronously here - no in-flight window to cover
+    handler.MATCHES_SINCE_SKEW_SECONDS = 0.0
+
+    times: Dict[str, List[float]] = {"full": [], "since": []}
+    scored: Dict[str, List[int]] = {"full": [], "since": []}
+    fallbacks = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.rounds):
+            user_id = f"synthetic_{rng.randrange(args.users):07d}"
+            _, first = get_matches(user_id, args.limit)
+
+            for _ in range(args.writes):
+                body = {
+                    "user_id": f"synthetic_{rng.randrange(args.users):07d}",
+                    "items": generate_build_input(rng, catalog, 10),
+                }
+                if body["user_id"] == user_id:
+                    continue
+                event = {"requestContext": {"http": {"method": "POST", "path": "/taste-profile"}}, "body": json.dumps(body)}
+                assert handler.lambda_handler(event, None)["statusCode"] == 200
+
+            ms, delta = get_matches(user_id, args.limit, since=first["watermark"])
+            times["since"].append(ms)
+            if not delta.get("incremental"):
+                # A write knocked a top-k member below the old cut-off: full /matches
+                fallbacks += 1
+                scored["since"].append(delta["candidates_covered"])
+                continue
+            scored["since"].append(delta["candidates_scored"])
+
+            ms, full = get_matches(user_id, args.limit)
+            times["full"].append(ms)
+            scored["full"].append(full["candidates_covered"])
+            assert [r["score"] for r in delta["ranking"]] == [m["score"] for m in full["matches"]], user_id
+
+    report: Dict[str, Any] = {
+        "users": args.users,
+        "rounds": args.rounds,
+        "writes_per_round": args.writes,
+        "since_fallbacks": fallbacks,
+    }
+    for name in ("full", "since"):
+        values = sorted(times[name])
+        report[name] = {
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "candidates_scored_mean": round(sum(scored[name]) / len(scored[name]), 1),
+        }
+    report["speedup_p50"] = round(report["full"]["p50_ms"] / max(report["since"]["p50_ms"], 1e-6), 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: friends-of-friends over social_graph.SocialGraph vs what it
+replaces - scanning the table and walking the "connections" lists - on a
+synthetic graph.
+
+Default: 100,000 users and ~1,000,000 directed edges. Out-degree is
+uniform-ish, targets are Zipf-skewed (a few very popular users). Reports
+build time, memory held by the graph, per-query p50/p95 for top-25 2-hop
+lookups (graph; scan + walk on the in-memory table; walk over lists
+already in memory) and add_edge throughput. All versions are checked to
+return the same candidates.
+
+Run this from inside the 'lambda' folder with:
+    python bench_social_graph.py
+    python bench_social_graph.py --users 200000 --edges 2000000 --queries 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List
+
+from load_test import percentile
+from social_graph import SocialGraph
+from storage import create_profile_storage
+from synthetic_profiles import ZipfSampler
+
+
+def make_items(n_users: int, n_edges: int, zipf_s: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    zipf = ZipfSampler(n_users, zipf_s)
+    # Shuffle so popular users aren't also the low ids
+    perm = list(range(n_users))
+    rng.shuffle(perm)
+    names = [f"user_{i:07d}" for i in range(n_users)]
+
+    avg = n_edges / n_users
+    items = []
+    for i in range(n_users):
+        degree = rng.randint(0, int(2 * avg))
+        targets = {perm[zipf.sample(rng)] for _ in range(degree)}
+        targets.discard(i)
+        items.append({"user_id": names[i], "connections": [names[t] for t in targets]})
+    return items
+
+
+def naive_fof(adj: Dict[str, List[str]], user_id: str) -> Counter:
+    direct = adj.get(user_id, [])
+    skip = set(direct)
+    skip.add(user_id)
+    counts: Counter = Counter()
+    for friend in direct:
+        for c in adj.get(friend, []):
+            if c not in skip:
+                counts[c] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Friends-of-friends graph benchmark.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--edges", type=int, default=1000000)
+    parser.add_argument("--zipf-s", type=float, default=0.8, help="skew of connection targets")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--scan-queries", type=int, default=3, help="queries for the scan-per-request baseline")
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+
+    items = make_items(args.users, args.edges, args.zipf_s, args.seed)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    graph = SocialGraph()
+    graph.load(items)
+    build_s = time.perf_counter() - t0
+    graph_kib = tracemalloc.get_traced_memory()[0] / 1024.0
+    tracemalloc.stop()
+
+    store = create_profile_storage("memory")
+    store.put_many(items)
+    adj = {it["user_id"]: it["connections"] for it in items}
+
+    rng = random.Random(args.seed)
+    users = [items[rng.randrange(args.users)]["user_id"] for _ in range(args.queries)]
+
+    def top(counts: Counter) -> List[Any]:
+        return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:25]
+
+    graph_ms: List[float] = []
+    lists_ms: List[float] = []
+    scan_ms: List[float] = []
+    candidates = 0
+    for q, user_id in enumerate(users):
+        t = time.perf_counter()
+        fof = graph.friends_of_friends(user_id, limit=25)
+        graph_ms.append((time.perf_counter() - t) * 1000.0)
+
+        t = time.perf_counter()
+        expected = top(naive_fof(adj, user_id))
+        lists_ms.append((time.perf_counter() - t) * 1000.0)
+        assert [(c, n) for c, n, _via in fof] == expected, user_id
+        candidates += len(fof)
+
+        if q < args.scan_queries:
+            t = time.perf_counter()
+            scanned = {it["user_id"]: it.get("connections") or [] for it in store.scan_all()}
+            assert top(naive_fof(scanned, user_id)) == expected
+            scan_ms.append((time.perf_counter() - t) * 1000.0)
+
+    edges = graph.stats()["edges"]
+    extra = [(items[rng.randrange(args.users)]["user_id"], items[rng.randrange(args.users)]["user_id"])
+             for _ in range(100000)]
+    t0 = time.perf_counter()
+    for a, b in extra:
+        graph.add_edge(a, b)
+    add_per_s = len(extra) / (time.perf_counter() - t0)
+
+    graph_ms.sort()
+    lists_ms.sort()
+    scan_ms.sort()
+    report = {
+        "users": args.users,
+        "edges": edges,
+        "build_s": round(build_s, 2),
+        "graph_kib": round(graph_kib),
+        "fof_returned_mean": round(candidates / len(users), 1),
+        "graph_p50_ms": round(percentile(graph_ms, 50), 3),
+        "graph_p95_ms": round(percentile(graph_ms, 95), 3),
+        "scan_and_walk_p50_ms": round(percentile(scan_ms, 50), 1),
+        "lists_in_memory_p50_ms": round(percentile(lists_ms, 50), 3),
+        "lists_in_memory_p95_ms": round(percentile(lists_ms, 95), 3),
+        "add_edge_per_s": round(add_per_s),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Accuracy/throughput benchmark for track_index.py.
+
+Builds a synthetic track vocabulary, injects realistic variants of each
+track (remaster/live/edit suffixes, feat. credits, casing/punctuation,
+one-character typos) and reports:
+  - recall: variants that land in their original track's cluster
+            (exact _norm matching is the baseline)
+  - precision: tracks whose cluster is made only of variants of one song
+  - build throughput (tracks/s) and match-time lookup cost (ns/track)
+
+Run this from inside the 'lambda' folder with:
+    python bench_track_index.py
+    python bench_track_index.py --tracks 50000 --variants 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+from matching import _norm
+from synthetic_profiles import SyntheticCatalog
+from track_index import TrackIndex
+
+_WORDS = (
+    "love night heart summer dance fire dream light baby girl boy city blue gold "
+    "rain star moon sun time world forever wild young crazy sweet lonely midnight "
+    "hype talking jump show game sugar ocean paper angel ghost river silver"
+).split()
+
+_SUFFIXES = [
+    " (Remastered 2011)",
+    " - 2011 Remaster",
+    " - Live",
+    " (Live at Wembley)",
+    " [Radio Edit]",
+    " - Single Version",
+    " (Acoustic)",
+    " (Taylor's Version)",
+]
+
+
+def _typo(rng: random.Random, title: str) -> str:
+    """Swap two adjacent letters inside one word of 5+ chars (if any)."""
+    words = title.split()
+    long_words = [i for i, w in enumerate(words) if len(w) >= 5]
+    if not long_words:
+        return title
+    i = rng.choice(long_words)
+    w = words[i]
+    j = rng.randrange(1, len(w) - 2)
+    words[i] = w[:j] + w[j + 1] + w[j] + w[j + 2 :]
+    return " ".join(words)
+
+
+def make_variant(rng: random.Random, title: str, artist: str, guest: str) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        title = title + rng.choice(_SUFFIXES)
+    elif kind == 1:
+        title = f"{title} (feat. {guest})"
+    elif kind == 2:
+        title = title.upper() if rng.random() < 0.5 else title + "!"
+    elif kind == 3:
+        title = _typo(rng, title)
+    else:
+        title = _typo(rng, title) + rng.choice(_SUFFIXES)
+    return f"{title} – {artist}"
+
+
+def build_corpus(n_tracks: int, variants: int, seed: int) -> List[Tuple[str, int]]:
+    """[(track string, true song id)], originals first then variants, shuffled."""
+    rng = random.Random(seed)
+    catalog = SyntheticCatalog(n_artists=max(50, n_tracks // 10), seed=seed)
+    songs = []
+    seen = set()
+    while len(songs) < n_tracks:
+        artist = catalog.artists[catalog.artist_zipf.sample(rng)]
+        title = " ".join(w.capitalize() for w in rng.sample(_WORDS, rng.randint(1, 3)))
+        if (title.lower(), artist) in seen:
+            continue
+        seen.add((title.lower(), artist))
+        songs.append((title, artist))
+
+    corpus: List[Tuple[str, int]] = [(f"{t} – {a}", sid) for sid, (t, a) in enumerate(songs)]
+    variant_rows: List[Tuple[str, int]] = []
+    for sid, (title, artist) in enumerate(songs):
+        for _ in range(variants):
+            guest = catalog.artists[rng.randrange(len(catalog.artists))]
+            variant_rows.append((make_variant(rng, title, artist, guest), sid))
+    rng.shuffle(variant_rows)
+    return corpus + variant_rows
+
+
+def evaluate(assign: Dict[str, object], corpus: List[Tuple[str, int]], n_songs: int) -> Dict[str, float]:
+    song_cluster = {sid: assign[_norm(t)] for t, sid in corpus[:n_songs]}
+    variants = corpus[n_songs:]
+    hits = sum(1 for t, sid in variants if assign[_norm(t)] == song_cluster[sid])
+
+    members: Dict[object, Counter] = defaultdict(Counter)
+    for t, sid in corpus:
+        members[assign[_norm(t)]][sid] += 1
+    pure = sum(sum(c.values()) for c in members.values() if len(c) == 1)
+
+    return {
+        "recall": round(hits / len(variants), 4) if variants else 1.0,
+        "precision": round(pure / len(corpus), 4),
+        "clusters": len(members),
+    }
+
+
+def run(n_tracks: int, variants: int, seed: int, threshold: float) -> Dict[str, object]:
+    corpus = build_corpus(n_tracks, variants, seed)
+    normed = [_norm(t) for t, _ in corpus]
+
+    exact = evaluate({t: t for t in normed}, corpus, n_tracks)
+
+    index = TrackIndex(threshold=threshold)
+    t0 = time.perf_counter()
+    index.add_all(normed)
+    build_s = time.perf_counter() - t0
+
+    canon = index.canonical_map()
+    t0 = time.perf_counter()
+    resolved = [canon.get(t, t) for t in normed]
+    lookup_ns = (time.perf_counter() - t0) / len(normed) * 1e9
+    trigram = evaluate(dict(zip(normed, resolved)), corpus, n_tracks)
+
+    return {
+        "tracks": len(corpus),
+        "songs": n_tracks,
+        "threshold": threshold,
+        "exact": exact,
+        "trigram_index": trigram,
+        "build_tracks_per_second": round(len(corpus) / build_s, 1),
+        "lookup_ns_per_track": round(lookup_ns, 1),
+        "index_stats": dict(index.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track near-duplicate index benchmark.")
+    parser.add_argument("--tracks", type=int, default=20000, help="distinct songs")
+    parser.add_argument("--variants", type=int, default=2, help="injected variants per song")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.tracks, args.variants, args.seed, args.threshold), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+bulk_import.py
+
+Bulk-load a cohort of taste profiles into the profiles table.
+
+Inputs (any mix):
+  - taste_profile_*.json files, as written by backend/save_taste_profile_locally.py
+  - an NDJSON stream: one record per line, either that same file shape or a
+    POST /taste-profile body ({"user_id": ..., "top_artists": [...], ...})
+
+Items are built exactly like POST /taste-profile (profile_items.build_profile_item),
+stamped with updated_day for the changed_since GSI (see storage.py) and
+written with batch_writer from a thread pool. batch_writer re-sends
+UnprocessedItems itself; chunks that still fail are retried with backoff.
+
+Re-importing a user overwrites their profile but keeps their "connections"
+(looked up with batch_get right before each chunk is written).
+
+Run this from inside the 'lambda' folder with:
+    python bulk_import.py ../data
+    python bulk_import.py --ndjson cohort.ndjson --workers 8
+    python bulk_import.py ../data --local          # in-memory table, no AWS
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from profile_items import build_profile_item, taste_profile_body
+from storage import DynamoProfileStorage, with_updated_day
+
+
+def record_from_saved_file(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a data/taste_profile_<user>.json document into a POST /taste-profile body.
+
+    Saved files hold the Flask-side profile:
+      {"user_id", "taste_profile": {"favorite_genres", "favorite_artists",
+                                    "sample_tracks": [{"name", "artist"}], ...}}
+    """
+    return {
+        "user_id": doc.get("user_id"),
+        "display_name": doc.get("display_name"),
+        "bio": doc.get("bio"),
+        **taste_profile_body(doc.get("taste_profile") or {}),
+    }
+
+
+def _as_record(doc: Any) -> Dict[str, Any]:
+    if not isinstance(doc, dict):
+        return {}
+    if isinstance(doc.get("taste_profile"), dict):
+        return record_from_saved_file(doc)
+    return doc
+
+
+def iter_records(paths: Iterable[str], ndjson: str | None = None) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "taste_profile_*.json"))) if os.path.isdir(path) else [path]
+        for fp in files:
+            with open(fp, "r", encoding="utf-8") as f:
+                yield _as_record(json.load(f))
+
+    if ndjson:
+        stream = sys.stdin if ndjson == "-" else open(ndjson, "r", encoding="utf-8")
+        try:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield _as_record(json.loads(line))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def build_items(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc).isoformat()
+    items: Dict[str, Dict[str, Any]] = {}
+    for rec in records:
+        user_id = rec.get("user_id")
+        if not isinstance(user_id, str) or not user_id.strip():
+            print(f"Skipping record without user_id: {str(rec)[:80]}")
+            continue
+        # Last record wins for duplicate user_ids (batch writes reject dup keys)
+        items[user_id] = build_profile_item(user_id.strip(), rec, now)
+    return list(items.values())
+
+
+def _keep_connections(store: DynamoProfileStorage, chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """chunk with each already-stored user's connections carried over."""
+    existing = store.batch_get(item["user_id"] for item in chunk)
+    out = []
+    for item in chunk:
+        connections = (existing.get(item["user_id"]) or {}).get("connections")
+        out.append(dict(item, connections=connections) if isinstance(connections, list) else item)
+    return out
+
+
+def _write_chunk(store: DynamoProfileStorage, chunk: List[Dict[str, Any]]) -> None:
+    chunk = _keep_connections(store, chunk)
+    with store.table.batch_writer(overwrite_by_pkeys=["user_id"]) as writer:
+        for item in chunk:
+            writer.put_item(Item=with_updated_day(item))
+
+
+def load_items(
+    table,
+    items: List[Dict[str, Any]],
+    workers: int = 4,
+    chunk_size: int = 100,
+    max_retries: int = 5,
+    base_delay: float = 0.2,
+    sleep: Callable[[float], None] = time.sleep,
+    resource=None,
+) -> Dict[str, Any]:
+    """
+    Write items in chunks across a thread pool. Returns a report dict with
+    items/second. Puts are idempotent, so retrying a whole chunk is safe.
+    resource (the boto3 DynamoDB resource) lets the connections lookup use
+    BatchGetItem instead of one GetItem per user.
+    """
+    store = DynamoProfileStorage(table, resource=resource)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    report = {"items": len(items), "chunks": len(chunks), "chunk_retries": 0, "failed_items": 0}
+
+    def run(chunk: List[Dict[str, Any]]) -> int:
+        for attempt in range(max_retries + 1):
+            try:
+                _write_chunk(store, chunk)
+                return attempt
+            except Exception as e:
+                if attempt >= max_retries:
+                    print(f"Chunk of {len(chunk)} failed after {attempt + 1} attempts: {e}")
+                    raise
+                sleep(base_delay * (2 ** attempt))
+        return max_retries
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [(chunk, pool.submit(run, chunk)) for chunk in chunks]
+        for chunk, fut in futures:
+            try:
+                report["chunk_retries"] += fut.result()
+            except Exception:
+                report["failed_items"] += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    written = report["items"] - report["failed_items"]
+    report["seconds"] = round(elapsed, 3)
+    report["items_per_second"] = round(written / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load taste profiles into the profiles table.")
+    parser.add_argument("paths", nargs="*", help="taste_profile_*.json files or folders containing them")
+    parser.add_argument("--ndjson", help="NDJSON file of records ('-' for stdin)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--local", action="store_true", help="write to an in-memory table stand-in")
+    args = parser.parse_args()
+
+    if not args.paths and not args.ndjson:
+        parser.error("give at least one path or --ndjson")
+
+    if args.local:
+        from local_table import LocalResource, LocalTable
+        from storage import UPDATED_INDEX
+
+        table = LocalTable(indexes={UPDATED_INDEX: ("updated_day", "updated_at")})
+        resource = LocalResource(table)
+    else:
+        from dynamo_client import dynamodb, get_profiles_table
+
+        table = get_profiles_table()
+        resource = dynamodb
+
+    items = build_items(iter_records(args.paths, args.ndjson))
+    report = load_items(table, items, workers=args.workers, chunk_size=args.chunk_size, resource=resource)
+
+    if args.local:
+        report["table_calls"] = dict(table.calls)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
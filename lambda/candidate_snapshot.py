@@ -0,0 +1,182 @@
+"""
+candidate_snapshot.py
+
+In-memory snapshot of the candidate set for GET /matches, refreshed with
+stale-while-revalidate semantics so a traffic spike doesn't turn into one
+full table scan per request.
+
+  age <= ttl                 serve the snapshot
+  ttl < age <= max_stale     serve the snapshot, start a background refresh
+  age > max_stale (or none)  wait for a refresh
+
+There is at most one refresh in flight per container: concurrent requests
+(threaded Flask, the IO pool) that need one all wait on the same load
+instead of each scanning the table. A failed background refresh keeps the
+old snapshot; the next request past the TTL tries again.
+
+Candidate features are extracted during the refresh, off the request path
+(and, with MATCH_INDEX=1, a match_index.MatchIndex built over them). A
+snapshot extracted under an older matching.scoring_version() is treated as
+missing.
+
+In Lambda the background thread is frozen between invocations, so a
+refresh started by one request finishes during the next ones - staleness
+is still bounded by max_stale.
+
+Env vars (handler):
+  CANDIDATE_SNAPSHOT_TTL_SECONDS        serve without refreshing for this long (default 0 = off, scan per request)
+  CANDIDATE_SNAPSHOT_MAX_STALE_SECONDS  never serve data older than this (default 60, at least the TTL)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import match_index
+from match_index import MatchIndex
+from matching import MatchFeatures, extract_features, scoring_version
+from profile_items import profile_for_scoring
+
+try:
+    TTL_SECONDS = float(os.environ.get("CANDIDATE_SNAPSHOT_TTL_SECONDS", "0"))
+except ValueError:
+    TTL_SECONDS = 0.0
+
+try:
+    MAX_STALE_SECONDS = float(os.environ.get("CANDIDATE_SNAPSHOT_MAX_STALE_SECONDS", "60"))
+except ValueError:
+    MAX_STALE_SECONDS = 60.0
+
+
+class Snapshot(NamedTuple):
+    items: List[Dict[str, Any]]
+    features: List[MatchFeatures]
+    loaded_at: float  # clock() when the load started, so age covers the scan itself
+    version: Any  # matching.scoring_version() the features were extracted under
+    index: Optional[MatchIndex] = None
+
+
+class CandidateSnapshot:
+    """
+    loader returns every stored item (e.g. store.scan_all). The snapshot's
+    lists are shared between requests and never mutated - treat them as
+    read-only.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[Dict[str, Any]]],
+        ttl_seconds: float = TTL_SECONDS,
+        max_stale_seconds: float = MAX_STALE_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        build_index: Optional[bool] = None,
+    ):
+        self.loader = loader
+        self.build_index = match_index.ENABLED if build_index is None else build_index
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max(max_stale_seconds, ttl_seconds)
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+        self._inflight: Optional[Future] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="candidate-refresh")
+        self._stats: Dict[str, Any] = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "blocking_waits": 0,
+            "coalesced_waits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "refresh_ms_total": 0.0,
+            "refresh_ms_last": 0.0,
+            "refresh_ms_max": 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    # -------------------------
+    # Refresh
+    # -------------------------
+    def _load(self) -> Snapshot:
+        started = self.clock()
+        version = scoring_version()
+        t0 = time.perf_counter()
+        try:
+            items = list(self.loader())
+            features = [extract_features(profile_for_scoring(it)) for it in items]
+            index = MatchIndex(features) if self.build_index else None
+            snap = Snapshot(items, features, started, version, index)
+        except Exception:
+            with self._lock:
+                self._stats["refresh_errors"] += 1
+                self._inflight = None
+            raise
+        ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self._snapshot = snap
+            self._inflight = None
+            self._stats["refreshes"] += 1
+            self._stats["refresh_ms_total"] += ms
+            self._stats["refresh_ms_last"] = ms
+            self._stats["refresh_ms_max"] = max(self._stats["refresh_ms_max"], ms)
+        return snap
+
+    def _start_refresh_locked(self) -> Future:
+        """Caller holds _lock. Returns the in-flight load, starting one if needed."""
+        if self._inflight is None:
+            self._inflight = self._executor.submit(self._load)
+        return self._inflight
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def get(self) -> Snapshot:
+        """Returns a snapshot no older than max_stale_seconds (may block on a load)."""
+        with self._lock:
+            snap = self._snapshot
+            # Features from before a genre/track table swap can't be reused
+            if snap is not None and snap.version == scoring_version():
+                age = self.clock() - snap.loaded_at
+                if age <= self.ttl_seconds:
+                    self._stats["fresh_hits"] += 1
+                    return snap
+                if age <= self.max_stale_seconds:
+                    self._start_refresh_locked()
+                    self._stats["stale_hits"] += 1
+                    return snap
+            if self._inflight is not None:
+                self._stats["coalesced_waits"] += 1
+            self._stats["blocking_waits"] += 1
+            pending = self._start_refresh_locked()
+        return pending.result()
+
+    def age_seconds(self) -> Optional[float]:
+        snap = self._snapshot
+        return None if snap is None else self.clock() - snap.loaded_at
+
+    def invalidate(self) -> None:
+        """Drop the snapshot: the next get() waits for a fresh load."""
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            snap = self._snapshot
+            out["refreshing"] = self._inflight is not None
+        out["candidates"] = len(snap.items) if snap is not None else 0
+        age = None if snap is None else self.clock() - snap.loaded_at
+        out["age_s"] = round(age, 3) if age is not None else None
+        out["refresh_ms_mean"] = round(out["refresh_ms_total"] / out["refreshes"], 2) if out["refreshes"] else 0.0
+        for key in ("refresh_ms_total", "refresh_ms_last", "refresh_ms_max"):
+            out[key] = round(out[key], 2)
+        out["ttl_s"] = self.ttl_seconds
+        out["max_stale_s"] = self.max_stale_seconds
+        return out
@@ -0,0 +1,168 @@
+"""
+genre_similarity.py
+
+Offline job: build a sparse genre-to-genre similarity table from how often
+genres co-occur in the same stored profile, so matching can give partial
+credit for related genres ("bedroom pop" ~ "pop", "k-pop" ~ "k-rap").
+
+similarity(a, b) = cooc(a, b) / sqrt(count(a) * count(b))     (Ochiai / cosine)
+
+Only the top_k neighbours per genre above min_similarity are kept. The
+table is saved as compact JSON:
+  {"version": 1, "genres": ["pop", ...], "neighbors": [[[j, sim], ...], ...]}
+
+At request time GenreSimilarity is pure integer lookups: genre names are
+mapped to ids once per profile (feature extraction), and scoring only does
+neighbors[id].get(other_id).
+
+Run this from inside the 'lambda' folder with:
+    python genre_similarity.py --out genre_similarity.json            # from PROFILE_STORE
+    python genre_similarity.py --synthetic 20000 --out /tmp/gs.json   # synthetic profiles
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import time
+from collections import Counter
+from itertools import combinations
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple
+
+from matching import _extract_genres
+
+FORMAT_VERSION = 1
+
+
+class GenreSimilarity:
+    def __init__(self, genres: List[str], neighbors: List[Dict[int, float]]):
+        self.genres = genres
+        self.ids: Dict[str, int] = {g: i for i, g in enumerate(genres)}
+        self.neighbors = neighbors
+
+    def __len__(self) -> int:
+        return len(self.genres)
+
+    def to_ids(self, genres: Iterable[str]) -> FrozenSet[int]:
+        """Normalized genre names -> ids (unknown genres are dropped)."""
+        ids = self.ids
+        return frozenset(ids[g] for g in genres if g in ids)
+
+    def similarity(self, a: int, b: int) -> float:
+        if a == b:
+            return 1.0
+        return self.neighbors[a].get(b, 0.0)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "genres": self.genres,
+            "neighbors": [sorted(([j, s] for j, s in n.items()), key=lambda js: -js[1]) for n in self.neighbors],
+        }
+
+    @classmethod
+    def from_json(cls, doc: Dict[str, Any]) -> "GenreSimilarity":
+        if doc.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported genre similarity version: {doc.get('version')}")
+        neighbors = [{int(j): float(s) for j, s in n} for n in doc["neighbors"]]
+        return cls(list(doc["genres"]), neighbors)
+
+    @classmethod
+    def load(cls, path: str) -> "GenreSimilarity":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, separators=(",", ":"), ensure_ascii=False)
+
+
+def build_genre_similarity(
+    profiles: Iterable[Dict[str, Any]],
+    top_k: int = 20,
+    min_similarity: float = 0.1,
+    min_cooccurrence: int = 2,
+) -> Tuple[GenreSimilarity, Dict[str, Any]]:
+    """
+    profiles: anything matching._extract_genres understands (stored 'profile'
+    maps, merged scoring profiles...). Returns (table, stats).
+    """
+    started = time.perf_counter()
+    counts: Counter = Counter()
+    cooc: Counter = Counter()
+    n_profiles = 0
+
+    for profile in profiles:
+        genres = sorted(_extract_genres(profile))
+        if not genres:
+            continue
+        n_profiles += 1
+        counts.update(genres)
+        cooc.update(combinations(genres, 2))
+
+    genres = sorted(counts)
+    ids = {g: i for i, g in enumerate(genres)}
+    candidates: List[List[Tuple[float, int]]] = [[] for _ in genres]
+
+    for (a, b), n in cooc.items():
+        if n < min_cooccurrence:
+            continue
+        sim = n / math.sqrt(counts[a] * counts[b])
+        if sim < min_similarity:
+            continue
+        ia, ib = ids[a], ids[b]
+        candidates[ia].append((sim, ib))
+        candidates[ib].append((sim, ia))
+
+    neighbors: List[Dict[int, float]] = []
+    for cands in candidates:
+        cands.sort(reverse=True)
+        neighbors.append({j: round(s, 4) for s, j in cands[:top_k]})
+
+    stats = {
+        "profiles": n_profiles,
+        "genres": len(genres),
+        "pairs_seen": len(cooc),
+        "edges_kept": sum(len(n) for n in neighbors),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    return GenreSimilarity(genres, neighbors), stats
+
+
+def _profiles_from_store():
+    from storage import create_profile_storage
+
+    store = create_profile_storage()
+    for item in store.scan_all():
+        profile = dict(item.get("profile") or {})
+        # Same merge the handler does for scoring
+        if isinstance(item.get("top_genres_preview"), list):
+            profile["top_genres_preview"] = item["top_genres_preview"]
+        yield profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the genre similarity table.")
+    parser.add_argument("--out", default="genre_similarity.json")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--min-similarity", type=float, default=0.1)
+    parser.add_argument("--min-cooccurrence", type=int, default=2)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic profiles instead of the store")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic_profiles import generate_items
+
+        profiles = (it["profile"] for it in generate_items(args.synthetic, seed=11))
+    else:
+        profiles = _profiles_from_store()
+
+    table, stats = build_genre_similarity(profiles, args.top_k, args.min_similarity, args.min_cooccurrence)
+    table.save(args.out)
+    stats["out"] = args.out
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
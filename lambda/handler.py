@@ -1,40 +1,174 @@
 from __future__ import annotations
 
+import contextvars
+import hashlib
 import json
 import os
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
-
-import boto3
-
-from build_taste_profile import build_taste_profile
-from matching import compute_match_score
-
-dynamodb = boto3.resource("dynamodb")
+import threading
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import metrics
+import profiling
+from candidate_snapshot import CandidateSnapshot
+from matching import MatchFeatures, extract_features, genre_match_mode, score_features, scoring_version
+from profile_items import (
+    build_profile_item,
+    item_fingerprint,
+    profile_for_scoring,
+    public_profile,
+    stored_content_hash,
+)
+from ranking import DEADLINE_CHECK_EVERY, match_entry, top_k_pruned
+from score_cache import PairScoreCache
+from storage import create_profile_storage
+from taste_clusters import PROBES as TASTE_CLUSTER_PROBES, taste_clusters
 
 TABLE_NAME = (
     os.environ.get("DDB_TABLE_NAME")
     or os.environ.get("TABLE_NAME")
     or "music-soulmate-profiles"
 )
-table = dynamodb.Table(TABLE_NAME)
+
+# PROFILE_STORE=dynamodb (default) | sqlite | memory - see storage.py
+store = create_profile_storage(table_name=TABLE_NAME)
 
 ALLOWED_ORIGIN = os.environ.get("ALLOWED_ORIGIN", "*")
 
+# Independent reads (requester lookup vs candidate scan, the two users in
+# /connect) run concurrently on this pool. Reused across warm invocations.
+# IO_OVERLAP=0 falls back to one-after-the-other reads.
+OVERLAP_IO = os.environ.get("IO_OVERLAP", "1") != "0"
+_io_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("IO_THREADS", "4")))
+
+
+# POST /taste-profiles/batch: most users accepted per call
+TASTE_PROFILE_BATCH_MAX = int(os.environ.get("TASTE_PROFILE_BATCH_MAX", "250") or 250)
+
+# Sharded scatter-gather /matches (see sharding.py). 0 = scan the table here.
+MATCH_SHARDS = int(os.environ.get("MATCH_SHARDS", "0") or 0)
+_shard_pool: Any = None
+
+# Connections adjacency for /recommendations (see social_graph.py), built
+# from one scan on first use and kept for warm invocations.
+_social_graph: Any = None
+_social_graph_lock = threading.Lock()
+
+# /recommendations: blend weight of graph proximity vs taste match (0-1), and
+# how many friends-of-friends (most mutual connections first) get scored
+try:
+    RECO_GRAPH_WEIGHT = min(1.0, max(0.0, float(os.environ.get("RECO_GRAPH_WEIGHT", "0.5"))))
+except ValueError:
+    RECO_GRAPH_WEIGHT = 0.5
+RECO_MAX_CANDIDATES = int(os.environ.get("RECO_MAX_CANDIDATES", "200") or 200)
+
+# /matches latency budget: ?budget_ms=N and/or the Lambda context's remaining
+# time minus this margin (time to encode + return the response). When it runs
+# out, the best matches found so far come back with "partial": true.
+MATCH_DEADLINE_MARGIN_MS = int(os.environ.get("MATCH_DEADLINE_MARGIN_MS", "300") or 300)
+MATCH_BUDGET_PAGE_SIZE = int(os.environ.get("MATCH_BUDGET_PAGE_SIZE", "200") or 200)
+# Without ?budget_ms, a remaining time above this only guards the scan: it
+# keeps full scan pages and the lookup/extraction overlap (a normal
+# invocation has seconds to spare). Below it, or with ?budget_ms, the scan
+# goes budget-first: small pages, scoring as soon as the requester is in.
+MATCH_TIGHT_BUDGET_MS = int(os.environ.get("MATCH_TIGHT_BUDGET_MS", "5000") or 5000)
+
+# GET /matches?since=<watermark>: full /matches responses carry a watermark
+# (their start time minus MATCHES_SINCE_SKEW_SECONDS, for writes still in
+# flight) plus their top-k. Polling with it scores only profiles updated
+# after it (store.changed_since) and merges them into that top-k. More than
+# MATCHES_SINCE_MAX_CHANGED changes falls back to a full /matches. The last
+# top-k per requester is also kept here, for ?since=<ISO timestamp>.
+try:
+    MATCHES_SINCE_SKEW_SECONDS = max(0.0, float(os.environ.get("MATCHES_SINCE_SKEW_SECONDS", "5")))
+except ValueError:
+    MATCHES_SINCE_SKEW_SECONDS = 5.0
+MATCHES_SINCE_MAX_CHANGED = int(os.environ.get("MATCHES_SINCE_MAX_CHANGED", "2000") or 2000)
+MATCHES_SINCE_CACHE_SIZE = int(os.environ.get("MATCHES_SINCE_CACHE_SIZE", "1024") or 1024)
+_since_tops: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_since_tops_lock = threading.Lock()
+
+# Pair scores keyed by profile fingerprints, reused across warm invocations
+# (PAIR_CACHE_MAX_ENTRIES, see score_cache.py)
+pair_cache = PairScoreCache()
+
+# Stale-while-revalidate candidate set with one refresh in flight per
+# container (CANDIDATE_SNAPSHOT_TTL_SECONDS, see candidate_snapshot.py).
+# Off by default: /matches scans the table per request.
+candidate_snapshot = CandidateSnapshot(lambda: store.scan_all())
+
+
+def _submit_io(fn: Callable[..., Any], *args: Any) -> Future:
+    if OVERLAP_IO:
+        # Run in the caller's context so metrics.current() is this request's
+        # (and a profiled request's profile includes the task)
+        ctx = contextvars.copy_context()
+        if profiling.ENABLED:
+            return _io_pool.submit(ctx.run, profiling.profile_pool_task, fn, *args)
+        return _io_pool.submit(ctx.run, fn, *args)
+    done: Future = Future()
+    try:
+        done.set_result(fn(*args))
+    except Exception as e:
+        done.set_exception(e)
+    return done
+
+
+def _cors_headers() -> Dict[str, str]:
+    return {
+        "Access-Control-Allow-Origin": ALLOWED_ORIGIN,
+        "Access-Control-Allow-Headers": "content-type,if-none-match",
+        "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
+        "Access-Control-Expose-Headers": "ETag",
+    }
+
+
+def _json_response(status_code: int, body: Any, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    m = metrics.current()
+    if m.in_response and isinstance(body, dict):
+        debug = dict(body.get("debug") or {})
+        debug["metrics"] = m.to_debug()
+        body = dict(body, debug=debug)
+
+    with m.stage("json_encode"):
+        encoded = json.dumps(body)
 
-def _json_response(status_code: int, body: Any) -> Dict[str, Any]:
     return {
         "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": ALLOWED_ORIGIN,
-            "Access-Control-Allow-Headers": "content-type",
-            "Access-Control-Allow-Methods": "GET,POST,OPTIONS",
-        },
-        "body": json.dumps(body),
+        "headers": {"Content-Type": "application/json", **_cors_headers(), **(headers or {})},
+        "body": encoded,
     }
 
 
+def _not_modified(etag: str) -> Dict[str, Any]:
+    return {"statusCode": 304, "headers": {**_cors_headers(), "ETag": etag}, "body": ""}
+
+
+def _get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    headers = event.get("headers") or {}
+    if isinstance(headers, dict):
+        for k, v in headers.items():
+            if isinstance(k, str) and k.lower() == name:
+                return v if isinstance(v, str) else None
+    return None
+
+
+def _etag(user_id: str, updated_at: str) -> str:
+    # updated_at changes on every real write; POST /taste-profile keeps it for no-op saves
+    return '"' + hashlib.sha1(f"{user_id}|{updated_at}".encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
 def _get_method_path(event: Dict[str, Any]) -> Tuple[str, str]:
     rc = event.get("requestContext", {}) or {}
     http = rc.get("http", {}) or {}
@@ -70,115 +204,204 @@ def _safe_int(val: Optional[str], default: int) -> int:
         return default
 
 
-def _scan_all_profiles(exclude_user_id: str) -> List[Dict[str, Any]]:
-    items: List[Dict[str, Any]] = []
-    scan_kwargs: Dict[str, Any] = {}
-
-    while True:
-        resp = table.scan(**scan_kwargs)
-        for it in resp.get("Items", []):
-            if it.get("user_id") != exclude_user_id:
-                items.append(it)
-
-        last_key = resp.get("LastEvaluatedKey")
-        if not last_key:
-            break
-        scan_kwargs["ExclusiveStartKey"] = last_key
-
-    return items
-
-
-def _artists_preview_from_profile(profile: Dict[str, Any], limit: int = 5) -> List[str]:
+def _scan_profile_pages(exclude_user_id: str, page_size: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
     """
-    Best-effort: extract artist names from a built taste profile.
-    Supports either:
-      - profile["top_artists"] as list[str]
-      - profile["top_artists"] as list[{"name": "..."}]
-      - profile["artists"] as list[str] or list[{"name": "..."}]
+    Yields scan pages. The next page is fetched in the background while the
+    caller works on the current one.
     """
-    for key in ("top_artists", "artists"):
-        val = profile.get(key)
-        if isinstance(val, list) and val:
-            first = val[0]
-            if isinstance(first, str):
-                return [x for x in val if isinstance(x, str) and x][:limit]
-            if isinstance(first, dict) and "name" in first:
-                names = [a.get("name") for a in val if isinstance(a, dict) and a.get("name")]
-                return names[:limit]
-    return []
+    pending = _submit_io(store.scan_page, None, page_size)
+    while True:
+        page, cursor = pending.result()
+        if cursor is not None:
+            pending = _submit_io(store.scan_page, cursor, page_size)
+        yield [it for it in page if it.get("user_id") != exclude_user_id]
+        if cursor is None:
+            return
 
 
-# -------------------------
-# Profiles: public helpers
-# -------------------------
-def _extract_genres_preview(profile: Dict[str, Any], limit: int = 5) -> List[str]:
+def _match_budget_ms(event: Dict[str, Any], context: Any) -> Tuple[Optional[int], bool]:
     """
-    Best-effort genre extraction from the stored 'profile' map.
-    Supports either:
-      - profile["top_genres"] as list[str]
-      - profile["genres"] as list[str]
-      - profile["genre_weights"] as dict[str, number] (sorted desc)
+    (smallest of ?budget_ms and the invocation's remaining time minus
+    margin, tight). None = no deadline. tight: ?budget_ms was given or the
+    budget is at most MATCH_TIGHT_BUDGET_MS.
     """
-    val = profile.get("top_genres")
-    if isinstance(val, list):
-        return [g for g in val if isinstance(g, str) and g][:limit]
-
-    val = profile.get("genres")
-    if isinstance(val, list):
-        return [g for g in val if isinstance(g, str) and g][:limit]
-
-    weights = profile.get("genre_weights")
-    if isinstance(weights, dict):
-        try:
-            items = sorted(
-                [(k, weights[k]) for k in weights.keys() if isinstance(k, str)],
-                key=lambda kv: float(kv[1]) if kv[1] is not None else 0.0,
-                reverse=True,
-            )
-            return [k for k, _ in items[:limit]]
-        except Exception:
-            return []
-
-    return []
+    budgets: List[int] = []
+    qs = event.get("queryStringParameters") or {}
+    requested = _safe_int(qs.get("budget_ms") if isinstance(qs, dict) else None, -1)
+    if requested >= 0:
+        budgets.append(requested)
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if callable(remaining):
+        budgets.append(max(0, int(remaining()) - MATCH_DEADLINE_MARGIN_MS))
+    if not budgets:
+        return None, False
+    budget = min(budgets)
+    return budget, requested >= 0 or budget <= MATCH_TIGHT_BUDGET_MS
 
 
-def _public_profile_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
-    profile = item.get("profile") if isinstance(item.get("profile"), dict) else {}
-    connections = item.get("connections")
-    if not isinstance(connections, list):
-        connections = []
+def _expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
 
-    return {
-        "user_id": item.get("user_id"),
-        "display_name": item.get("display_name") or item.get("user_id"),
-        "bio": item.get("bio") or "",
-        "top_artists_preview": item.get("top_artists_preview") or [],
-        "top_genres_preview": _extract_genres_preview(profile, limit=5),
-        "connections": connections,
-        "updated_at": item.get("updated_at") or "",
-    }
 
+class _PairScorer:
+    """
+    Scores the requester against candidates. rank_score goes through
+    pair_cache, which only keeps the two numbers ranking needs; score builds
+    the full breakdown, for the few candidates that make the response.
+    Features are only extracted on a cache miss (the requester's at most
+    once).
+    """
 
-def _profile_for_scoring(item: Dict[str, Any]) -> Dict[str, Any]:
+    def __init__(self, me: Dict[str, Any]):
+        self.me = me
+        self.me_fp = item_fingerprint(me)
+        self.version = scoring_version()
+        self._me_features: Optional[MatchFeatures] = None
+        self.hits = 0
+        self.misses = 0
+
+    def me_features(self) -> MatchFeatures:
+        if self._me_features is None:
+            self._me_features = extract_features(profile_for_scoring(self.me))
+        return self._me_features
+
+    def score(self, item: Dict[str, Any], features: Optional[MatchFeatures] = None) -> Dict[str, Any]:
+        if features is None:
+            features = extract_features(profile_for_scoring(item))
+        return score_features(self.me_features(), features)
+
+    def rank_score(self, item: Dict[str, Any], features: Optional[MatchFeatures] = None) -> Dict[str, Any]:
+        """At least match_score and raw_score (the full dict on a cache miss)."""
+        key = (self.version, self.me_fp, item_fingerprint(item))
+        cached = pair_cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return {"match_score": cached[0], "raw_score": cached[1]}
+        self.misses += 1
+        scored = self.score(item, features)
+        pair_cache.put(key, (scored["match_score"], scored["raw_score"]))
+        return scored
+
+
+def _top_matches(
+    scorer: _PairScorer,
+    items: List[Dict[str, Any]],
+    features: List[Optional[MatchFeatures]],
+    scores: List[Dict[str, Any]],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    rank_matches for rank_score results: best match_score first, ties in
+    scan order, full match entries for the top `limit` only. Stops at the
+    scored prefix when a deadline cut scoring short.
     """
-    Combine nested 'profile' (Day 3 taste profile) with item-level preview fields,
-    so matching.py can find artists/genres/tracks no matter where they're stored.
+    order = sorted(range(len(scores)), key=lambda i: -scores[i]["match_score"])[:limit]
+    return [match_entry(items[i], scorer.score(items[i], features[i])) for i in order]
+
+
+def _score_until(
+    scorer: _PairScorer,
+    others: List[Dict[str, Any]],
+    features: List[Optional[MatchFeatures]],
+    scores: List[Dict[str, Any]],
+    deadline: Optional[float],
+) -> bool:
+    """Scores others[len(scores):] in order. Returns False if the deadline hit first."""
+    for start in range(len(scores), len(others), DEADLINE_CHECK_EVERY):
+        if _expired(deadline):
+            return False
+        end = start + DEADLINE_CHECK_EVERY
+        scores += [scorer.rank_score(it, f) for it, f in zip(others[start:end], features[start:end])]
+    return True
+
+
+def _cluster_filter(
+    user_id: str, me_features: MatchFeatures, limit: int, exact: bool
+) -> Tuple[Optional[Callable[[str], bool]], Optional[List[int]]]:
     """
-    base = item.get("profile")
-    merged: Dict[str, Any] = base if isinstance(base, dict) else {}
+    (allowed(user_id), probed clusters) for the requester's nearest taste
+    clusters, or (None, None) for exact matching: no cluster file, ?exact=1,
+    or the probed clusters hold too few users to fill the limit.
+    """
+    clusters = None if exact or TASTE_CLUSTER_PROBES <= 0 else taste_clusters()
+    if clusters is None:
+        return None, None
+    probed = clusters.probe_clusters(user_id, me_features, TASTE_CLUSTER_PROBES)
+    allowed = clusters.allowed(probed)
+    if allowed.count <= limit:  # count includes the requester
+        metrics.current().incr("taste_cluster_fallback")
+        return None, None
+    return allowed, sorted(probed)
+
+
+def _watermark_at(seconds_ago: float = 0.0) -> str:
+    skewed = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago + MATCHES_SINCE_SKEW_SECONDS)
+    return skewed.isoformat()
+
+
+def _matches_watermark(user_id: str, at: str, limit: int, top: List[List[Any]]) -> str:
+    """Remembers the requester's top-k ([[user_id, score]]) and returns its ?since= token."""
+    state = {"u": user_id, "at": at, "limit": limit, "v": scoring_version(), "top": top[:limit]}
+    with _since_tops_lock:
+        _since_tops[user_id] = state
+        _since_tops.move_to_end(user_id)
+        while len(_since_tops) > MATCHES_SINCE_CACHE_SIZE:
+            _since_tops.popitem(last=False)
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _parse_since(user_id: str, since: str) -> Optional[Dict[str, Any]]:
+    """
+    ?since= value -> {"at", and "top"/"limit"/"v" when there's a previous
+    top-k to merge into}. A watermark token carries its own; for an ISO
+    timestamp it's this container's last top-k for the requester, if that's
+    no older than the timestamp. None = not a token or timestamp.
+    """
+    try:
+        state = json.loads(urlsafe_b64decode(since + "=" * (-len(since) % 4)))
+    except (ValueError, TypeError):
+        state = None
+    if isinstance(state, dict):
+        if state.get("u") != user_id or not isinstance(state.get("at"), str) or not isinstance(state.get("top"), list):
+            return None
+        return state
 
-    # Copy so we don't mutate the original
-    out: Dict[str, Any] = dict(merged)
+    try:
+        parsed = datetime.fromisoformat(since.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    at = parsed.astimezone(timezone.utc).isoformat()
+    with _since_tops_lock:
+        cached = _since_tops.get(user_id)
+    if cached is not None and cached["at"] >= at:
+        return dict(cached, at=at)
+    return {"at": at}
 
-    # Item-level previews (your UI uses these)
-    if isinstance(item.get("top_artists_preview"), list):
-        out["top_artists_preview"] = item.get("top_artists_preview") or []
 
-    # If you ever store genres preview at top-level, support it too
-    if isinstance(item.get("top_genres_preview"), list):
-        out["top_genres_preview"] = item.get("top_genres_preview") or []
+def _needs_backfill(existing: Dict[str, Any]) -> bool:
+    return not existing.get("content_hash") or not isinstance(existing.get("public_profile"), dict)
 
-    return out
+
+def _backfill_derived(existing: Dict[str, Any], item: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Item from before content hashes and/or the stored public_profile:
+    backfill what's missing once, without touching updated_at. Each write
+    is conditional on its attribute still being absent, so a concurrent
+    save wins. item (the freshly built one) supplies the hashes.
+    """
+    if item is not None and not existing.get("content_hash"):
+        store.update(
+            existing["user_id"],
+            {"content_hash": item["content_hash"], "features_fp": item["features_fp"]},
+            expected={"content_hash": None},
+        )
+    if not isinstance(existing.get("public_profile"), dict):
+        store.update(
+            existing["user_id"], {"public_profile": public_profile(existing)}, expected={"public_profile": None}
+        )
 
 
 def handle_post_taste_profile(event: Dict[str, Any]) -> Dict[str, Any]:
@@ -188,54 +411,198 @@ def handle_post_taste_profile(event: Dict[str, Any]) -> Dict[str, Any]:
     if not isinstance(user_id, str) or not user_id.strip():
         return _json_response(400, {"error": "Missing required field: user_id"})
 
-    profile = build_taste_profile(data)
-
-    display_name = data.get("display_name")
-    if not isinstance(display_name, str) or not display_name.strip():
-        display_name = user_id
-
-    bio = data.get("bio")
-    if not isinstance(bio, str):
-        bio = ""
-
-    top_preview = data.get("top_artists_preview")
-    if not isinstance(top_preview, list) or not all(isinstance(x, str) for x in top_preview):
-        top_preview = _artists_preview_from_profile(profile, limit=5)
-
+    m = metrics.current()
     now = datetime.now(timezone.utc).isoformat()
 
     # IMPORTANT: preserve existing "connections" if present
-    existing = table.get_item(Key={"user_id": user_id}).get("Item") or {}
-    connections = existing.get("connections")
-    if not isinstance(connections, list):
-        connections = []
+    with m.stage("requester_get"):
+        existing = store.get(user_id) or {}
+
+    with m.stage("build_profile"):
+        item = build_profile_item(user_id, data, now, connections=existing.get("connections"))
+
+    # Clients re-post the same profile on every app open. If nothing changed,
+    # don't write (and don't bump updated_at, which downstream caches key on).
+    unchanged = bool(existing) and stored_content_hash(existing) == item["content_hash"]
+    if unchanged:
+        m.incr("writes_skipped")
+        if _needs_backfill(existing):
+            with m.stage("write"):
+                _backfill_derived(existing, item)
+    else:
+        with m.stage("write"):
+            store.put(item)
 
-    table.put_item(
-        Item={
+    return _json_response(
+        200,
+        {
+            "message": "Profile unchanged" if unchanged else "Profile saved",
             "user_id": user_id,
-            "profile": profile,
-            "updated_at": now,
-            "display_name": display_name,
-            "bio": bio,
-            "top_artists_preview": top_preview,
-            "connections": connections,
-        }
+            "unchanged": unchanged,
+            "display_name": item["display_name"],
+            "bio": item["bio"],
+            "top_artists_preview": item["top_artists_preview"],
+            "connections": item["connections"],
+        },
     )
 
+
+def handle_post_taste_profiles_batch(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bulk onboarding: {"users": [<POST /taste-profile body>, ...]}.
+
+    One batch_get for the existing items (connections + content hashes), one
+    batched write for everything that changed. Per-user results come back in
+    request order; a bad entry doesn't fail the rest.
+    """
+    data = _read_json_body(event)
+    users = data.get("users")
+    if not isinstance(users, list) or not users:
+        return _json_response(400, {"error": "Missing required field: users (non-empty list)"})
+    if len(users) > TASTE_PROFILE_BATCH_MAX:
+        return _json_response(
+            400, {"error": f"Too many users in one batch: {len(users)} > {TASTE_PROFILE_BATCH_MAX}"}
+        )
+
+    m = metrics.current()
+    m.set_property("batch_size", len(users))
+    now = datetime.now(timezone.utc).isoformat()
+
+    results: List[Dict[str, Any]] = []
+    valid: Dict[str, int] = {}  # user_id -> index in results
+    for body in users:
+        user_id = body.get("user_id") if isinstance(body, dict) else None
+        if not isinstance(user_id, str) or not user_id.strip():
+            results.append({"user_id": None, "status": "error", "error": "Missing required field: user_id"})
+        elif user_id in valid:
+            results.append({"user_id": user_id, "status": "error", "error": "Duplicate user_id in batch"})
+        else:
+            valid[user_id] = len(results)
+            results.append({"user_id": user_id, "status": "pending"})
+
+    # IMPORTANT: preserve existing "connections", same as the single route
+    with m.stage("batch_get"):
+        existing = store.batch_get(valid)
+
+    to_write: List[Dict[str, Any]] = []
+    backfills: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    with m.stage("build_profile"):
+        for user_id, idx in valid.items():
+            old = existing.get(user_id) or {}
+            try:
+                item = build_profile_item(user_id, users[idx], now, connections=old.get("connections"))
+            except Exception as e:
+                results[idx] = {"user_id": user_id, "status": "error", "error": f"Could not build profile: {e}"}
+                continue
+            if old and stored_content_hash(old) == item["content_hash"]:
+                results[idx]["status"] = "unchanged"
+                if _needs_backfill(old):
+                    backfills.append((old, item))
+            else:
+                results[idx]["status"] = "saved"
+                to_write.append(item)
+
+    with m.stage("write"):
+        if to_write:
+            store.put_many(to_write)
+        for old, item in backfills:
+            _backfill_derived(old, item)
+
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("saved", "unchanged", "error")}
+    m.incr("profiles_saved", counts["saved"])
+    m.incr("writes_skipped", counts["unchanged"])
+    m.incr("batch_errors", counts["error"])
+
     return _json_response(
         200,
         {
-            "message": "Profile saved",
-            "user_id": user_id,
-            "display_name": display_name,
-            "bio": bio,
-            "top_artists_preview": top_preview,
-            "connections": connections,
+            "message": "Batch processed",
+            "count": len(results),
+            **counts,
+            "results": results,
         },
     )
 
 
-def handle_get_matches(event: Dict[str, Any]) -> Dict[str, Any]:
+def _get_shard_pool() -> Any:
+    """Started on first use and kept for warm invocations."""
+    global _shard_pool
+    if _shard_pool is None:
+        from sharding import ShardPool
+
+        if store.name == "sqlite":
+            source: Tuple[str, Any] = ("sqlite", store.path)
+        elif store.name == "dynamodb":
+            source = ("dynamodb", TABLE_NAME)
+        else:
+            # In-memory store can't be opened from another process: ship a snapshot
+            source = ("items", list(store.scan_all()))
+        _shard_pool = ShardPool(MATCH_SHARDS, source)
+    return _shard_pool
+
+
+def _handle_get_matches_sharded(
+    user_id: str, limit: int, deadline: Optional[float] = None, since_requested: bool = False
+) -> Dict[str, Any]:
+    """
+    Scatter-gather /matches. ?since= isn't supported here (shards keep no
+    per-requester top-k): the full result comes back flagged
+    "incremental": false with the reason.
+    """
+    m = metrics.current()
+    if since_requested:
+        m.incr("matches_since_fallback")
+        m.set_property("matches_since_fallback_reason", "sharded")
+    with m.stage("requester_get"):
+        me = store.get(user_id)
+    if not me:
+        return _json_response(404, {"error": f"No profile found for {user_id}"})
+
+    with m.stage("feature_extraction"):
+        me_features = extract_features(profile_for_scoring(me))
+
+    pool = _get_shard_pool()
+    with m.stage("scatter_gather"):
+        matches, coverage = pool.top_k(me_features, user_id, limit, deadline)
+    m.incr("shards", pool.n_shards)
+    if coverage["partial"]:
+        m.incr("matches_partial")
+
+    body: Dict[str, Any] = {
+        "debug": {
+            "matches_handler_version": "week6-day4-explain-v1",
+            "table": TABLE_NAME,
+            "store": store.name,
+            "genre_match_mode": genre_match_mode(),
+            "shards": pool.n_shards,
+            "shard_ms": [round(ms, 3) for ms in coverage["shard_ms"]],
+            "shards_missing": coverage["missing_shards"],
+        },
+        "for_user_id": user_id,
+        "limit": limit,
+        "matches": matches,
+        "partial": coverage["partial"],
+        "candidates_covered": coverage["covered"],
+    }
+    if since_requested:
+        body["incremental"] = False
+        body["incremental_fallback_reason"] = "sharded"
+    return _json_response(200, body)
+
+
+def _get_social_graph() -> Any:
+    global _social_graph
+    with _social_graph_lock:
+        if _social_graph is None:
+            from social_graph import SocialGraph
+
+            graph = SocialGraph()
+            graph.load(store.scan_all())
+            _social_graph = graph
+    return _social_graph
+
+
+def handle_get_recommendations(event: Dict[str, Any]) -> Dict[str, Any]:
     user_id = _get_path_param(event, "user_id")
     if not user_id:
         return _json_response(400, {"error": "Missing path param: user_id"})
@@ -244,55 +611,370 @@ def handle_get_matches(event: Dict[str, Any]) -> Dict[str, Any]:
     limit = _safe_int(qs.get("limit") if isinstance(qs, dict) else None, 10)
     limit = max(1, min(limit, 25))
 
-    print(f"Computing matches for user_id={user_id}, limit={limit}")
-
-    me = table.get_item(Key={"user_id": user_id}).get("Item")
+    m = metrics.current()
+    m.set_property("user_id", user_id)
+    m.set_property("limit", limit)
+
+    me_future = _submit_io(store.get, user_id)
+    with m.stage("graph"):
+        graph = _get_social_graph()
+        # Off the request path; this request uses the graph as it is
+        if store.time_indexed and graph.refresh_due():
+            _submit_io(graph.refresh, store)
+        fof = graph.friends_of_friends(user_id, limit=RECO_MAX_CANDIDATES)
+    with m.stage("requester_get"):
+        me = me_future.result()
     if not me:
         return _json_response(404, {"error": f"No profile found for {user_id}"})
 
-    me_profile = me.get("profile", {})
-    me_for_scoring = _profile_for_scoring(me)
+    with m.stage("candidate_load"):
+        items = store.batch_get(c for c, _n, _via in fof)
+
+    # Graph proximity = mutual connections relative to the best candidate's
+    scorer = _PairScorer(me)
+    max_mutual = max((n for _c, n, _via in fof), default=0)
+    ranked: List[Tuple[int, int, str, Dict[str, Any], List[str]]] = []
+    with m.stage("scoring"):
+        for candidate, mutual, via in fof:
+            it = items.get(candidate)
+            if not it:
+                continue
+            proximity = mutual / max_mutual
+            percent = scorer.rank_score(it)["match_score"]
+            score = int(round(RECO_GRAPH_WEIGHT * proximity * 100 + (1.0 - RECO_GRAPH_WEIGHT) * percent))
+            ranked.append((-score, -mutual, candidate, it, via))
+        ranked.sort(key=lambda r: r[:3])
+
+        recommendations: List[Dict[str, Any]] = []
+        for neg_score, neg_mutual, _candidate, it, via in ranked[:limit]:
+            entry = match_entry(it, scorer.score(it))
+            entry["mutual_connections"] = -neg_mutual
+            entry["via"] = via
+            entry["graph_proximity"] = round(-neg_mutual / max_mutual, 3)
+            entry["recommendation_score"] = -neg_score
+            recommendations.append(entry)
+    m.incr("candidates_scored", len(ranked))
+    m.incr("pair_cache_hits", scorer.hits)
+    m.incr("pair_cache_misses", scorer.misses)
 
-    others = _scan_all_profiles(exclude_user_id=user_id)
-    print(f"Scanned {len(others)} other profiles from table={TABLE_NAME}")
+    return _json_response(
+        200,
+        {
+            "debug": {
+                "table": TABLE_NAME,
+                "store": store.name,
+                "graph_weight": RECO_GRAPH_WEIGHT,
+                "friends_of_friends": len(fof),
+                "social_graph": graph.stats(),
+            },
+            "for_user_id": user_id,
+            "limit": limit,
+            "recommendations": recommendations,
+        },
+    )
 
-    matches = []
-    for it in others:
-        other_for_scoring = _profile_for_scoring(it)
 
-        scored = compute_match_score(me_for_scoring, other_for_scoring)
+def _handle_get_matches_snapshot(
+    user_id: str, limit: int, deadline: Optional[float] = None, exact: bool = False
+) -> Dict[str, Any]:
+    m = metrics.current()
+    me_future = _submit_io(store.get, user_id)
+    with m.stage("candidate_load"):
+        snap = candidate_snapshot.get()
+    # Writes after the snapshot loaded show up in a later ?since= poll
+    watermark_at = _watermark_at(candidate_snapshot.age_seconds() or 0.0)
+    with m.stage("requester_get"):
+        me = me_future.result()
+    if not me:
+        return _json_response(404, {"error": f"No profile found for {user_id}"})
 
-        shared_artists = scored.get("shared_artists", []) or []
-        shared_genres = scored.get("shared_genres", []) or []
+    # Features are already in the snapshot, so candidates that can't reach
+    # the top `limit` are skipped from set sizes alone (ranking.top_k_pruned).
+    # Highest bounds are visited first, which is also the order a deadline
+    # cuts off at. With a match index (exact genre mode only) candidates come
+    # from its postings instead - same result, a few ms.
+    scorer = _PairScorer(me)
+    me_features = scorer.me_features()
+    allowed, probed = _cluster_filter(user_id, me_features, limit, exact)
+    index = snap.index if snap.index is not None and not snap.index.soft and not me_features.genre_ids else None
+
+    def score(i: int) -> Dict[str, Any]:
+        return scorer.rank_score(snap.items[i], snap.features[i])
+
+    def excluded(i: int) -> bool:
+        other_id = snap.items[i].get("user_id")
+        return other_id == user_id or (allowed is not None and not allowed(other_id))
+
+    with m.stage("scoring"):
+        if index is not None:
+            ranked, pruning = index.top_k(me_features, limit, score, exclude=excluded)
+        else:
+            ranked, pruning = top_k_pruned(
+                me_features, snap.features, limit, score=score, exclude=excluded, deadline=deadline
+            )
+    m.incr("candidates_loaded", len(snap.items))
+    if index is None:
+        m.incr("candidates_cluster_skipped", max(0, len(snap.items) - 1 - pruning["candidates"]))
+    m.incr("candidates_scored", pruning["scored"])
+    m.incr("candidates_pruned", pruning["pruned"])
+    if pruning["partial"]:
+        m.incr("matches_partial")
+    m.incr("pair_cache_hits", scorer.hits)
+    m.incr("pair_cache_misses", scorer.misses)
+    m.set_property("candidate_snapshot_age_ms", round((candidate_snapshot.age_seconds() or 0.0) * 1000.0, 1))
+
+    with m.stage("ranking"):
+        matches = [match_entry(snap.items[i], scorer.score(snap.items[i], snap.features[i])) for i, _s in ranked]
 
-        matches.append(
-            {
-                "user_id": it["user_id"],
-                "display_name": it.get("display_name") or it["user_id"],
-                "bio": it.get("bio") or "",
-                "top_artists_preview": it.get("top_artists_preview") or [],
-                # Keep existing "score" for UI compatibility (now capped 0-100)
-                "score": scored.get("match_score", 0),
+    return _json_response(
+        200,
+        {
+            "debug": {
+                "matches_handler_version": "week6-day4-explain-v1",
+                "table": TABLE_NAME,
+                "store": store.name,
+                "genre_match_mode": genre_match_mode(),
+                "pair_cache": pair_cache.stats(),
+                "candidate_snapshot": candidate_snapshot.stats(),
+                "match_index": index is not None,
+                "taste_clusters_probed": probed,
+            },
+            "for_user_id": user_id,
+            "limit": limit,
+            "matches": matches,
+            "partial": bool(pruning["partial"]),
+            "candidates_covered": pruning["covered"],
+            "watermark": None if pruning["partial"] else _matches_watermark(
+                user_id, watermark_at, limit, [[mt["user_id"], mt["score"]] for mt in matches]
+            ),
+        },
+    )
 
-                # NEW Day 1 fields
-                "raw_score": scored.get("raw_score", scored.get("match_score", 0)),
-                "match_percent": scored.get("match_percent", scored.get("match_score", 0)),
 
-                "shared_artist_count": len(shared_artists),
-                "shared_artists": shared_artists,
+def _handle_get_matches_since(
+    user_id: str, limit: int, since: Dict[str, Any], exact: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Scores only candidates updated after since["at"] and merges them into
+    the previous top-k. None when that can't give the full /matches result
+    (requester or scoring changed, a previous top-k member fell below the
+    old cut-off, a bigger limit, too many changes) - the caller then runs a
+    full /matches.
+    """
+    m = metrics.current()
+    at = since["at"]
+    top: Optional[List[List[Any]]] = since.get("top")
+
+    def fallback(reason: str) -> None:
+        m.incr("matches_since_fallback")
+        m.set_property("matches_since_fallback_reason", reason)
+        return None
+
+    if top is not None and since.get("v") != scoring_version():
+        return fallback("scoring_version")
+    if top is not None and limit > int(since.get("limit") or 0):
+        return fallback("limit")
+
+    watermark_at = _watermark_at()
+    me_future = _submit_io(store.get, user_id)
+    with m.stage("candidate_load"):
+        changed = store.changed_since(at, limit=MATCHES_SINCE_MAX_CHANGED + 1)
+    with m.stage("requester_get"):
+        me = me_future.result()
+    if not me:
+        return _json_response(404, {"error": f"No profile found for {user_id}"})
+    if str(me.get("updated_at") or "") > at:
+        return fallback("requester_changed")
+    if len(changed) > MATCHES_SINCE_MAX_CHANGED:
+        return fallback("too_many_changes")
+
+    scorer = _PairScorer(me)
+    allowed, probed = _cluster_filter(user_id, scorer.me_features(), limit, exact)
+    candidates = [
+        it for it in changed
+        if it.get("user_id") != user_id and (allowed is None or allowed(it.get("user_id")))
+    ]
+    with m.stage("scoring"):
+        new = {it["user_id"]: (it, scorer.rank_score(it)) for it in candidates}
+
+    with m.stage("ranking"):
+        # Candidates that haven't changed can't have moved: anyone outside the
+        # previous top-k still scores at most its lowest score. Ties keep the
+        # previous entries first, then changed ones in update order.
+        ranking = [(it["user_id"], scored.get("match_score", 0), 1) for it, scored in new.values()]
+        if top is not None:
+            full = len(top) >= int(since.get("limit") or 0)
+            floor = min((score for _uid, score in top), default=0)
+            changed_ids = {it.get("user_id") for it in changed}
+            for uid, score in top:
+                if uid in changed_ids:
+                    now = new.get(uid)
+                    if now is None or (full and now[1].get("match_score", 0) < floor):
+                        return fallback("top_k_dropped")
+            ranking += [(uid, score, 0) for uid, score in top if uid not in new]
+        ranking.sort(key=lambda e: (-e[1], e[2]))
+        ranking = ranking[:limit]
+        kept = {uid for uid, _score, _changed in ranking}
+        matches = [match_entry(new[uid][0], scorer.score(new[uid][0])) for uid, _score, is_new in ranking if is_new]
+
+    m.incr("candidates_loaded", len(changed))
+    m.incr("candidates_scored", len(new))
+    m.incr("pair_cache_hits", scorer.hits)
+    m.incr("pair_cache_misses", scorer.misses)
+
+    next_at = max(at, watermark_at)
+    top_k = [[uid, score] for uid, score, _changed in ranking]
+    return _json_response(
+        200,
+        {
+            "debug": {
+                "matches_handler_version": "week6-day4-explain-v1",
+                "table": TABLE_NAME,
+                "store": store.name,
+                "genre_match_mode": genre_match_mode(),
+                "pair_cache": pair_cache.stats(),
+                "taste_clusters_probed": probed,
+            },
+            "for_user_id": user_id,
+            "limit": limit,
+            "incremental": True,
+            "since": at,
+            "merged": top is not None,
+            "matches": matches,
+            "ranking": [{"user_id": uid, "score": score} for uid, score in top_k],
+            "dropped": [uid for uid, _score in top or [] if uid not in kept],
+            "candidates_scored": len(new),
+            # Without a previous top-k, the next poll is another plain timestamp
+            "watermark": _matches_watermark(user_id, next_at, limit, top_k) if top is not None else next_at,
+        },
+    )
+
+
+def handle_get_matches(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
+    user_id = _get_path_param(event, "user_id")
+    if not user_id:
+        return _json_response(400, {"error": "Missing path param: user_id"})
 
-                # ✅ Day 3 addition
-                "shared_genre_count": len(shared_genres),
-                "shared_genres": shared_genres,
+    qs = event.get("queryStringParameters") or {}
+    limit = _safe_int(qs.get("limit") if isinstance(qs, dict) else None, 10)
+    limit = max(1, min(limit, 25))
 
-                "shared_tracks": scored.get("shared_tracks", []) or [],
+    m = metrics.current()
+    m.set_property("user_id", user_id)
+    m.set_property("limit", limit)
+
+    budget_ms, tight = _match_budget_ms(event, context)
+    deadline = None if budget_ms is None else time.monotonic() + budget_ms / 1000.0
+    if budget_ms is not None:
+        m.set_property("budget_ms", budget_ms)
+
+    # ?exact=1 scores every candidate even when taste clusters are loaded
+    exact = isinstance(qs, dict) and str(qs.get("exact", "")).lower() in ("1", "true")
+
+    # ?since=<watermark> from an earlier response: only what changed since
+    since = qs.get("since") if isinstance(qs, dict) else None
+    if since:
+        state = _parse_since(user_id, since)
+        if state is None:
+            return _json_response(400, {"error": "since must be a watermark from /matches or an ISO timestamp"})
+        if MATCH_SHARDS <= 0:
+            incremental = _handle_get_matches_since(user_id, limit, state, exact)
+            if incremental is not None:
+                return incremental
+
+    if MATCH_SHARDS > 0:
+        return _handle_get_matches_sharded(user_id, limit, deadline, since_requested=bool(since))
+    if candidate_snapshot.enabled:
+        return _handle_get_matches_snapshot(user_id, limit, deadline, exact)
+
+    watermark_at = _watermark_at()
+
+    # The requester lookup and the candidate scan don't depend on each other:
+    # start the lookup and scan pages meanwhile. Scoring goes through the pair
+    # cache, which only extracts features on a miss - so with the cache on we
+    # wait for the requester once the first page is in; with it off, candidate
+    # features are extracted while the lookup is still in flight. With a
+    # tight budget, extraction happens inside the (deadline-checked) scoring
+    # instead; with any deadline, past it no more pages are loaded or scored.
+    # With taste clusters, candidates outside the requester's nearest
+    # clusters are dropped as their pages arrive (the first page once the
+    # requester is known), before any scoring.
+    me_future = _submit_io(store.get, user_id)
+    me: Optional[Dict[str, Any]] = None
+    scorer: Optional[_PairScorer] = None
+    allowed: Optional[Callable[[str], bool]] = None
+    probed: Optional[List[int]] = None
+
+    others: List[Dict[str, Any]] = []
+    other_features: List[Optional[MatchFeatures]] = []
+    scores: List[Dict[str, Any]] = []
+    loaded = 0
+    partial = False
+
+    def keep_allowed() -> None:
+        kept = [(it, f) for it, f in zip(others, other_features) if allowed(it.get("user_id"))]
+        others[:] = [it for it, _f in kept]
+        other_features[:] = [f for _it, f in kept]
+
+    # Smaller pages under a tight budget: a page in flight can't be cut short
+    pages = _scan_profile_pages(user_id, MATCH_BUDGET_PAGE_SIZE if tight else None)
+    while True:
+        if scorer is None and (me_future.done() or (others and (pair_cache.enabled or tight))):
+            with m.stage("requester_get"):
+                me = me_future.result()
+            if not me:
+                return _json_response(404, {"error": f"No profile found for {user_id}"})
+            scorer = _PairScorer(me)
+            allowed, probed = _cluster_filter(user_id, scorer.me_features(), limit, exact)
+            if allowed is not None:
+                keep_allowed()
+
+        if scorer is not None and len(scores) < len(others):
+            with m.stage("scoring"):
+                partial = not _score_until(scorer, others, other_features, scores, deadline)
+
+        if partial or _expired(deadline):
+            partial = True
+            break
+        with m.stage("candidate_load"):
+            page = next(pages, None)
+        if page is None:
+            break
+        loaded += len(page)
+        if allowed is not None:
+            page = [it for it in page if allowed(it.get("user_id"))]
+        others += page
+        if scorer is None and not pair_cache.enabled and not tight:
+            with m.stage("feature_extraction"):
+                other_features += [extract_features(profile_for_scoring(it)) for it in page]
+        else:
+            other_features += [None] * len(page)
+
+    if scorer is None:
+        with m.stage("requester_get"):
+            me = me_future.result()
+        if not me:
+            return _json_response(404, {"error": f"No profile found for {user_id}"})
+        scorer = _PairScorer(me)
+        allowed, probed = _cluster_filter(user_id, scorer.me_features(), limit, exact)
+        if allowed is not None:
+            keep_allowed()
+
+    if not partial:
+        with m.stage("scoring"):
+            partial = not _score_until(scorer, others, other_features, scores, deadline)
+    m.incr("candidates_loaded", loaded)
+    m.incr("candidates_cluster_skipped", loaded - len(others))
+    m.incr("candidates_scored", len(scores))
+    if partial:
+        m.incr("matches_partial")
+    m.incr("pair_cache_hits", scorer.hits)
+    m.incr("pair_cache_misses", scorer.misses)
 
-                # ✅ Week 6 Day 4: explain breakdown
-                "explain": scored.get("explain"),
-            }
-        )
+    me_profile = me.get("profile", {})
 
-    matches.sort(key=lambda m: m["score"], reverse=True)
+    with m.stage("ranking"):
+        matches = _top_matches(scorer, others, other_features, scores, limit)
 
     return _json_response(
         200,
@@ -300,12 +982,22 @@ def handle_get_matches(event: Dict[str, Any]) -> Dict[str, Any]:
             "debug": {
                 "matches_handler_version": "week6-day4-explain-v1",
                 "table": TABLE_NAME,
+                "store": store.name,
+                "genre_match_mode": genre_match_mode(),
+                "pair_cache": pair_cache.stats(),
                 "me_profile_keys": sorted(list(me_profile.keys())) if isinstance(me_profile, dict) else [],
                 "me_top_artists_preview_count": len(me.get("top_artists_preview") or []),
+                "taste_clusters_probed": probed,
             },
             "for_user_id": user_id,
             "limit": limit,
-            "matches": matches[:limit],
+            "matches": matches,
+            "partial": partial,
+            "candidates_covered": len(scores),
+            "budget_ms": budget_ms,
+            "watermark": None if partial else _matches_watermark(
+                user_id, watermark_at, limit, [[mt["user_id"], mt["score"]] for mt in matches]
+            ),
         },
     )
 
@@ -315,12 +1007,33 @@ def handle_get_profile(event: Dict[str, Any]) -> Dict[str, Any]:
     if not user_id:
         return _json_response(400, {"error": "Missing path param: user_id"})
 
-    resp = table.get_item(Key={"user_id": user_id})
-    item = resp.get("Item")
-    if not item:
+    m = metrics.current()
+    # Only the small precomputed projection, not the nested profile
+    # (user_id keeps the result non-empty for items without the projection)
+    with m.stage("get"):
+        item = store.get(user_id, ["user_id", "public_profile", "updated_at"])
+    if item is None:
         return _json_response(404, {"error": f"User not found: {user_id}"})
 
-    return _json_response(200, _public_profile_from_item(item))
+    public = item.get("public_profile")
+    if not isinstance(public, dict):
+        # Written before public_profile existed: build it from the full item
+        # and store it, so the next GET reads the projection
+        m.incr("public_profile_fallback")
+        with m.stage("get"):
+            full = store.get(user_id)
+        if not full:
+            return _json_response(404, {"error": f"User not found: {user_id}"})
+        public = public_profile(full)
+        with m.stage("write"):
+            _backfill_derived(full)
+
+    etag = _etag(user_id, str(public.get("updated_at") or item.get("updated_at") or ""))
+    if _etag_matches(_get_header(event, "if-none-match"), etag):
+        m.incr("not_modified")
+        return _not_modified(etag)
+
+    return _json_response(200, public, headers={"ETag": etag})
 
 
 # -------------------------
@@ -365,12 +1078,18 @@ def handle_post_connect(event: Dict[str, Any]) -> Dict[str, Any]:
     if from_user_id == to_user_id:
         return _json_response(400, {"error": "Cannot connect to yourself"})
 
-    # Ensure both users exist
-    from_item = table.get_item(Key={"user_id": from_user_id}).get("Item")
+    m = metrics.current()
+
+    # Ensure both users exist (both lookups in flight at once)
+    with m.stage("requester_get"):
+        from_future = _submit_io(store.get, from_user_id)
+        to_future = _submit_io(store.get, to_user_id, ["user_id"])
+        from_item = from_future.result()
+        to_item = to_future.result()
+
     if not from_item:
         return _json_response(404, {"error": f"from_user_id not found: {from_user_id}"})
 
-    to_item = table.get_item(Key={"user_id": to_user_id}).get("Item")
     if not to_item:
         return _json_response(404, {"error": f"to_user_id not found: {to_user_id}"})
 
@@ -393,15 +1112,12 @@ def handle_post_connect(event: Dict[str, Any]) -> Dict[str, Any]:
     now = datetime.now(timezone.utc).isoformat()
     new_connections = existing + [to_user_id]
 
-    # Update only the needed fields
-    table.update_item(
-        Key={"user_id": from_user_id},
-        UpdateExpression="SET connections = :c, updated_at = :u",
-        ExpressionAttributeValues={
-            ":c": new_connections,
-            ":u": now,
-        },
-    )
+    # Update only the needed fields (+ the public projection, which shows connections)
+    public = public_profile(dict(from_item, connections=new_connections, updated_at=now))
+    with m.stage("write"):
+        store.update(from_user_id, {"connections": new_connections, "updated_at": now, "public_profile": public})
+    if _social_graph is not None:
+        _social_graph.add_edge(from_user_id, to_user_id)
 
     return _json_response(
         200,
@@ -415,27 +1131,70 @@ def handle_post_connect(event: Dict[str, Any]) -> Dict[str, Any]:
     )
 
 
-def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    method, path = _get_method_path(event)
+def _wants_debug_metrics(event: Dict[str, Any]) -> bool:
+    qs = event.get("queryStringParameters") or {}
+    return metrics.IN_RESPONSE or (isinstance(qs, dict) and qs.get("debug") == "metrics")
+
 
+def _route(
+    event: Dict[str, Any], method: str, path: str, m: metrics.RequestMetrics, context: Any = None
+) -> Dict[str, Any]:
     if method == "OPTIONS":
+        m.route = "OPTIONS"
         return _json_response(200, {"ok": True})
 
+    if method == "POST" and path.endswith("/taste-profiles/batch"):
+        m.route = "POST /taste-profiles/batch"
+        return handle_post_taste_profiles_batch(event)
+
     if method == "POST" and path.endswith("/taste-profile"):
+        m.route = "POST /taste-profile"
         return handle_post_taste_profile(event)
 
     if method == "GET" and path.startswith("/matches/"):
+        m.route = "GET /matches"
         if not (event.get("pathParameters") or {}).get("user_id"):
             event["pathParameters"] = {"user_id": path.split("/matches/", 1)[-1]}
-        return handle_get_matches(event)
+        return handle_get_matches(event, context)
 
     if method == "GET" and path.startswith("/profiles/"):
+        m.route = "GET /profiles"
         if not (event.get("pathParameters") or {}).get("user_id"):
             event["pathParameters"] = {"user_id": path.split("/profiles/", 1)[-1]}
         return handle_get_profile(event)
 
+    if method == "GET" and path.startswith("/recommendations/"):
+        m.route = "GET /recommendations"
+        if not (event.get("pathParameters") or {}).get("user_id"):
+            event["pathParameters"] = {"user_id": path.split("/recommendations/", 1)[-1]}
+        return handle_get_recommendations(event)
+
     # NEW: POST /connect
     if method == "POST" and (path.endswith("/connect") or path == "/connect"):
+        m.route = "POST /connect"
         return handle_post_connect(event)
 
+    m.route = "unmatched"
     return _json_response(404, {"error": "Route not found"})
+
+
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    method, path = _get_method_path(event)
+
+    # One structured (EMF) log line per invocation - see metrics.py
+    m = metrics.begin(f"{method} {path}", in_response=_wants_debug_metrics(event))
+    status_code = 500
+    try:
+        if profiling.ENABLED and profiling.should_profile(event):
+            resp = profiling.profile_call(
+                lambda: _route(event, method, path, m, context),
+                label=lambda: m.route,
+                request_id=getattr(context, "aws_request_id", None),
+            )
+        else:
+            resp = _route(event, method, path, m, context)
+        status_code = resp.get("statusCode", 200)
+        return resp
+    finally:
+        m.emit(status_code)
+        metrics.end()
@@ -0,0 +1,252 @@
+"""
+load_test.py
+
+End-to-end load test for handler.lambda_handler on a local storage engine.
+
+For each table size N:
+  1. seed a fresh local store with N synthetic users (synthetic_profiles.py)
+  2. replay API Gateway v2 events (same shape as test_get_matches_event.json)
+     for GET /matches, GET /profiles and POST /connect at a given concurrency
+  3. report per route: p50/p95/p99 latency, throughput, storage calls per
+     request (1:1 with DynamoDB GetItem/Scan/... calls) and peak memory
+
+The output is a Markdown table you can paste into capacity-planning docs.
+
+Run this from inside the 'lambda' folder with:
+    python load_test.py --users 1000,10000 --concurrency 8
+    python load_test.py --users 100000 --requests 10 --store sqlite --json report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+
+import handler  # noqa: E402
+from storage import ProfileStorage, SQLiteProfileStorage, create_profile_storage  # noqa: E402
+from synthetic_profiles import generate_items  # noqa: E402
+
+ROUTES = ("matches", "profiles", "connect")
+
+
+class CountingStorage(ProfileStorage):
+    """Wraps a store and counts calls per operation (thread-safe)."""
+
+    def __init__(self, inner: ProfileStorage):
+        self.inner = inner
+        self.name = inner.name
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, op: str) -> None:
+        with self._lock:
+            self.calls[op] += 1
+
+    def get(self, user_id, attributes=None):
+        self._count("get")
+        return self.inner.get(user_id, attributes)
+
+    def batch_get(self, user_ids):
+        self._count("batch_get")
+        return self.inner.batch_get(user_ids)
+
+    def put(self, item):
+        self._count("put")
+        return self.inner.put(item)
+
+    def put_many(self, items):
+        self._count("put_many")
+        return self.inner.put_many(items)
+
+    def update(self, user_id, updates, expected=None):
+        self._count("update")
+        return self.inner.update(user_id, updates, expected)
+
+    def scan_page(self, cursor=None, limit=None):
+        self._count("scan_page")
+        return self.inner.scan_page(cursor, limit)
+
+    def changed_since(self, since, limit=None):
+        self._count("changed_since")
+        return self.inner.changed_since(since, limit)
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.calls)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def make_event(route: str, rng: random.Random, user_ids: List[str], limit: int = 10) -> Dict[str, Any]:
+    """API Gateway HTTP API (v2) event, like test_get_matches_event.json."""
+    if route == "connect":
+        a, b = rng.sample(user_ids, 2)
+        return {
+            "requestContext": {"http": {"method": "POST", "path": "/connect"}},
+            "body": json.dumps({"from_user_id": a, "to_user_id": b}),
+        }
+
+    user_id = rng.choice(user_ids)
+    event: Dict[str, Any] = {
+        "requestContext": {"http": {"method": "GET", "path": f"/{route}/{user_id}"}},
+        "pathParameters": {"user_id": user_id},
+    }
+    if route == "matches":
+        event["queryStringParameters"] = {"limit": str(limit)}
+    return event
+
+
+def seed_store(kind: str, n_users: int, seed: int) -> ProfileStorage:
+    if kind == "sqlite":
+        store: ProfileStorage = SQLiteProfileStorage(os.path.join(tempfile.mkdtemp(), "load.sqlite3"))
+    else:
+        store = create_profile_storage(kind)
+
+    batch: List[Dict[str, Any]] = []
+    for item in generate_items(n_users, seed=seed):
+        batch.append(item)
+        if len(batch) >= 5000:
+            store.put_many(batch)
+            batch = []
+    if batch:
+        store.put_many(batch)
+    return store
+
+
+def _invoke(event: Dict[str, Any]) -> float:
+    t0 = time.perf_counter()
+    resp = handler.lambda_handler(event, None)
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    if resp.get("statusCode") not in (200, 304):
+        raise RuntimeError(f"{event['requestContext']['http']['path']} -> {resp.get('statusCode')}: {resp.get('body')}")
+    return elapsed
+
+
+def run_route(
+    route: str,
+    store: CountingStorage,
+    user_ids: List[str],
+    requests: int,
+    concurrency: int,
+    seed: int,
+    memory_requests: int,
+) -> Dict[str, Any]:
+    rng = random.Random(f"{seed}:{route}")
+    events = [make_event(route, rng, user_ids) for _ in range(requests)]
+
+    before = store.snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(_invoke, events))
+    wall = time.perf_counter() - started
+    calls = store.snapshot() - before
+
+    # Separate, smaller pass under tracemalloc so it doesn't skew latency
+    peak_kib = 0.0
+    if memory_requests:
+        tracemalloc.start()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(_invoke, events[:memory_requests]))
+        peak_kib = tracemalloc.get_traced_memory()[1] / 1024.0
+        tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_rps": round(requests / wall, 1) if wall else 0.0,
+        "calls_per_request": {op: round(n / requests, 2) for op, n in sorted(calls.items())},
+        "peak_mem_kib": round(peak_kib, 1),
+    }
+
+
+def run(
+    sizes: Iterable[int],
+    store_kind: str,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    routes: Iterable[str] = ROUTES,
+    memory_requests: int = 5,
+) -> List[Dict[str, Any]]:
+    rows = []
+    for n_users in sizes:
+        t0 = time.perf_counter()
+        counting = CountingStorage(seed_store(store_kind, n_users, seed))
+        seed_s = time.perf_counter() - t0
+        user_ids = [f"synthetic_{i:07d}" for i in range(n_users)]
+
+        handler.store = counting
+        # Handler logs a line per request; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for route in routes:
+                row = run_route(route, counting, user_ids, requests, concurrency, seed, memory_requests)
+                row.update({"users": n_users, "route": route, "store": store_kind, "seed_seconds": round(seed_s, 2)})
+                rows.append(row)
+        print(f"users={n_users:,} done (seeded in {seed_s:.1f}s)")
+    return rows
+
+
+def markdown_table(rows: List[Dict[str, Any]], concurrency: int) -> str:
+    lines = [
+        f"Concurrency: {concurrency}",
+        "",
+        "| users | route | store | requests | p50 ms | p95 ms | p99 ms | req/s | storage calls / req | peak mem KiB |",
+        "|---:|---|---|---:|---:|---:|---:|---:|---|---:|",
+    ]
+    for r in rows:
+        calls = ", ".join(f"{op}={n:g}" for op, n in r["calls_per_request"].items()) or "-"
+        lines.append(
+            f"| {r['users']:,} | {r['route']} | {r['store']} | {r['requests']} | {r['p50_ms']} | {r['p95_ms']} "
+            f"| {r['p99_ms']} | {r['throughput_rps']} | {calls} | {r['peak_mem_kib']:,} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test lambda_handler on a local store.")
+    parser.add_argument("--users", default="1000,10000", help="comma-separated table sizes")
+    parser.add_argument("--store", default="memory", choices=["memory", "sqlite"])
+    parser.add_argument("--requests", type=int, default=50, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--memory-requests", type=int, default=5, help="requests traced for peak memory (0 = skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write raw rows as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.users.split(",") if x.strip()]
+    routes = [r.strip() for r in args.routes.split(",") if r.strip()]
+    rows = run(sizes, args.store, args.requests, args.concurrency, args.seed, routes, args.memory_requests)
+
+    print()
+    print(markdown_table(rows, args.concurrency))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+local_table.py
+
+In-memory stand-in for a boto3 DynamoDB Table resource, for local scripts
+and benchmarks (no AWS account, no mocks).
+
+Implements the subset of the Table API this project uses:
+- get_item (optional top-level ProjectionExpression) / put_item / delete_item
+- update_item (SET-only UpdateExpression, simple ConditionExpression)
+- scan (Limit + ExclusiveStartKey / LastEvaluatedKey paging)
+- query on a global secondary index declared up front ("pk = :v" plus an
+  optional sort key comparison, paged like scan) - each index is kept
+  sorted on write, like the real one
+- batch_writer (25-item batches, re-sends UnprocessedItems like boto3 does)
+- batch_get_item, on LocalResource (the boto3 resource-level call)
+
+Every call is counted in `calls` so harnesses can report DynamoDB traffic,
+and `latency_seconds` adds a per-call network delay (slept outside the lock,
+so concurrent calls overlap like real round trips).
+"""
+
+from __future__ import annotations
+
+import bisect
+import copy
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+BATCH_WRITE_MAX = 25
+BATCH_GET_MAX = 100
+DEFAULT_SCAN_PAGE = 1000
+
+_SET_CLAUSE = re.compile(r"^\s*(#?[A-Za-z_][A-Za-z0-9_]*)\s*=\s*(:[A-Za-z0-9_]+)\s*$")
+_EQ_CONDITION = re.compile(r"^\s*(#?[A-Za-z_][A-Za-z0-9_]*)\s*=\s*(:[A-Za-z0-9_]+)\s*$")
+_FN_CONDITION = re.compile(r"^\s*(attribute_exists|attribute_not_exists)\((#?[A-Za-z_][A-Za-z0-9_]*)\)\s*$")
+_KEY_CONDITION = re.compile(
+    r"^\s*(#?[A-Za-z_][A-Za-z0-9_]*)\s*=\s*(:[A-Za-z0-9_]+)"
+    r"(?:\s+AND\s+(#?[A-Za-z_][A-Za-z0-9_]*)\s*(>=|<=|>|<)\s*(:[A-Za-z0-9_]+))?\s*$",
+    re.IGNORECASE,
+)
+
+
+class ConditionalCheckFailedException(Exception):
+    """Shaped like botocore's ClientError for a failed ConditionExpression."""
+
+    def __init__(self, message: str = "The conditional request failed"):
+        super().__init__(message)
+        self.response = {"Error": {"Code": "ConditionalCheckFailedException", "Message": message}}
+
+
+def _resolve_name(name: str, names: Optional[Dict[str, str]]) -> str:
+    if name.startswith("#"):
+        return (names or {})[name]
+    return name
+
+
+class LocalTable:
+    def __init__(
+        self,
+        name: str = "local-profiles",
+        key_name: str = "user_id",
+        unprocessed_every: int = 0,
+        latency_seconds: float = 0.0,
+        indexes: Optional[Dict[str, Tuple[str, str]]] = None,
+    ):
+        """
+        unprocessed_every: if > 0, every Nth item of a batch write comes back
+        as "unprocessed" on its first attempt (simulates throttling).
+        latency_seconds: simulated round-trip time added to every call.
+        indexes: {index name: (partition attr, sort attr)} - global secondary
+        indexes for query(). Sparse: items missing either attr aren't in it.
+        """
+        self.name = name
+        self.key_name = key_name
+        self.unprocessed_every = unprocessed_every
+        self.latency_seconds = latency_seconds
+
+        self.calls: Counter = Counter()
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._keys: Optional[List[str]] = None
+        self._positions: Dict[str, int] = {}
+        self._batch_seq = 0
+        self.indexes: Dict[str, Tuple[str, str]] = dict(indexes or {})
+        # index name -> partition value -> sorted [(sort value, table key)]
+        self._index_rows: Dict[str, Dict[Any, List[Tuple[Any, str]]]] = {name: {} for name in self.indexes}
+
+    # -------------------------
+    # Helpers
+    # -------------------------
+    def _key_of(self, key: Dict[str, Any]) -> str:
+        val = key.get(self.key_name)
+        if not isinstance(val, str) or not val:
+            raise ValueError(f"Missing key attribute: {self.key_name}")
+        return val
+
+    def _ordered_keys(self) -> List[str]:
+        # Rebuilt lazily after inserts/deletes so scan paging stays O(page)
+        if self._keys is None:
+            self._keys = list(self._items.keys())
+            self._positions = {k: i for i, k in enumerate(self._keys)}
+        return self._keys
+
+    def _store(self, item: Dict[str, Any]) -> None:
+        key = self._key_of(item)
+        old = self._items.get(key)
+        if old is None:
+            self._keys = None
+        self._items[key] = copy.deepcopy(item)
+        self._reindex(key, old, self._items[key])
+
+    def _pop(self, key: str) -> None:
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._keys = None
+            self._reindex(key, old, None)
+
+    def _reindex(self, key: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+        for name, (pk, sk) in self.indexes.items():
+            before = (old[pk], old[sk]) if old and pk in old and sk in old else None
+            after = (new[pk], new[sk]) if new and pk in new and sk in new else None
+            if before == after:
+                continue
+            rows = self._index_rows[name]
+            if before is not None:
+                part = rows[before[0]]
+                del part[bisect.bisect_left(part, (before[1], key))]
+            if after is not None:
+                bisect.insort(rows.setdefault(after[0], []), (after[1], key))
+
+    def _network(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # -------------------------
+    # Table API
+    # -------------------------
+    def get_item(
+        self,
+        Key: Dict[str, Any],
+        ProjectionExpression: Optional[str] = None,
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        self._network()
+        with self._lock:
+            self.calls["get_item"] += 1
+            item = self._items.get(self._key_of(Key))
+            if item is None:
+                return {}
+            if ProjectionExpression:
+                # Top-level attributes only; missing ones are just left out
+                attrs = [_resolve_name(a.strip(), ExpressionAttributeNames) for a in ProjectionExpression.split(",")]
+                item = {a: item[a] for a in attrs if a in item}
+            return {"Item": copy.deepcopy(item)}
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        self._network()
+        with self._lock:
+            self.calls["put_item"] += 1
+            self._store(Item)
+        return {}
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        self._network()
+        with self._lock:
+            self.calls["delete_item"] += 1
+            self._pop(self._key_of(Key))
+        return {}
+
+    @staticmethod
+    def _condition_holds(
+        item: Optional[Dict[str, Any]],
+        expression: str,
+        names: Optional[Dict[str, str]],
+        values: Dict[str, Any],
+    ) -> bool:
+        """Supports clauses joined by AND: a = :v, attribute_exists(a), attribute_not_exists(a)."""
+        current = item or {}
+        for clause in re.split(r"\s+AND\s+", expression.strip(), flags=re.IGNORECASE):
+            m = _FN_CONDITION.match(clause)
+            if m:
+                exists = _resolve_name(m.group(2), names) in current
+                if exists != (m.group(1) == "attribute_exists"):
+                    return False
+                continue
+            m = _EQ_CONDITION.match(clause)
+            if not m:
+                raise ValueError(f"Unsupported condition clause: {clause!r}")
+            attr = _resolve_name(m.group(1), names)
+            if attr not in current or current[attr] != values[m.group(2)]:
+                return False
+        return True
+
+    def update_item(
+        self,
+        Key: Dict[str, Any],
+        UpdateExpression: str,
+        ExpressionAttributeValues: Dict[str, Any],
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        ConditionExpression: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        expr = UpdateExpression.strip()
+        if not expr.upper().startswith("SET "):
+            raise ValueError(f"Only SET update expressions are supported: {UpdateExpression}")
+
+        updates: Dict[str, Any] = {}
+        for clause in expr[4:].split(","):
+            m = _SET_CLAUSE.match(clause)
+            if not m:
+                raise ValueError(f"Unsupported SET clause: {clause!r}")
+            attr = _resolve_name(m.group(1), ExpressionAttributeNames)
+            updates[attr] = copy.deepcopy(ExpressionAttributeValues[m.group(2)])
+
+        self._network()
+        with self._lock:
+            self.calls["update_item"] += 1
+            key = self._key_of(Key)
+            item = self._items.get(key)
+            if ConditionExpression and not self._condition_holds(
+                item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues
+            ):
+                raise ConditionalCheckFailedException()
+            old = None
+            if item is None:
+                item = {self.key_name: key}
+                self._items[key] = item
+                self._keys = None
+            elif self.indexes:
+                old = dict(item)
+            item.update(updates)
+            self._reindex(key, old, item)
+        return {}
+
+    def scan(
+        self,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        page_size = Limit or DEFAULT_SCAN_PAGE
+        self._network()
+        with self._lock:
+            self.calls["scan"] += 1
+            keys = self._ordered_keys()
+            start = 0
+            if ExclusiveStartKey:
+                start = self._positions.get(self._key_of(ExclusiveStartKey), -1) + 1
+
+            page_keys = keys[start:start + page_size]
+            resp: Dict[str, Any] = {
+                "Items": [copy.deepcopy(self._items[k]) for k in page_keys],
+                "Count": len(page_keys),
+            }
+            if start + page_size < len(keys):
+                resp["LastEvaluatedKey"] = {self.key_name: page_keys[-1]}
+        return resp
+
+    def query(
+        self,
+        KeyConditionExpression: str,
+        ExpressionAttributeValues: Dict[str, Any],
+        ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+        IndexName: Optional[str] = None,
+        Limit: Optional[int] = None,
+        ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+        ScanIndexForward: bool = True,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Index query: "pk = :v" or "pk = :v AND sk <op> :w" (op one of > >= < <=)."""
+        if IndexName not in self.indexes:
+            raise ValueError(f"Unknown index: {IndexName!r}")
+        m = _KEY_CONDITION.match(KeyConditionExpression)
+        if not m:
+            raise ValueError(f"Unsupported key condition: {KeyConditionExpression!r}")
+        pk, sk = self.indexes[IndexName]
+        if _resolve_name(m.group(1), ExpressionAttributeNames) != pk:
+            raise ValueError(f"Key condition must be on the partition key {pk!r}")
+        if m.group(3) and _resolve_name(m.group(3), ExpressionAttributeNames) != sk:
+            raise ValueError(f"Range condition must be on the sort key {sk!r}")
+
+        page_size = Limit or DEFAULT_SCAN_PAGE
+        self._network()
+        with self._lock:
+            self.calls["query"] += 1
+            rows = self._index_rows[IndexName].get(ExpressionAttributeValues[m.group(2)], [])
+            lo, hi = 0, len(rows)
+            if m.group(3):
+                op, bound = m.group(4), ExpressionAttributeValues[m.group(5)]
+                # Keys never compare equal to the "" / "\uffff" sentinels' tuples
+                if op == ">":
+                    lo = bisect.bisect_right(rows, (bound, "\uffff"))
+                elif op == ">=":
+                    lo = bisect.bisect_left(rows, (bound, ""))
+                elif op == "<":
+                    hi = bisect.bisect_left(rows, (bound, ""))
+                else:
+                    hi = bisect.bisect_right(rows, (bound, "\uffff"))
+            if ExclusiveStartKey:
+                last = (ExclusiveStartKey[sk], self._key_of(ExclusiveStartKey))
+                if ScanIndexForward:
+                    lo = max(lo, bisect.bisect_right(rows, last))
+                else:
+                    hi = min(hi, bisect.bisect_left(rows, last))
+
+            if ScanIndexForward:
+                page = rows[lo:min(hi, lo + page_size)]
+            else:
+                page = rows[max(lo, hi - page_size):hi][::-1]
+            resp: Dict[str, Any] = {
+                "Items": [copy.deepcopy(self._items[key]) for _sort, key in page],
+                "Count": len(page),
+            }
+            if page and hi - lo > page_size:
+                last = self._items[page[-1][1]]
+                resp["LastEvaluatedKey"] = {self.key_name: page[-1][1], pk: last[pk], sk: last[sk]}
+        return resp
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None) -> "LocalBatchWriter":
+        return LocalBatchWriter(self, overwrite_by_pkeys)
+
+    def _batch_write(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One BatchWriteItem call. Returns the unprocessed requests."""
+        unprocessed: List[Dict[str, Any]] = []
+        self._network()
+        with self._lock:
+            self.calls["batch_write_item"] += 1
+            for req in requests:
+                self._batch_seq += 1
+                first_try = not req.get("_retried")
+                if first_try and self.unprocessed_every and self._batch_seq % self.unprocessed_every == 0:
+                    unprocessed.append(dict(req, _retried=True))
+                    continue
+                if "PutRequest" in req:
+                    self._store(req["PutRequest"]["Item"])
+                elif "DeleteRequest" in req:
+                    self._pop(self._key_of(req["DeleteRequest"]["Key"]))
+        if unprocessed:
+            self.calls["unprocessed_items"] += len(unprocessed)
+        return unprocessed
+
+
+class LocalResource:
+    """Stand-in for the boto3 DynamoDB resource: Table() + batch_get_item over LocalTables."""
+
+    def __init__(self, *tables: LocalTable):
+        self.tables: Dict[str, LocalTable] = {t.name: t for t in tables}
+
+    def Table(self, name: str) -> LocalTable:
+        if name not in self.tables:
+            self.tables[name] = LocalTable(name=name)
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        responses: Dict[str, List[Dict[str, Any]]] = {}
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            keys = request.get("Keys") or []
+            if len(keys) > BATCH_GET_MAX:
+                raise ValueError(f"Too many keys in one BatchGetItem: {len(keys)} > {BATCH_GET_MAX}")
+            table._network()
+            with table._lock:
+                table.calls["batch_get_item"] += 1
+                found = [table._items.get(table._key_of(k)) for k in keys]
+                responses[name] = [copy.deepcopy(it) for it in found if it is not None]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+class LocalBatchWriter:
+    """Mirrors boto3's BatchWriter: buffers 25 requests, re-queues unprocessed ones."""
+
+    def __init__(self, table: LocalTable, overwrite_by_pkeys: Optional[List[str]] = None):
+        self._table = table
+        self._overwrite_by_pkeys = overwrite_by_pkeys
+        self._buffer: List[Dict[str, Any]] = []
+
+    def _add(self, request: Dict[str, Any], key: Dict[str, Any]) -> None:
+        if self._overwrite_by_pkeys:
+            pkey = tuple(key.get(k) for k in self._overwrite_by_pkeys)
+            self._buffer = [r for r in self._buffer if r["_pkey"] != pkey]
+            request["_pkey"] = pkey
+        else:
+            request["_pkey"] = None
+        self._buffer.append(request)
+        if len(self._buffer) >= BATCH_WRITE_MAX:
+            self._flush()
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        self._add({"PutRequest": {"Item": Item}}, Item)
+
+    def delete_item(self, Key: Dict[str, Any]) -> None:
+        self._add({"DeleteRequest": {"Key": Key}}, Key)
+
+    def _flush(self) -> None:
+        batch = self._buffer[:BATCH_WRITE_MAX]
+        self._buffer = self._buffer[BATCH_WRITE_MAX:]
+        self._buffer.extend(self._table._batch_write(batch))
+
+    def __enter__(self) -> "LocalBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        while self._buffer:
+            self._flush()
@@ -0,0 +1,250 @@
+"""
+match_index.py
+
+Inverted index over candidate MatchFeatures for exact top-k /matches,
+with the vocabulary shaped the way real taste data is:
+
+- Singleton tokens (held by one user - most track strings) can never be
+  shared between two indexed users, so they get no posting list. They're
+  kept in a plain {token: user} dict, only consulted for a requester whose
+  profile isn't the indexed one (new or just edited).
+- Hot tokens (held by at least HOT_FRACTION of users - "pop", "k-pop", the
+  top few artists) would make almost every user a candidate. Their postings
+  aren't walked: each user gets a bit per hot token they hold, and shared hot
+  tokens are a popcount of (their bits & the requester's bits).
+
+Query: walk the requester's remaining (mid-frequency) postings - every user
+found there is scored exactly from the shared counts + hot bits + set
+sizes. Everyone else shares only hot tokens (or nothing), so their score
+depends on their bits and set sizes alone: they're grouped by set sizes at
+build time, each group gets an upper bound, and a group is only walked when
+that bound can still make the top k (same rule as ranking.top_k_pruned).
+
+Scores are exact - the same value and tie order (index) as
+ranking.top_k_pruned / score_features in exact genre mode. Soft genre
+credit isn't representable here; callers check `soft` and use the feature
+path instead.
+
+Env vars (handler):
+  MATCH_INDEX                1 = build an index with each candidate snapshot and rank from it (default 0)
+  MATCH_INDEX_HOT_FRACTION   document frequency that makes a token hot (default 0.05)
+
+Run the benchmark from inside the 'lambda' folder with:
+    python bench_match_index.py
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from array import array
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from matching import MatchFeatures, _cap_0_100
+
+ENABLED = os.environ.get("MATCH_INDEX", "0").strip().lower() in ("1", "true", "yes", "on")
+try:
+    HOT_FRACTION = float(os.environ.get("MATCH_INDEX_HOT_FRACTION", "0.05"))
+except ValueError:
+    HOT_FRACTION = 0.05
+
+# Hot bits per user live in an unsigned 64-bit array
+MAX_HOT_TOKENS = 64
+# A token needs at least this many holders to be hot, whatever the fraction
+HOT_MIN_USERS = 32
+
+# MatchFeatures attributes - 3, 2 and 1 points per shared token
+KINDS = ("artists", "genres", "tracks")
+
+
+class MatchIndex:
+    def __init__(
+        self,
+        features: Sequence[MatchFeatures],
+        hot_fraction: Optional[float] = HOT_FRACTION,
+        prune_singletons: bool = True,
+    ):
+        """hot_fraction None = no hot tokens; prune_singletons False = post every token (for comparison)."""
+        n = len(features)
+        self.size = n
+        self.soft = any(f.genre_ids for f in features)
+
+        df = {kind: Counter() for kind in KINDS}
+        for f in features:
+            for kind in KINDS:
+                df[kind].update(getattr(f, kind))
+
+        # Hottest tokens first, across kinds, up to MAX_HOT_TOKENS bits
+        self.hot: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+        if hot_fraction is not None and n:
+            threshold = max(HOT_MIN_USERS, hot_fraction * n)
+            ranked = sorted(
+                ((c, kind, t) for kind in KINDS for t, c in df[kind].items() if c >= threshold),
+                key=lambda e: (-e[0], e[1], e[2]),
+            )
+            for bit, (_c, kind, token) in enumerate(ranked[:MAX_HOT_TOKENS]):
+                self.hot[kind][token] = 1 << bit
+
+        postings: Dict[str, Dict[str, List[int]]] = {kind: defaultdict(list) for kind in KINDS}
+        self.singletons: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+        self.hot_bits = array("Q", bytes(8 * n))
+        self.sizes: Dict[str, array] = {kind: array("i") for kind in KINDS}
+        groups: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        for i, f in enumerate(features):
+            bits = 0
+            for kind in KINDS:
+                tokens = getattr(f, kind)
+                self.sizes[kind].append(len(tokens))
+                hot, counts = self.hot[kind], df[kind]
+                for t in tokens:
+                    if t in hot:
+                        bits |= hot[t]
+                    elif prune_singletons and counts[t] == 1:
+                        self.singletons[kind][t] = i
+                    else:
+                        postings[kind][t].append(i)
+            self.hot_bits[i] = bits
+            groups[(len(f.artists), len(f.genres), len(f.tracks))].append(i)
+
+        self.postings: Dict[str, Dict[str, array]] = {
+            kind: {t: array("i", docs) for t, docs in by_token.items()} for kind, by_token in postings.items()
+        }
+        # Users by (artists, genres, tracks) set sizes, ascending index
+        self.groups: List[Tuple[Tuple[int, int, int], array]] = [
+            (sizes, array("i", docs)) for sizes, docs in groups.items()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"users": self.size, "groups": len(self.groups)}
+        for kind in KINDS:
+            out[kind] = {
+                "posted": len(self.postings[kind]),
+                "postings": sum(len(p) for p in self.postings[kind].values()),
+                "singletons": len(self.singletons[kind]),
+                "hot": sorted(self.hot[kind]),
+            }
+        return out
+
+    def _query_bits(self, tokens: FrozenSet[str], kind: str) -> int:
+        hot = self.hot[kind]
+        bits = 0
+        for t in tokens:
+            bits |= hot.get(t, 0)
+        return bits
+
+    def top_k(
+        self,
+        me: MatchFeatures,
+        k: int,
+        score: Callable[[int], Dict[str, Any]],
+        rank_by: str = "match_percent",
+        exclude: Optional[Callable[[int], bool]] = None,
+    ) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, int]]:
+        """
+        Same order as ranking.top_k_pruned: [(index, scored)], best first,
+        ties by index. The index keeps no features, so score(i) builds the
+        full score dict - called for the k winners only.
+
+        stats: touched (users sharing a non-hot token), scored (exact values
+        computed), groups_walked / groups_skipped, skipped (users in skipped
+        groups), plus top_k_pruned's candidates / pruned / covered / partial
+        (never partial: there's no deadline, a query is a few ms).
+        """
+        percent = rank_by == "match_percent"
+        stats = {"touched": 0, "scored": 0, "groups_walked": 0, "groups_skipped": 0, "skipped": 0}
+        stats.update(candidates=self.size, pruned=0, covered=self.size, partial=0)
+        if k <= 0 or not self.size:
+            return [], stats
+
+        q_bits = {kind: self._query_bits(getattr(me, kind), kind) for kind in KINDS}
+        q_hot = {kind: b.bit_count() for kind, b in q_bits.items()}
+
+        # Shared mid-frequency (and singleton) tokens, per kind
+        shared: Dict[str, Counter] = {}
+        for kind in KINDS:
+            counts: Counter = Counter()
+            hot, posted, single = self.hot[kind], self.postings[kind], self.singletons[kind]
+            for t in getattr(me, kind):
+                if t in hot:
+                    continue
+                docs = posted.get(t)
+                if docs is not None:
+                    counts.update(docs)
+                else:
+                    d = single.get(t)
+                    if d is not None:
+                        counts[d] += 1
+            shared[kind] = counts
+        touched = set(shared["artists"]) | set(shared["genres"]) | set(shared["tracks"])
+        stats["touched"] = len(touched)
+
+        sizes_a, sizes_g, sizes_t = self.sizes["artists"], self.sizes["genres"], self.sizes["tracks"]
+        hot_bits = self.hot_bits
+        qa, qg, qt = q_bits["artists"], q_bits["genres"], q_bits["tracks"]
+        ca, cg, ct = shared["artists"], shared["genres"], shared["tracks"]
+        ma, mg, mt = len(me.artists), len(me.genres), len(me.tracks)
+
+        def value(a: int, g: int, t: int, na: int, ng: int, nt: int) -> int:
+            # score_features' raw_score / match_percent from shared counts + set sizes
+            points = a * 3 + g * 2 + t
+            if not percent:
+                return points
+            max_raw = min(ma, na) * 3 + min(mg, ng) * 2 + min(mt, nt)
+            return _cap_0_100(float(points) / float(max_raw) * 100.0) if max_raw > 0 else 0
+
+        # Min-heap of the k best so far: (value, -index) - the root is the one to beat
+        heap: List[Tuple[int, int]] = []
+
+        def push(v: int, i: int) -> None:
+            stats["scored"] += 1
+            if len(heap) < k:
+                heapq.heappush(heap, (v, -i))
+            elif (v, -i) > heap[0]:
+                heapq.heapreplace(heap, (v, -i))
+
+        for i in touched:
+            if exclude is not None and exclude(i):
+                continue
+            bits = hot_bits[i]
+            push(
+                value(
+                    ca.get(i, 0) + (bits & qa).bit_count(),
+                    cg.get(i, 0) + (bits & qg).bit_count(),
+                    ct.get(i, 0) + (bits & qt).bit_count(),
+                    sizes_a[i], sizes_g[i], sizes_t[i],
+                ),
+                i,
+            )
+
+        # Everyone else shares hot tokens only: bound each size group, best bound first
+        bounded = []
+        for (na, ng, nt), docs in self.groups:
+            bound = value(min(q_hot["artists"], na), min(q_hot["genres"], ng), min(q_hot["tracks"], nt), na, ng, nt)
+            bounded.append((-bound, docs[0], (na, ng, nt), docs))
+        bounded.sort()
+
+        for pos, (neg_bound, first, (na, ng, nt), docs) in enumerate(bounded):
+            if len(heap) >= k:
+                kth_value, kth_neg_index = heap[0]
+                if -neg_bound < kth_value:
+                    # Later groups have a lower bound still
+                    rest = bounded[pos:]
+                    stats["groups_skipped"] += len(rest)
+                    stats["skipped"] += sum(len(e[3]) for e in rest)
+                    break
+                if -neg_bound == kth_value and -first < kth_neg_index:
+                    # Ties lose on index, and every doc in the group is >= first
+                    stats["groups_skipped"] += 1
+                    stats["skipped"] += len(docs)
+                    continue
+            stats["groups_walked"] += 1
+            for i in docs:
+                if i in touched or (exclude is not None and exclude(i)):
+                    continue
+                bits = hot_bits[i]
+                push(value((bits & qa).bit_count(), (bits & qg).bit_count(), (bits & qt).bit_count(), na, ng, nt), i)
+
+        stats["pruned"] = self.size - stats["scored"]
+        best = sorted(heap, key=lambda e: (-e[0], -e[1]))
+        return [(-neg_i, score(-neg_i)) for _v, neg_i in best], stats
@@ -1,7 +1,23 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import re
-from typing import Any, Dict, List, Set
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# "exact" (default): only identical normalized genres score.
+# "soft": related genres earn partial credit from the offline similarity
+# table built by genre_similarity.py (GENRE_SIMILARITY_PATH).
+GENRE_MATCH_MODE = os.environ.get("GENRE_MATCH_MODE", "exact").strip().lower()
+GENRE_SIMILARITY_PATH = os.environ.get(
+    "GENRE_SIMILARITY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "genre_similarity.json"),
+)
+# Optional {track -> canonical track} map built by track_index.py, so
+# "Song (Remastered 2011) - Artist" and "Song - Artist" count as shared.
+TRACK_CANONICAL_PATH = os.environ.get("TRACK_CANONICAL_PATH", "")
 
 
 def _norm(s: str) -> str:
@@ -105,21 +121,62 @@ def _extract_artists(profile: Dict[str, Any]) -> Set[str]:
     return out
 
 
-def _extract_tracks(profile: Dict[str, Any]) -> Set[str]:
+# Bumped whenever a scoring table is swapped, so cached pair scores from
+# the old tables are never reused (see scoring_version()).
+_scoring_generation = 0
+
+_track_canonical: Optional[Dict[str, str]] = None
+_track_canonical_loaded = False
+_track_canonical_lock = threading.Lock()
+
+
+def set_track_canonical(mapping: Optional[Dict[str, str]]) -> None:
+    """Install a {track -> canonical track} map (or None to turn it off). Used by tests/benches."""
+    global _track_canonical, _track_canonical_loaded, _scoring_generation
+    with _track_canonical_lock:
+        _track_canonical = mapping
+        _track_canonical_loaded = True
+        _scoring_generation += 1
+
+
+def track_canonical() -> Optional[Dict[str, str]]:
+    global _track_canonical, _track_canonical_loaded
+    if _track_canonical_loaded:
+        return _track_canonical
+    with _track_canonical_lock:
+        if not _track_canonical_loaded:
+            if TRACK_CANONICAL_PATH:
+                from track_index import load_canonical_map
+
+                try:
+                    _track_canonical = load_canonical_map(TRACK_CANONICAL_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"TRACK_CANONICAL_PATH={TRACK_CANONICAL_PATH} could not be loaded ({e}); using exact tracks")
+            _track_canonical_loaded = True
+    return _track_canonical
+
+
+def _extract_tracks(profile: Dict[str, Any], canonical: bool = True) -> Set[str]:
     """
     Supports:
       Day 3: profile["sample"]["top_tracks"] = ["Song – Artist", ...]
       Other: profile["top_tracks"] / profile["tracks"] = [...]
+
+    With a canonical track map loaded, near-duplicates resolve to their
+    cluster's canonical track (one dict lookup each).
     """
     candidates: List[str] = []
     candidates += _strings_from_list(_get_nested(profile, "sample", "top_tracks"))
     candidates += _strings_from_list(profile.get("top_tracks"))
     candidates += _strings_from_list(profile.get("tracks"))
 
+    canon = track_canonical() if canonical else None
+
     out: Set[str] = set()
     for t in candidates:
         if isinstance(t, str) and t.strip():
-            out.add(_norm(t))
+            n = _norm(t)
+            out.add(canon.get(n, n) if canon else n)
     return out
 
 
@@ -176,6 +233,138 @@ def _cap_0_100(x: float) -> int:
     return int(x)
 
 
+@dataclass(frozen=True)
+class MatchFeatures:
+    """
+    The normalized sets compute_match_score compares.
+
+    Extracting these is most of the per-profile work, so callers that score
+    one profile against many (GET /matches) extract once and reuse.
+    """
+
+    artists: FrozenSet[str]
+    genres: FrozenSet[str]
+    tracks: FrozenSet[str]
+    # Soft genre mode only: genre ids in the similarity table
+    genre_ids: FrozenSet[int] = frozenset()
+
+
+# -------------------------
+# Soft genre credit
+# -------------------------
+_genre_table: Any = None  # genre_similarity.GenreSimilarity
+_genre_table_loaded = False
+_genre_table_lock = threading.Lock()
+
+
+def set_genre_similarity(table: Any) -> None:
+    """Install a GenreSimilarity table (or None for exact mode). Used by tests/benches."""
+    global _genre_table, _genre_table_loaded, _scoring_generation
+    with _genre_table_lock:
+        _genre_table = table
+        _genre_table_loaded = True
+        _scoring_generation += 1
+
+
+def genre_similarity() -> Any:
+    """The active similarity table, or None when scoring is exact."""
+    global _genre_table, _genre_table_loaded
+    if _genre_table_loaded:
+        return _genre_table
+    with _genre_table_lock:
+        if not _genre_table_loaded:
+            if GENRE_MATCH_MODE == "soft":
+                from genre_similarity import GenreSimilarity
+
+                try:
+                    _genre_table = GenreSimilarity.load(GENRE_SIMILARITY_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"GENRE_MATCH_MODE=soft but {GENRE_SIMILARITY_PATH} could not be loaded ({e}); using exact")
+            _genre_table_loaded = True
+    return _genre_table
+
+
+def genre_match_mode() -> str:
+    return "soft" if genre_similarity() is not None else "exact"
+
+
+# -------------------------
+# Fingerprints (pair-score caching)
+# -------------------------
+SCORING_VERSION = "week6-day4-explain-v1"
+
+
+def content_fingerprint(profile: Dict[str, Any]) -> str:
+    """
+    Hash of the profile's normalized artists/genres/tracks (before any
+    canonical-track or genre-table mapping). Two profiles with the same
+    fingerprint always score the same against anyone.
+    """
+    h = hashlib.blake2b(digest_size=12)
+    for values in (_extract_artists(profile), _extract_genres(profile), _extract_tracks(profile, canonical=False)):
+        h.update("\x1f".join(sorted(values)).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def scoring_version() -> str:
+    """Changes whenever score_features would give different results for the same inputs."""
+    track_canonical()
+    return f"{SCORING_VERSION}/{genre_match_mode()}/{_scoring_generation}"
+
+
+def _best_neighbors(
+    neighbors: List[Dict[int, float]], src: FrozenSet[int], dst: FrozenSet[int]
+) -> Tuple[float, List[Tuple[float, int, int]]]:
+    """For each genre in src, the most similar genre in dst (int lookups only)."""
+    total = 0.0
+    pairs: List[Tuple[float, int, int]] = []
+    for g in src:
+        row = neighbors[g]
+        best, best_h = 0.0, -1
+        if len(row) <= len(dst):
+            for h, sim in row.items():
+                if sim > best and h in dst:
+                    best, best_h = sim, h
+        else:
+            for h in dst:
+                sim = row.get(h, 0.0)
+                if sim > best:
+                    best, best_h = sim, h
+        if best_h >= 0:
+            total += best
+            pairs.append((best, g, best_h))
+    return total, pairs
+
+
+def _soft_genre_credit(
+    table: Any, a_ids: FrozenSet[int], b_ids: FrozenSet[int]
+) -> Tuple[float, List[Tuple[float, int, int]]]:
+    """
+    Partial credit (in "shared genres" units) for genres only one side has.
+    Symmetric: average of best-match sums in both directions.
+    """
+    a_only = a_ids - b_ids
+    b_only = b_ids - a_ids
+    if not a_only or not b_only:
+        return 0.0, []
+    ab, pairs = _best_neighbors(table.neighbors, a_only, b_only)
+    ba, _ = _best_neighbors(table.neighbors, b_only, a_only)
+    pairs.sort(reverse=True)
+    return (ab + ba) / 2.0, pairs
+
+
+def extract_features(profile: Dict[str, Any]) -> MatchFeatures:
+    genres = frozenset(_extract_genres(profile))
+    table = genre_similarity()
+    return MatchFeatures(
+        artists=frozenset(_extract_artists(profile)),
+        genres=genres,
+        tracks=frozenset(_extract_tracks(profile)),
+        genre_ids=table.to_ids(genres) if table is not None else frozenset(),
+    )
+
+
 def compute_match_score(profile_a: Dict[str, Any], profile_b: Dict[str, Any]) -> Dict[str, Any]:
     """
     Returns:
@@ -201,23 +390,32 @@ def compute_match_score(profile_a: Dict[str, Any], profile_b: Dict[str, Any]) ->
         }
       }
     """
-    # Extract normalized sets
-    a_artists = _extract_artists(profile_a)
-    b_artists = _extract_artists(profile_b)
+    return score_features(extract_features(profile_a), extract_features(profile_b))
 
-    a_genres = _extract_genres(profile_a)
-    b_genres = _extract_genres(profile_b)
 
-    a_tracks = _extract_tracks(profile_a)
-    b_tracks = _extract_tracks(profile_b)
+def score_features(a: MatchFeatures, b: MatchFeatures) -> Dict[str, Any]:
+    """Same result as compute_match_score, from already-extracted features."""
+    a_artists, b_artists = a.artists, b.artists
+    a_genres, b_genres = a.genres, b.genres
+    a_tracks, b_tracks = a.tracks, b.tracks
 
     # Shared overlap
     shared_artists = sorted(a_artists & b_artists)
     shared_genres = sorted(a_genres & b_genres)
     shared_tracks = sorted(a_tracks & b_tracks)
 
+    # Soft genre mode: related (not identical) genres earn partial credit,
+    # never more than the genre slots left after exact matches.
+    soft_credit = 0.0
+    soft_pairs: List[Tuple[float, int, int]] = []
+    table = _genre_table if (a.genre_ids and b.genre_ids) else None
+    if table is not None:
+        soft_credit, soft_pairs = _soft_genre_credit(table, a.genre_ids, b.genre_ids)
+        soft_credit = min(soft_credit, float(min(len(a_genres), len(b_genres)) - len(shared_genres)))
+
     # Points (raw)
-    raw_score = (len(shared_artists) * 3) + (len(shared_genres) * 2) + (len(shared_tracks) * 1)
+    raw_points = (len(shared_artists) * 3) + (len(shared_genres) + soft_credit) * 2 + (len(shared_tracks) * 1)
+    raw_score = int(round(raw_points))
 
     # NEW: compute a true percent based on "max possible overlap points"
     # Use mins so we don't pretend they could share more than either user has available.
@@ -230,7 +428,7 @@ def compute_match_score(profile_a: Dict[str, Any], profile_b: Dict[str, Any]) ->
     if max_raw_score <= 0:
         match_percent = 0
     else:
-        match_percent = _cap_0_100((float(raw_score) / float(max_raw_score)) * 100.0)
+        match_percent = _cap_0_100((float(raw_points) / float(max_raw_score)) * 100.0)
 
     # Keep match_score aligned with the percent for UI simplicity
     match_score = int(match_percent)
@@ -250,9 +448,13 @@ def compute_match_score(profile_a: Dict[str, Any], profile_b: Dict[str, Any]) ->
         "shared_genres_sample": shared_genres[:3],
         "shared_tracks_sample": shared_tracks[:3],
     }
+    if table is not None:
+        names = table.genres
+        explain["soft_genre_points"] = round(soft_credit * 2, 2)
+        explain["related_genres_sample"] = [[names[g], names[h], round(sim, 2)] for sim, g, h in soft_pairs[:3]]
 
     return {
-        "debug_matching_version": "week6-day4-explain-v1",
+        "debug_matching_version": SCORING_VERSION,
         "raw_score": int(raw_score),
         "max_raw_score": int(max_raw_score),
         "match_score": int(match_score),
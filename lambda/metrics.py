@@ -0,0 +1,150 @@
+"""
+metrics.py
+
+Per-request stage timings + counters, emitted as one CloudWatch Embedded
+Metric Format (EMF) log line per invocation. CloudWatch turns the JSON into
+metrics automatically - no PutMetricData calls, no extra latency.
+
+Usage in the handler:
+    m = metrics.begin("GET /matches")
+    with m.stage("scoring"):
+        ...
+    m.incr("candidates_scored", n)
+    m.emit(status_code)
+
+Code deeper in the call stack uses metrics.current() (a no-op when no
+request is active, e.g. local scripts). Work handed to a thread pool only
+sees the request's metrics if it runs in a copy of the caller's context
+(handler._submit_io does this); stages and counters are lock-protected, so
+pool threads and the request thread can record at the same time.
+
+Env vars:
+  METRICS_ENABLED=0         turn the EMF log line off
+  METRICS_NAMESPACE         CloudWatch namespace (default "MusicSoulmate")
+  METRICS_IN_RESPONSE=1     add timings/counters to the response "debug" block
+                            (also per request with ?debug=metrics)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "MusicSoulmate")
+ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+IN_RESPONSE = os.environ.get("METRICS_IN_RESPONSE", "0") == "1"
+
+_current: contextvars.ContextVar[Optional["RequestMetrics"]] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+
+class RequestMetrics:
+    def __init__(self, route: str, in_response: bool = IN_RESPONSE):
+        self.route = route
+        self.in_response = in_response
+        self.timings_ms: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.properties: Dict[str, Any] = {}
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a block. Repeated stages accumulate."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            with self._lock:
+                self.timings_ms[name] = self.timings_ms.get(name, 0.0) + elapsed
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_property(self, name: str, value: Any) -> None:
+        """Searchable in Logs Insights, but not a metric (e.g. user_id)."""
+        self.properties[name] = value
+
+    def to_debug(self) -> Dict[str, Any]:
+        return {
+            "timings_ms": {k: round(v, 3) for k, v in self.timings_ms.items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_emf(self, status_code: Optional[int] = None) -> Dict[str, Any]:
+        total_ms = (time.perf_counter() - self._started) * 1000.0
+        metric_defs = [{"Name": "total_ms", "Unit": "Milliseconds"}]
+        record: Dict[str, Any] = {"Route": self.route, "total_ms": round(total_ms, 3)}
+
+        for name, ms in self.timings_ms.items():
+            key = f"{name}_ms"
+            metric_defs.append({"Name": key, "Unit": "Milliseconds"})
+            record[key] = round(ms, 3)
+        for name, n in self.counters.items():
+            metric_defs.append({"Name": name, "Unit": "Count"})
+            record[name] = n
+
+        record.update(self.properties)
+        if status_code is not None:
+            record["status_code"] = status_code
+
+        record["_aws"] = {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": NAMESPACE,
+                    "Dimensions": [["Route"]],
+                    "Metrics": metric_defs,
+                }
+            ],
+        }
+        return record
+
+    def emit(self, status_code: Optional[int] = None) -> None:
+        if ENABLED:
+            print(json.dumps(self.to_emf(status_code), default=str))
+
+
+class _NullMetrics(RequestMetrics):
+    """Returned by current() outside a request: records nothing."""
+
+    def __init__(self):
+        super().__init__("none", in_response=False)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        yield
+
+    def incr(self, name: str, n: int = 1) -> None:
+        pass
+
+    def set_property(self, name: str, value: Any) -> None:
+        pass
+
+    def emit(self, status_code: Optional[int] = None) -> None:
+        pass
+
+
+_NULL = _NullMetrics()
+
+
+def begin(route: str, in_response: bool = IN_RESPONSE) -> RequestMetrics:
+    m = RequestMetrics(route, in_response=in_response)
+    _current.set(m)
+    return m
+
+
+def current() -> RequestMetrics:
+    return _current.get() or _NULL
+
+
+def end() -> None:
+    _current.set(None)
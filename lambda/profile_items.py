@@ -0,0 +1,215 @@
+"""
+profile_items.py
+
+Builds the DynamoDB item stored per user, from a POST /taste-profile body.
+
+Shared by the Lambda handler and the offline loaders (bulk import), so every
+write path stores exactly the same shape:
+  user_id, profile, updated_at, display_name, bio, top_artists_preview, connections,
+  features_fp (matching.content_fingerprint of what /matches scores),
+  content_hash (content_hash() - lets POST /taste-profile skip no-op writes),
+  public_profile (what GET /profiles returns, read with a projection)
+
+PURE Python (no boto3), safe to import from local scripts.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from build_taste_profile import build_taste_profile
+from matching import content_fingerprint
+
+
+def artists_preview_from_profile(profile: Dict[str, Any], limit: int = 5) -> List[str]:
+    """
+    Best-effort: extract artist names from a built taste profile.
+    Supports either:
+      - profile["top_artists"] as list[str]
+      - profile["top_artists"] as list[{"name": "..."}]
+      - profile["artists"] as list[str] or list[{"name": "..."}]
+    """
+    for key in ("top_artists", "artists"):
+        val = profile.get(key)
+        if isinstance(val, list) and val:
+            first = val[0]
+            if isinstance(first, str):
+                return [x for x in val if isinstance(x, str) and x][:limit]
+            if isinstance(first, dict) and "name" in first:
+                names = [a.get("name") for a in val if isinstance(a, dict) and a.get("name")]
+                return names[:limit]
+    return []
+
+
+def genres_preview_from_profile(profile: Dict[str, Any], limit: int = 5) -> List[str]:
+    """
+    Best-effort genre extraction from the stored 'profile' map.
+    Supports either:
+      - profile["top_genres"] as list[str]
+      - profile["genres"] as list[str]
+      - profile["genre_weights"] as dict[str, number] (sorted desc)
+    """
+    val = profile.get("top_genres")
+    if isinstance(val, list):
+        return [g for g in val if isinstance(g, str) and g][:limit]
+
+    val = profile.get("genres")
+    if isinstance(val, list):
+        return [g for g in val if isinstance(g, str) and g][:limit]
+
+    weights = profile.get("genre_weights")
+    if isinstance(weights, dict):
+        try:
+            items = sorted(
+                [(k, weights[k]) for k in weights.keys() if isinstance(k, str)],
+                key=lambda kv: float(kv[1]) if kv[1] is not None else 0.0,
+                reverse=True,
+            )
+            return [k for k, _ in items[:limit]]
+        except Exception:
+            return []
+
+    return []
+
+
+def public_profile(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The GET /profiles shape. Stored as the item's "public_profile" attribute
+    on every write, so reads don't need the nested profile at all.
+    """
+    profile = item.get("profile") if isinstance(item.get("profile"), dict) else {}
+    connections = item.get("connections")
+    if not isinstance(connections, list):
+        connections = []
+
+    return {
+        "user_id": item.get("user_id"),
+        "display_name": item.get("display_name") or item.get("user_id"),
+        "bio": item.get("bio") or "",
+        "top_artists_preview": item.get("top_artists_preview") or [],
+        "top_genres_preview": genres_preview_from_profile(profile, limit=5),
+        "connections": connections,
+        "updated_at": item.get("updated_at") or "",
+    }
+
+
+def profile_for_scoring(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combine nested 'profile' (Day 3 taste profile) with item-level preview fields,
+    so matching.py can find artists/genres/tracks no matter where they're stored.
+    """
+    base = item.get("profile")
+    merged: Dict[str, Any] = base if isinstance(base, dict) else {}
+
+    # Copy so we don't mutate the original
+    out: Dict[str, Any] = dict(merged)
+
+    # Item-level previews (your UI uses these)
+    if isinstance(item.get("top_artists_preview"), list):
+        out["top_artists_preview"] = item.get("top_artists_preview") or []
+
+    # If you ever store genres preview at top-level, support it too
+    if isinstance(item.get("top_genres_preview"), list):
+        out["top_genres_preview"] = item.get("top_genres_preview") or []
+
+    return out
+
+
+def item_fingerprint(item: Dict[str, Any]) -> str:
+    """Stored features_fp, or computed for items written before it existed."""
+    fp = item.get("features_fp")
+    if isinstance(fp, str) and fp:
+        return fp
+    return content_fingerprint(profile_for_scoring(item))
+
+
+# Fields a client controls through POST /taste-profile. updated_at and
+# connections are deliberately not part of the hash.
+CONTENT_FIELDS = ("profile", "display_name", "bio", "top_artists_preview")
+
+
+def _canonical_number(value: Any) -> Any:
+    # DynamoDB hands numbers back as Decimal; hash them like the floats/ints we built
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def content_hash(item: Dict[str, Any]) -> str:
+    """Canonical hash of the client-controlled fields of a stored item."""
+    doc = {k: item.get(k) for k in CONTENT_FIELDS}
+    encoded = json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_canonical_number)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def stored_content_hash(item: Dict[str, Any]) -> str:
+    """Stored content_hash, or computed for items written before it existed."""
+    h = item.get("content_hash")
+    if isinstance(h, str) and h:
+        return h
+    return content_hash(item)
+
+
+def taste_profile_body(taste_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    top_artists / top_genres / top_tracks of a POST /taste-profile body, from
+    a Flask-side taste profile (backend/taste_profile.py):
+      {"favorite_genres", "favorite_artists", "sample_tracks": [{"name", "artist"}], ...}
+    """
+    top_tracks: List[str] = []
+    for t in taste_profile.get("sample_tracks") or []:
+        if not isinstance(t, dict) or not t.get("name"):
+            continue
+        artist = t.get("artist")
+        top_tracks.append(f"{t['name']} – {artist}" if artist else t["name"])
+
+    return {
+        "top_artists": [a for a in taste_profile.get("favorite_artists") or [] if a],
+        "top_genres": list(taste_profile.get("favorite_genres") or []),
+        "top_tracks": top_tracks,
+    }
+
+
+def build_profile_item(
+    user_id: str,
+    data: Dict[str, Any],
+    now: str,
+    connections: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    data is the POST /taste-profile body (already validated to have user_id).
+    connections should be the user's existing list - we never drop them on save.
+    """
+    profile = build_taste_profile(data)
+
+    display_name = data.get("display_name")
+    if not isinstance(display_name, str) or not display_name.strip():
+        display_name = user_id
+
+    bio = data.get("bio")
+    if not isinstance(bio, str):
+        bio = ""
+
+    top_preview = data.get("top_artists_preview")
+    if not isinstance(top_preview, list) or not all(isinstance(x, str) for x in top_preview):
+        top_preview = artists_preview_from_profile(profile, limit=5)
+
+    if not isinstance(connections, list):
+        connections = []
+
+    item = {
+        "user_id": user_id,
+        "profile": profile,
+        "updated_at": now,
+        "display_name": display_name,
+        "bio": bio,
+        "top_artists_preview": top_preview,
+        "connections": connections,
+    }
+    item["features_fp"] = content_fingerprint(profile_for_scoring(item))
+    item["content_hash"] = content_hash(item)
+    item["public_profile"] = public_profile(item)
+    return item
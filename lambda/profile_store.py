@@ -2,43 +2,111 @@ from __future__ import annotations
 
 from decimal import Decimal
 from datetime import datetime, timezone
-from typing import Any, Dict
+from typing import Any, Dict, List, Mapping, Optional
 
-from dynamo_client import get_profiles_table
+from matching import content_fingerprint
+from storage import with_updated_day
+
+# Scalars boto3 accepts as-is: nothing to convert, nothing to walk.
+_PASSTHROUGH_TYPES = (str, int, bool, type(None), Decimal, bytes)
 
 
 def _to_dynamodb_types(value: Any) -> Any:
     """
     DynamoDB via boto3 does not like raw Python floats.
     Convert floats -> Decimal, and recurse through dict/list.
+
+    Walks the structure once and is copy-on-write: a dict/list is only
+    rebuilt if something inside it actually changed, otherwise the SAME
+    object is returned. Float-free profiles (the common case) cost one walk
+    and zero allocations.
     """
-    if isinstance(value, float):
+    cls = type(value)
+    if cls in _PASSTHROUGH_TYPES:
+        return value
+    if cls is float:
         return Decimal(str(value))
+
     if isinstance(value, dict):
-        return {k: _to_dynamodb_types(v) for k, v in value.items()}
+        out: Optional[Dict[Any, Any]] = None
+        for k, v in value.items():
+            if type(v) in _PASSTHROUGH_TYPES:
+                continue
+            new_v = _to_dynamodb_types(v)
+            if new_v is not v:
+                if out is None:
+                    out = dict(value)
+                out[k] = new_v
+        return value if out is None else out
+
     if isinstance(value, list):
-        return [_to_dynamodb_types(v) for v in value]
+        out_list: Optional[List[Any]] = None
+        for i, v in enumerate(value):
+            if type(v) in _PASSTHROUGH_TYPES:
+                continue
+            new_v = _to_dynamodb_types(v)
+            if new_v is not v:
+                if out_list is None:
+                    out_list = list(value)
+                out_list[i] = new_v
+        return value if out_list is None else out_list
+
+    if isinstance(value, float):
+        return Decimal(str(value))
     return value
 
 
-def save_profile(user_id: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+def _profile_item(user_id: str, profile: Dict[str, Any], now: str) -> Dict[str, Any]:
+    return _to_dynamodb_types(
+        with_updated_day(
+            {
+                "user_id": user_id,
+                "updated_at": now,
+                "profile": profile,
+                "features_fp": content_fingerprint(profile),
+            }
+        )
+    )
+
+
+def _default_table():
+    from dynamo_client import get_profiles_table
+
+    return get_profiles_table()
+
+
+def save_profile(user_id: str, profile: Dict[str, Any], table=None) -> Dict[str, Any]:
     """
     Overwrite by user_id.
     Stores:
       - user_id (PK)
-      - updated_at (ISO timestamp)
+      - updated_at (ISO timestamp) and updated_day (for the changed_since GSI)
       - profile (nested map)
     Returns the exact item we put (after float->Decimal conversion).
+    Unchanged sub-maps are shared with the input 'profile', not copied.
     """
-    table = get_profiles_table()
-
-    item = {
-        "user_id": user_id,
-        "updated_at": datetime.now(timezone.utc).isoformat(),
-        "profile": profile,
-    }
+    table = table if table is not None else _default_table()
 
-    item = _to_dynamodb_types(item)
+    item = _profile_item(user_id, profile, datetime.now(timezone.utc).isoformat())
 
     table.put_item(Item=item)
     return item
+
+
+def save_profiles(profiles: Mapping[str, Dict[str, Any]], table=None) -> List[Dict[str, Any]]:
+    """
+    Batch version of save_profile: {user_id: profile} -> one batch_writer
+    session (25 items per BatchWriteItem, unprocessed items re-sent by boto3).
+
+    All items share one updated_at. Returns the items written, in input order.
+    """
+    table = table if table is not None else _default_table()
+
+    now = datetime.now(timezone.utc).isoformat()
+    items = [_profile_item(user_id, profile, now) for user_id, profile in profiles.items()]
+
+    with table.batch_writer(overwrite_by_pkeys=["user_id"]) as writer:
+        for item in items:
+            writer.put_item(Item=item)
+
+    return items
@@ -0,0 +1,158 @@
+"""
+profiling.py
+
+On-demand cProfile for sampled Lambda invocations.
+
+When /matches latency spikes we can't reproduce it locally, so this profiles
+a fraction of real invocations (or requests carrying a debug header), writes
+the raw profile to disk and logs the top N hot functions as one JSON line.
+
+Env vars:
+  PROFILING_SAMPLE_RATE=0.01     profile ~1% of invocations (default 0 = off)
+  PROFILING_ALLOW_HEADER=1       also profile requests with the header below
+  PROFILING_HEADER               header name (default "x-debug-profile")
+  PROFILING_DIR                  where .prof files go (default /tmp/profiles)
+  PROFILING_TOP_N                functions in the log line (default 15)
+
+With neither PROFILING_SAMPLE_RATE nor PROFILING_ALLOW_HEADER set, ENABLED is
+False and the handler never calls into this module (zero overhead).
+
+Thread pools: before Python 3.12 a cProfile.Profile only sees the thread
+that enabled it, so work the request hands to handler._io_pool (scan page
+prefetch, profile reads) would be missing. The handler wraps those tasks
+with profile_pool_task: each one runs under its own profiler and is merged
+into the request's profile. From 3.12 cProfile already covers every
+thread, so the wrapper is a pass-through there.
+
+Inspect a saved profile with:
+    python -m pstats /tmp/profiles/<file>.prof
+"""
+
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    SAMPLE_RATE = max(0.0, min(1.0, float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))))
+except ValueError:
+    SAMPLE_RATE = 0.0
+ALLOW_HEADER = os.environ.get("PROFILING_ALLOW_HEADER", "0") == "1"
+HEADER = os.environ.get("PROFILING_HEADER", "x-debug-profile").lower()
+PROFILE_DIR = os.environ.get("PROFILING_DIR", "/tmp/profiles")
+try:
+    TOP_N = int(os.environ.get("PROFILING_TOP_N", "15"))
+except ValueError:
+    TOP_N = 15
+
+ENABLED = SAMPLE_RATE > 0.0 or ALLOW_HEADER
+
+# Set while a request is profiled: profiles of its pool tasks, merged at the end
+_pool_profiles: contextvars.ContextVar[Optional[List[cProfile.Profile]]] = contextvars.ContextVar(
+    "pool_profiles", default=None
+)
+_PER_THREAD = sys.version_info < (3, 12)
+
+
+def should_profile(event: Dict[str, Any]) -> bool:
+    if ALLOW_HEADER:
+        headers = event.get("headers") or {}
+        if isinstance(headers, dict):
+            for k, v in headers.items():
+                if isinstance(k, str) and k.lower() == HEADER and str(v).lower() not in ("", "0", "false"):
+                    return True
+    return SAMPLE_RATE > 0.0 and random.random() < SAMPLE_RATE
+
+
+def top_functions(stats: pstats.Stats, n: int) -> List[Dict[str, Any]]:
+    """Top n functions by cumulative time."""
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append(
+            {
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000.0, 3),
+                "cumtime_ms": round(ct * 1000.0, 3),
+            }
+        )
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:n]
+
+
+def _profile_path(label: str, request_id: Optional[str]) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "request"
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    suffix = request_id or f"{random.getrandbits(32):08x}"
+    return os.path.join(PROFILE_DIR, f"{safe}-{stamp}-{suffix}.prof")
+
+
+def profile_pool_task(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run fn(*args) - submitted to a pool in a copy of the request's context -
+    under its own profiler if that request is being profiled.
+    """
+    profiles = _pool_profiles.get()
+    if profiles is None or not _PER_THREAD:
+        return fn(*args)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+
+def profile_call(
+    fn: Callable[[], Any],
+    label: Callable[[], str],
+    request_id: Optional[str] = None,
+    top_n: int = TOP_N,
+) -> Any:
+    """
+    Run fn under cProfile, save the profile and log the hot functions.
+    label is called AFTER fn (the handler only knows the route once routed).
+    Pool tasks wrapped with profile_pool_task are included.
+    """
+    pool_profiles: List[cProfile.Profile] = []
+    token = _pool_profiles.set(pool_profiles)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn()
+    finally:
+        profiler.disable()
+        _pool_profiles.reset(token)
+        try:
+            stats = pstats.Stats(profiler, stream=io.StringIO())
+            # Tasks still running (e.g. a prefetch nobody waited for) are left out
+            for extra in list(pool_profiles):
+                stats.add(extra)
+            path = _profile_path(label(), request_id)
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stats.dump_stats(path)
+            print(
+                json.dumps(
+                    {
+                        "profile": {
+                            "route": label(),
+                            "path": path,
+                            "total_ms": round(stats.total_tt * 1000.0, 3),  # type: ignore[attr-defined]
+                            "top": top_functions(stats, top_n),
+                        }
+                    }
+                )
+            )
+        except Exception as e:
+            # Never fail a request because profiling output failed
+            print(f"Profiling output failed: {e}")
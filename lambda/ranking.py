@@ -0,0 +1,171 @@
+"""
+ranking.py
+
+Turns pair scores into the match entries GET /matches returns, and ranks them.
+
+Shared by the handler (single-node scan) and the shard workers
+(sharding.py), so both return exactly the same match shape.
+
+top_k_pruned is the bounded version of "score everyone, sort, slice": a
+candidate's raw score can't exceed 3*min(artists) + 2*min(genres) +
+1*min(tracks), which needs set sizes only. Candidates are visited in
+bound order and skipped (or the loop stops) once their bound can't beat
+the current k-th best. The result is exactly what rank_matches(...)[:k]
+returns.
+"""
+
+from __future__ import annotations
+
+import heapq
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from matching import MatchFeatures, _cap_0_100, score_features
+
+# What top_k_pruned can rank by: the score dict field + whether it's a percent
+RANK_FIELDS = {"match_percent": "match_score", "raw_score": "raw_score"}
+
+# Candidates between deadline checks (a check is one clock read)
+DEADLINE_CHECK_EVERY = 64
+
+
+def match_entry(it: Dict[str, Any], scored: Dict[str, Any]) -> Dict[str, Any]:
+    shared_artists = scored.get("shared_artists", []) or []
+    shared_genres = scored.get("shared_genres", []) or []
+
+    return {
+        "user_id": it["user_id"],
+        "display_name": it.get("display_name") or it["user_id"],
+        "bio": it.get("bio") or "",
+        "top_artists_preview": it.get("top_artists_preview") or [],
+        # Keep existing "score" for UI compatibility (now capped 0-100)
+        "score": scored.get("match_score", 0),
+
+        # NEW Day 1 fields
+        "raw_score": scored.get("raw_score", scored.get("match_score", 0)),
+        "match_percent": scored.get("match_percent", scored.get("match_score", 0)),
+
+        "shared_artist_count": len(shared_artists),
+        "shared_artists": shared_artists,
+
+        # ✅ Day 3 addition
+        "shared_genre_count": len(shared_genres),
+        "shared_genres": shared_genres,
+
+        "shared_tracks": scored.get("shared_tracks", []) or [],
+
+        # ✅ Week 6 Day 4: explain breakdown
+        "explain": scored.get("explain"),
+    }
+
+
+def rank_matches(items: List[Dict[str, Any]], scores: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Best score first; ties keep scan order (stable sort)."""
+    matches = [match_entry(it, scored) for it, scored in zip(items, scores)]
+    matches.sort(key=lambda m: m["score"], reverse=True)
+    return matches
+
+
+def merge_top_k(partials: Iterable[List[Dict[str, Any]]], k: int) -> List[Dict[str, Any]]:
+    """
+    Merge per-shard top-k lists into the global top-k. There's no global scan
+    order across shards, so ties are broken by user_id (deterministic).
+    """
+    candidates = [m for part in partials for m in part]
+    return heapq.nsmallest(k, candidates, key=lambda m: (-m["score"], m["user_id"]))
+
+
+def max_raw_score(a: MatchFeatures, b: MatchFeatures) -> int:
+    """Best possible raw_score for the pair (soft genre credit included) - set sizes only."""
+    return (
+        min(len(a.artists), len(b.artists)) * 3
+        + min(len(a.genres), len(b.genres)) * 2
+        + min(len(a.tracks), len(b.tracks)) * 1
+    )
+
+
+def top_k_pruned(
+    me: MatchFeatures,
+    features: Sequence[MatchFeatures],
+    k: int,
+    rank_by: str = "match_percent",
+    score: Optional[Callable[[int], Dict[str, Any]]] = None,
+    exclude: Optional[Callable[[int], bool]] = None,
+    deadline: Optional[float] = None,
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, int]]:
+    """
+    Top k of features[i] against me, best first, ties by index - the same
+    order as a stable sort on the score. Returns ([(index, scored)], stats).
+
+    score(i) produces the full score dict (default: score_features; the
+    handler passes one that goes through the pair cache). exclude(i) drops
+    a candidate (the requester).
+
+    deadline (a time.monotonic() value) stops the walk early: the result is
+    the best of what was covered, highest bounds first, and stats["partial"]
+    is 1. stats["covered"] = scored + pruned.
+
+    Bounds:
+      raw_score      3*min(artists) + 2*min(genres) + min(tracks)
+      match_percent  100 if that's > 0, else 0 - sizes alone say nothing
+                     more, so after the (cheap) artist intersection the
+                     bound is tightened to the percent the remaining
+                     genre/track slots could reach.
+    """
+    field = RANK_FIELDS[rank_by]
+    percent = rank_by == "match_percent"
+    if score is None:
+        def score(i: int) -> Dict[str, Any]:
+            return score_features(me, features[i])
+
+    stats = {"candidates": 0, "scored": 0, "pruned": 0, "covered": 0, "partial": 0}
+    if k <= 0:
+        return [], stats
+    bounds: List[Tuple[int, int, int]] = []  # (-bound, index, max_raw)
+    for i, f in enumerate(features):
+        if exclude is not None and exclude(i):
+            continue
+        max_raw = max_raw_score(me, f)
+        bounds.append((-(100 if percent and max_raw > 0 else max_raw), i, max_raw))
+    bounds.sort()
+    stats["candidates"] = len(bounds)
+
+    # Min-heap of the k best so far: (value, -index) - the root is the one to beat
+    heap: List[Tuple[int, int, Dict[str, Any]]] = []
+
+    def cannot_beat(bound: int, i: int) -> bool:
+        kth_value, kth_neg_index = heap[0][0], heap[0][1]
+        return bound < kth_value or (bound == kth_value and -i < kth_neg_index)
+
+    for pos, (neg_bound, i, max_raw) in enumerate(bounds):
+        if deadline is not None and pos % DEADLINE_CHECK_EVERY == 0 and time.monotonic() >= deadline:
+            stats["partial"] = 1
+            break
+        if len(heap) >= k:
+            if cannot_beat(-neg_bound, i):
+                # Later candidates have a lower bound, or the same one and a later index
+                stats["pruned"] += len(bounds) - pos
+                break
+            # Tighter bound from the artist overlap alone
+            f = features[i]
+            rest = max_raw - min(len(me.artists), len(f.artists)) * 3
+            points = len(me.artists & f.artists) * 3 + rest
+            if percent:
+                tight = _cap_0_100(points / max_raw * 100.0) if max_raw > 0 else 0
+            else:
+                tight = points
+            if cannot_beat(tight, i):
+                stats["pruned"] += 1
+                continue
+
+        scored = score(i)
+        stats["scored"] += 1
+        entry = (int(scored.get(field, 0)), -i, scored)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    stats["covered"] = stats["scored"] + stats["pruned"]
+    best = sorted(heap, key=lambda e: (-e[0], -e[1]))
+    return [(-neg_i, scored) for _value, neg_i, scored in best], stats
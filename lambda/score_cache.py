@@ -0,0 +1,86 @@
+"""
+score_cache.py
+
+Bounded LRU of pair scores, keyed by (scoring version, fingerprint_a, fingerprint_b).
+
+Both users of a popular pair browse /matches, and the demo UI refetches on
+every click, so the same pairs get rescored constantly. score_features is
+deterministic in the two feature sets, and every stored item carries a
+content fingerprint of those sets (profile_items.build_profile_item), so a
+pair whose profiles haven't changed is scored once per container.
+
+Keys include matching.scoring_version(), so switching genre mode or
+canonical-track tables never serves old scores.
+
+Values are only what ranking needs - (match_score, raw_score) - not the
+full score_features dict: about 220 bytes per entry, ~21 MiB at the
+default size. The handler rebuilds the full breakdown for the few
+candidates that make the response.
+
+Env vars:
+  PAIR_CACHE_MAX_ENTRIES   LRU size (default 100000, 0 = off). One /matches call
+                           fills (table size - 1) entries, so size it as
+                           "hot requesters x users".
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+try:
+    DEFAULT_MAX_ENTRIES = max(0, int(os.environ.get("PAIR_CACHE_MAX_ENTRIES", "100000")))
+except ValueError:
+    DEFAULT_MAX_ENTRIES = 100000
+
+
+class PairScoreCache:
+    """Thread-safe LRU of (match_score, raw_score) per pair."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[int, int]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[int, int]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Tuple[int, int]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        out["max_entries"] = self.max_entries
+        return out
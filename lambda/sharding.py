@@ -0,0 +1,391 @@
+"""
+sharding.py
+
+Scatter-gather matching: the candidate space is partitioned by user_id hash
+into shards, and each shard is held (items + extracted MatchFeatures) by its
+own worker process. GET /matches sends the requester's features to every
+shard, each shard returns its local top-k, and the results are merged.
+
+One worker process per shard, so no single process has to hold the whole
+feature set. At start-up the coordinator scans the table once, page by
+page, and hands each worker its own rows (N workers each scanning the
+whole table would cost N times the read capacity). Workers open the
+storage source themselves (a SQLite file locally, the DynamoDB table in
+AWS) and pick up changes with changed_since() before answering, at most
+every SHARD_REFRESH_SECONDS. On DynamoDB that needs the updated_day GSI
+(DDB_UPDATED_INDEX, see storage.py) - without it every refresh would be a
+full-table scan per shard, so ShardPool refuses to start.
+
+A shard that misses a request's deadline keeps working on it (its worker
+is a single process). Until it's done, later requests leave that shard
+out (missing_shards) instead of queueing behind it.
+
+Workers are local processes (ProcessPoolExecutor), which suits containers
+and dev boxes. AWS Lambda has no /dev/shm, so multiprocessing queues don't
+work there - deploy each shard as its own function instead; ShardIndex is
+the per-shard logic either way.
+
+Ordering: shards have no shared scan order, so ties are broken by user_id
+(single-node /matches keeps scan order for ties).
+
+Env vars (handler):
+  MATCH_SHARDS=8            turn sharded /matches on with 8 local workers (default 0 = off)
+  SHARD_REFRESH_SECONDS     how stale a shard may get (default 5)
+
+Run the benchmark from inside the 'lambda' folder with:
+    python bench_sharding.py
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import resource
+import time
+import tracemalloc
+import zlib
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from matching import MatchFeatures, extract_features
+from profile_items import profile_for_scoring
+from ranking import match_entry, merge_top_k, top_k_pruned
+
+try:
+    REFRESH_SECONDS = float(os.environ.get("SHARD_REFRESH_SECONDS", "5"))
+except ValueError:
+    REFRESH_SECONDS = 5.0
+
+# Writes still in flight when a load/refresh starts: the next refresh
+# looks this far back
+REFRESH_SKEW_SECONDS = 5.0
+
+# Coordinator-driven load: scan page size, and how many pages may be queued
+# per worker before the scan waits for it
+LOAD_PAGE_SIZE = 1000
+LOAD_MAX_QUEUED_PAGES = 4
+
+# ("sqlite", path) | ("dynamodb", table_name) | ("items", [item, ...]) - the
+# last one is for tests/benches: items are pickled to the worker once.
+Source = Tuple[str, Any]
+
+
+def shard_of(user_id: str, n_shards: int) -> int:
+    """Stable across processes and runs (unlike hash())."""
+    return zlib.crc32(user_id.encode("utf-8")) % n_shards
+
+
+def _shard_id(item: Dict[str, Any], n_shards: int) -> Optional[int]:
+    user_id = item.get("user_id")
+    return shard_of(user_id, n_shards) if isinstance(user_id, str) else None
+
+
+def _check_source(source: Source) -> None:
+    if source[0] == "dynamodb" and not os.environ.get("DDB_UPDATED_INDEX"):
+        raise ValueError("Sharded /matches on DynamoDB needs the updated_day GSI: set DDB_UPDATED_INDEX")
+
+
+def _open_store(source: Source):
+    kind, arg = source
+    if kind == "sqlite":
+        from storage import SQLiteProfileStorage
+
+        return SQLiteProfileStorage(arg)
+    if kind == "dynamodb":
+        from storage import create_profile_storage
+
+        _check_source(source)
+        return create_profile_storage("dynamodb", table_name=arg)
+    raise ValueError(f"Shard source {kind!r} has no store")
+
+
+def _since_floor() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=REFRESH_SKEW_SECONDS)).isoformat()
+
+
+class ShardIndex:
+    """One shard's candidates, with features extracted once at load time."""
+
+    def __init__(self, shard_id: int, n_shards: int):
+        self.shard_id = shard_id
+        self.n_shards = n_shards
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.features: Dict[str, MatchFeatures] = {}
+        self.watermark = ""
+        # Everything updated before this was already seen by a load/refresh,
+        # so changed_since stays a recent window even when nothing changes
+        self._since_floor = ""
+        self.store = None
+        self.loaded_bytes = 0  # only measured with trace_memory=True
+        self._refreshed_at = 0.0
+        # user_id order for top_k_pruned (its index ties = merge_top_k's user_id ties)
+        self._order: Optional[List[str]] = None
+        self._order_features: List[MatchFeatures] = []
+        self.last_pruning: Dict[str, int] = {}
+
+    def add(self, item: Dict[str, Any]) -> None:
+        user_id = item.get("user_id")
+        if not isinstance(user_id, str) or shard_of(user_id, self.n_shards) != self.shard_id:
+            return
+        # Only what a match entry needs - not the whole stored profile
+        self.items[user_id] = {
+            "user_id": user_id,
+            "display_name": item.get("display_name"),
+            "bio": item.get("bio"),
+            "top_artists_preview": item.get("top_artists_preview"),
+        }
+        self.features[user_id] = extract_features(profile_for_scoring(item))
+        self._order = None
+        updated_at = item.get("updated_at")
+        if isinstance(updated_at, str) and updated_at > self.watermark:
+            self.watermark = updated_at
+
+    def attach(self, source: Source) -> None:
+        """Open the store used for refreshes; items come in through add()."""
+        self.store = _open_store(source)
+
+    def mark_loaded(self, since_floor: str = "") -> None:
+        """since_floor: _since_floor() taken before the load's scan started."""
+        self._since_floor = since_floor
+        self._refreshed_at = time.monotonic()
+
+    def load(self, source: Source) -> None:
+        """Load by scanning the source (single-process use; ShardPool feeds workers instead)."""
+        kind, arg = source
+        if kind == "items":
+            for item in arg:
+                self.add(item)
+            self.mark_loaded()
+            return
+        self.attach(source)
+        floor = _since_floor()
+        for item in self.store.scan_all():
+            self.add(item)
+        self.mark_loaded(floor)
+
+    def refresh(self, max_age: float = REFRESH_SECONDS) -> int:
+        """Apply items changed since the last load/refresh. Returns how many."""
+        if self.store is None or time.monotonic() - self._refreshed_at < max_age:
+            return 0
+        floor = _since_floor()
+        # Not max() with the watermark: a late write can be stamped before it
+        changed = self.store.changed_since(self._since_floor)
+        for item in changed:
+            self.add(item)
+        self._since_floor = floor
+        self._refreshed_at = time.monotonic()
+        return len(changed)
+
+    def top_k(
+        self, me_features: MatchFeatures, exclude_user_id: str, k: int, deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        if self._order is None:
+            self._order = sorted(self.features)
+            self._order_features = [self.features[uid] for uid in self._order]
+        order = self._order
+        # Same (score desc, user_id) order merge_top_k uses across shards
+        ranked, self.last_pruning = top_k_pruned(
+            me_features, self._order_features, k, exclude=lambda i: order[i] == exclude_user_id, deadline=deadline
+        )
+        return [match_entry(self.items[order[i]], s) for i, s in ranked]
+
+
+# -------------------------
+# Worker process side
+# -------------------------
+_shard: Optional[ShardIndex] = None
+
+
+def _init_worker(shard_id: int, n_shards: int, source: Source, trace_memory: bool) -> None:
+    """
+    An ("items", ...) source is already this shard's slice. For the other
+    sources the rows arrive from the coordinator (_worker_add, then
+    _worker_loaded).
+    """
+    global _shard
+    _shard = ShardIndex(shard_id, n_shards)
+    if trace_memory:
+        tracemalloc.start()
+    if source[0] == "items":
+        _shard.load(source)
+        _stop_trace()
+    else:
+        _shard.attach(source)
+
+
+def _stop_trace() -> None:
+    assert _shard is not None
+    if tracemalloc.is_tracing():
+        _shard.loaded_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+
+def _worker_add(items: List[Dict[str, Any]]) -> None:
+    assert _shard is not None
+    for item in items:
+        _shard.add(item)
+
+
+def _worker_loaded(since_floor: str) -> None:
+    assert _shard is not None
+    _shard.mark_loaded(since_floor)
+    _stop_trace()
+
+
+def _worker_top_k(
+    me_features: MatchFeatures, exclude_user_id: str, k: int, deadline: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], float, Dict[str, int]]:
+    """
+    Shard top-k + this worker's CPU ms (wall time is skewed when workers
+    share cores) + pruning stats. time.monotonic() is system-wide, so the
+    coordinator's deadline means the same thing here.
+    """
+    assert _shard is not None
+    t0 = time.process_time()
+    _shard.refresh()
+    result = _shard.top_k(me_features, exclude_user_id, k, deadline)
+    return result, (time.process_time() - t0) * 1000.0, _shard.last_pruning
+
+
+def _worker_stats() -> Dict[str, Any]:
+    assert _shard is not None
+    return {
+        "shard": _shard.shard_id,
+        "candidates": len(_shard.items),
+        # ru_maxrss is KiB on Linux
+        "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "loaded_kib": round(_shard.loaded_bytes / 1024.0),
+        "watermark": _shard.watermark,
+        "last_pruning": _shard.last_pruning,
+    }
+
+
+# -------------------------
+# Coordinator side
+# -------------------------
+class ShardPool:
+    """
+    One single-process executor per shard, so every shard always lands on
+    the worker that holds it. Use as a context manager (or call close()).
+    """
+
+    def __init__(self, n_shards: int, source: Source, start_method: str = "spawn", trace_memory: bool = False):
+        _check_source(source)
+        self.n_shards = n_shards
+        if source[0] == "items":
+            # Each worker gets only its own slice pickled to it
+            sources = [("items", [it for it in source[1] if _shard_id(it, n_shards) == i]) for i in range(n_shards)]
+        else:
+            sources = [source] * n_shards
+        ctx = multiprocessing.get_context(start_method)
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(i, n_shards, sources[i], trace_memory),
+            )
+            for i in range(n_shards)
+        ]
+        # Shard calls still running past their request's deadline
+        self._busy: Dict[int, Future] = {}
+        self._busy_lock = threading.Lock()
+        if source[0] != "items":
+            try:
+                self._feed(source)
+            except BaseException:
+                self.close()
+                raise
+
+    def _feed(self, source: Source) -> None:
+        """One scan of the source, each page split across the workers."""
+        store = _open_store(source)
+        floor = _since_floor()
+        queued: List[deque] = [deque() for _ in self._executors]
+        cursor = None
+        while True:
+            page, cursor = store.scan_page(cursor, LOAD_PAGE_SIZE)
+            parts: List[List[Dict[str, Any]]] = [[] for _ in self._executors]
+            for item in page:
+                shard_id = _shard_id(item, self.n_shards)
+                if shard_id is not None:
+                    parts[shard_id].append(item)
+            for i, part in enumerate(parts):
+                if not part:
+                    continue
+                if len(queued[i]) >= LOAD_MAX_QUEUED_PAGES:
+                    queued[i].popleft().result()
+                queued[i].append(self._executors[i].submit(_worker_add, part))
+            if cursor is None:
+                break
+        for ex in self._executors:
+            ex.submit(_worker_loaded, floor)
+        for q in queued:
+            for f in q:
+                f.result()
+
+    def wait_ready(self) -> List[Dict[str, Any]]:
+        """Block until every worker has loaded its shard; returns per-shard stats."""
+        return self.stats()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [f.result() for f in [ex.submit(_worker_stats) for ex in self._executors]]
+
+    def top_k(
+        self, me_features: MatchFeatures, exclude_user_id: str, k: int, deadline: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        (merged matches, coverage). coverage: covered / candidates /
+        missing_shards / partial, and shard_ms - per-shard CPU ms of the
+        shards that answered. Returned per call, so concurrent callers
+        don't see each other's numbers.
+
+        With a deadline, shards that haven't answered by then are left out
+        (missing_shards); shards that run out of time return their best so
+        far. A shard still busy with an earlier call that missed its
+        deadline is left out too, rather than queueing this call behind it.
+        """
+        futures: List[Optional[Future]] = []
+        with self._busy_lock:
+            for i, ex in enumerate(self._executors):
+                busy = self._busy.get(i)
+                if busy is not None and not busy.done():
+                    futures.append(None)
+                    continue
+                self._busy.pop(i, None)
+                futures.append(ex.submit(_worker_top_k, me_features, exclude_user_id, k, deadline))
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, _pending = wait([f for f in futures if f is not None], timeout=timeout)
+
+        partials = []
+        coverage: Dict[str, Any] = {
+            "covered": 0, "candidates": 0, "missing_shards": 0, "partial": False, "shard_ms": [],
+        }
+        for i, f in enumerate(futures):
+            if f is None or f not in done:
+                if f is not None and not f.cancel():
+                    with self._busy_lock:
+                        self._busy[i] = f
+                coverage["missing_shards"] += 1
+                coverage["partial"] = True
+                continue
+            part, ms, pruning = f.result()
+            partials.append(part)
+            coverage["shard_ms"].append(ms)
+            coverage["covered"] += pruning["covered"]
+            coverage["candidates"] += pruning["candidates"]
+            coverage["partial"] = coverage["partial"] or bool(pruning["partial"])
+        return merge_top_k(partials, k), coverage
+
+    def close(self) -> None:
+        for ex in self._executors:
+            ex.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ShardPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
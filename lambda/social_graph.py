@@ -0,0 +1,195 @@
+"""
+social_graph.py
+
+In-memory adjacency for the "connections" lists, so "who do my connections
+connect to" is a couple of array walks instead of a table scan.
+
+Users get dense integer ids on first sight; each user's outgoing
+connections are an array('i') of those ids (4 bytes per edge). Edges are
+directed, like the stored lists: A -> B when B is in A's connections.
+
+friends_of_friends(user) counts 2-hop paths me -> friend -> candidate,
+skipping me and the users I'm already connected to. The count ("mutual
+connections") is the graph-proximity signal GET /recommendations blends
+with the taste match score.
+
+The handler builds the graph from one scan on first use, adds edges from
+POST /connect as they happen, and picks up other containers' connects with
+changed_since() at most every SOCIAL_GRAPH_REFRESH_SECONDS. Each refresh
+asks for everything updated since the previous one started (minus
+REFRESH_SKEW_SECONDS for writes still in flight), so the window stays
+small and late writes aren't skipped. Refreshes run on the handler's I/O
+pool, never on the request thread, and only when the store has a
+time-ordered index (on DynamoDB: DDB_UPDATED_INDEX) - without one every
+refresh would be a full-table scan.
+
+Env vars (handler):
+  SOCIAL_GRAPH_REFRESH_SECONDS   how stale the graph may get (default 30)
+
+Run the benchmark from inside the 'lambda' folder with:
+    python bench_social_graph.py
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    REFRESH_SECONDS = float(os.environ.get("SOCIAL_GRAPH_REFRESH_SECONDS", "30"))
+except ValueError:
+    REFRESH_SECONDS = 30.0
+
+# Writes still in flight when a load/refresh starts: the next refresh
+# looks this far back
+REFRESH_SKEW_SECONDS = 5.0
+
+
+def _since_floor() -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=REFRESH_SKEW_SECONDS)).isoformat()
+
+
+class SocialGraph:
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._out: List[array] = []
+        self._lock = threading.Lock()
+        self.edges = 0
+        self.watermark = ""  # newest updated_at applied
+        # The next refresh asks for items updated after this
+        self._since_floor = ""
+        self._refreshed_at = 0.0
+        # One refresh at a time; concurrent callers skip instead of waiting
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _id(self, user_id: str) -> int:
+        """Caller holds _lock."""
+        i = self._ids.get(user_id)
+        if i is None:
+            i = len(self._names)
+            self._ids[user_id] = i
+            self._names.append(user_id)
+            self._out.append(array("i"))
+        return i
+
+    # -------------------------
+    # Updates
+    # -------------------------
+    def add_edge(self, from_user_id: str, to_user_id: str) -> bool:
+        """Returns False if the edge was already there."""
+        with self._lock:
+            a, b = self._id(from_user_id), self._id(to_user_id)
+            out = self._out[a]
+            if b in out:
+                return False
+            out.append(b)
+            self.edges += 1
+            return True
+
+    def set_connections(self, user_id: str, connections: Iterable[str]) -> None:
+        """Replace user_id's outgoing edges (the stored list is the source of truth)."""
+        with self._lock:
+            a = self._id(user_id)
+            ids = list(dict.fromkeys(self._id(c) for c in connections if isinstance(c, str) and c and c != user_id))
+            self.edges += len(ids) - len(self._out[a])
+            self._out[a] = array("i", ids)
+
+    def add_item(self, item: Dict[str, Any]) -> None:
+        user_id = item.get("user_id")
+        if not isinstance(user_id, str) or not user_id:
+            return
+        connections = item.get("connections")
+        self.set_connections(user_id, connections if isinstance(connections, list) else [])
+        updated_at = item.get("updated_at")
+        if isinstance(updated_at, str) and updated_at > self.watermark:
+            self.watermark = updated_at
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> None:
+        """items may be a lazy scan: the refresh window starts before it's read."""
+        floor = _since_floor()
+        for item in items:
+            self.add_item(item)
+        self._since_floor = floor
+        self._refreshed_at = time.monotonic()
+
+    def refresh_due(self, max_age: float = REFRESH_SECONDS) -> bool:
+        return bool(self._since_floor) and time.monotonic() - self._refreshed_at >= max_age
+
+    def refresh(self, store: Any, max_age: float = REFRESH_SECONDS) -> int:
+        """
+        Apply connections changed since the last load/refresh started.
+        Returns how many items; 0 when not due or another refresh is running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            if not self.refresh_due(max_age):
+                return 0
+            floor = _since_floor()
+            changed = store.changed_since(self._since_floor)
+            for item in changed:
+                self.add_item(item)
+            self._since_floor = floor
+            self._refreshed_at = time.monotonic()
+            return len(changed)
+        finally:
+            self._refresh_lock.release()
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def connections(self, user_id: str) -> List[str]:
+        i = self._ids.get(user_id)
+        if i is None:
+            return []
+        names = self._names
+        return [names[j] for j in self._out[i]]
+
+    def friends_of_friends(
+        self, user_id: str, limit: Optional[int] = None, via_sample: int = 3
+    ) -> List[Tuple[str, int, List[str]]]:
+        """
+        [(candidate, mutual connections, up to via_sample of those friends)],
+        most mutual connections first, ties by user_id.
+        """
+        me = self._ids.get(user_id)
+        if me is None:
+            return []
+        out, names = self._out, self._names
+        direct = out[me]
+
+        counts: Counter = Counter()
+        for friend in direct:
+            counts.update(out[friend])
+        counts.pop(me, None)
+        for friend in direct:
+            counts.pop(friend, None)
+
+        def key(kv: Tuple[int, int]) -> Tuple[int, str]:
+            return (-kv[1], names[kv[0]])
+
+        if limit is not None:
+            ranked = heapq.nsmallest(limit, counts.items(), key=key)
+        else:
+            ranked = sorted(counts.items(), key=key)
+        # "via" only for what's returned: which of my connections link to c
+        return [(names[c], n, [names[f] for f in direct if c in out[f]][:via_sample]) for c, n in ranked]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._names),
+            "edges": self.edges,
+            "watermark": self.watermark,
+            # 4 bytes per edge in the arrays; the id dict/list dominate otherwise
+            "edge_bytes": sum(len(a) * a.itemsize for a in self._out),
+        }
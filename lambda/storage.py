@@ -0,0 +1,477 @@
+"""
+storage.py
+
+Pluggable profile storage for the Lambda handler.
+
+ProfileStorage is the small interface the handler needs:
+  get / batch_get / put / put_many / update (optionally conditional) /
+  scan_page (paginated) / changed_since
+
+Implementations:
+  - DynamoProfileStorage: a boto3 Table (production), or the in-memory
+    LocalTable stand-in ("memory"). changed_since is a table scan unless
+    the table has a time-ordered GSI (DDB_UPDATED_INDEX, see below)
+  - SQLiteProfileStorage: a local file with real indexes on user_id and
+    updated_at - fast enough to benchmark matching against millions of rows
+
+Selected with PROFILE_STORE=dynamodb (default) | sqlite | memory.
+PROFILE_STORE_PATH sets the SQLite file (default /tmp/music-soulmate-profiles.sqlite3).
+
+Time-ordered GSI (DynamoDB): DDB_UPDATED_INDEX names a GSI with partition
+key "updated_day" (YYYY-MM-DD, string), sort key "updated_at" and
+ProjectionType=ALL - changed_since returns the index's items as they are, so
+with KEYS_ONLY (the console default) callers would get items without a
+profile and treat those users as empty. All of a day's writes land in one
+index partition, so a large bulk import can throttle on it; spread big
+imports out or give the index enough write capacity. Every
+write through this module sets updated_day from updated_at (writers that go
+to the table directly - bulk_import.py, profile_store.py - use
+with_updated_day), so changed_since(since) becomes one Query per day since
+then instead of a scan. A since older than UPDATED_INDEX_MAX_DAYS days still
+scans. Items written before the index existed need updated_day backfilled
+once; backfill_updated_day() sets just that attribute:
+    python -c "from storage import create_profile_storage; print(create_profile_storage().backfill_updated_day())"
+The memory engine always has the index.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_SQLITE_PATH = "/tmp/music-soulmate-profiles.sqlite3"
+BATCH_GET_MAX = 100
+# UnprocessedKeys (throttling) are re-sent with exponential backoff, this many times
+BATCH_GET_MAX_RETRIES = 6
+BATCH_GET_BASE_DELAY = 0.05
+
+UPDATED_INDEX = "updated_day-updated_at-index"
+UPDATED_INDEX_MAX_DAYS = 31
+
+
+class ProfileStorage:
+    """Interface. Items are plain dicts keyed by "user_id"."""
+
+    name = "base"
+    # changed_since over a recent window is an index read, not a scan
+    time_indexed = False
+
+    def get(self, user_id: str, attributes: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        attributes = only return these top-level attributes (missing ones are
+        left out). None = the whole item.
+        """
+        raise NotImplementedError
+
+    def batch_get(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns {user_id: item} for the ids that exist."""
+        raise NotImplementedError
+
+    def put(self, item: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    def update(
+        self,
+        user_id: str,
+        updates: Dict[str, Any],
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        SET the given attributes.
+
+        expected = {attr: value} makes it conditional: every attr must currently
+        equal value (value None = attr must NOT exist). Returns False if the
+        condition failed, True if the update was applied.
+        """
+        raise NotImplementedError
+
+    def scan_page(
+        self, cursor: Any = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Any]:
+        """One page of items + an opaque cursor for the next page (None = done)."""
+        raise NotImplementedError
+
+    def changed_since(self, since: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Items with updated_at > since, oldest first."""
+        raise NotImplementedError
+
+    def scan_all(self, page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            items, cursor = self.scan_page(cursor, page_size)
+            yield from items
+            if cursor is None:
+                return
+
+
+def _is_conditional_check_failed(exc: Exception) -> bool:
+    response = getattr(exc, "response", None) or {}
+    return (response.get("Error") or {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def with_updated_day(item: Dict[str, Any]) -> Dict[str, Any]:
+    """item plus updated_day (the GSI partition key), taken from its updated_at."""
+    updated_at = item.get("updated_at")
+    if isinstance(updated_at, str) and len(updated_at) >= 10:
+        return dict(item, updated_day=updated_at[:10])
+    return item
+
+
+class DynamoProfileStorage(ProfileStorage):
+    def __init__(
+        self,
+        table,
+        resource=None,
+        name: str = "dynamodb",
+        updated_index: Optional[str] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        table:         boto3 Table (or local_table.LocalTable)
+        resource:      boto3 DynamoDB resource, for BatchGetItem. Without it
+                       batch_get falls back to one get_item per id.
+        updated_index: name of the updated_day/updated_at GSI, if the table
+                       has one (changed_since queries it instead of scanning)
+        """
+        self.table = table
+        self.resource = resource
+        self.name = name
+        self.updated_index = updated_index
+        self._sleep = sleep
+
+    @property
+    def time_indexed(self) -> bool:  # type: ignore[override]
+        return bool(self.updated_index)
+
+    def get(self, user_id: str, attributes: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        kwargs: Dict[str, Any] = {}
+        if attributes:
+            names = {f"#p{i}": attr for i, attr in enumerate(attributes)}
+            kwargs["ProjectionExpression"] = ", ".join(names)
+            kwargs["ExpressionAttributeNames"] = names
+        return self.table.get_item(Key={"user_id": user_id}, **kwargs).get("Item")
+
+    def batch_get(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(u for u in user_ids if u))
+        out: Dict[str, Dict[str, Any]] = {}
+
+        if self.resource is None:
+            for user_id in ids:
+                item = self.get(user_id)
+                if item:
+                    out[user_id] = item
+            return out
+
+        for i in range(0, len(ids), BATCH_GET_MAX):
+            request = {self.table.name: {"Keys": [{"user_id": u} for u in ids[i:i + BATCH_GET_MAX]]}}
+            attempt = 0
+            while request:
+                if attempt:
+                    if attempt > BATCH_GET_MAX_RETRIES:
+                        left = len(request[self.table.name]["Keys"])
+                        raise RuntimeError(f"BatchGetItem: {left} keys still unprocessed after {attempt} attempts")
+                    self._sleep(BATCH_GET_BASE_DELAY * (2 ** (attempt - 1)))
+                resp = self.resource.batch_get_item(RequestItems=request)
+                for item in (resp.get("Responses") or {}).get(self.table.name, []):
+                    out[item["user_id"]] = item
+                request = resp.get("UnprocessedKeys") or None
+                attempt += 1
+        return out
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self.table.put_item(Item=with_updated_day(item) if self.updated_index else item)
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        with self.table.batch_writer(overwrite_by_pkeys=["user_id"]) as writer:
+            for item in items:
+                writer.put_item(Item=with_updated_day(item) if self.updated_index else item)
+
+    def update(
+        self,
+        user_id: str,
+        updates: Dict[str, Any],
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        if self.updated_index and "updated_at" in updates:
+            updates = with_updated_day(updates)
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        sets: List[str] = []
+        for i, (attr, val) in enumerate(updates.items()):
+            names[f"#u{i}"] = attr
+            values[f":u{i}"] = val
+            sets.append(f"#u{i} = :u{i}")
+
+        kwargs: Dict[str, Any] = {}
+        if expected:
+            conds: List[str] = []
+            for i, (attr, val) in enumerate(expected.items()):
+                names[f"#c{i}"] = attr
+                if val is None:
+                    conds.append(f"attribute_not_exists(#c{i})")
+                else:
+                    values[f":c{i}"] = val
+                    conds.append(f"#c{i} = :c{i}")
+            kwargs["ConditionExpression"] = " AND ".join(conds)
+
+        try:
+            self.table.update_item(
+                Key={"user_id": user_id},
+                UpdateExpression="SET " + ", ".join(sets),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                **kwargs,
+            )
+        except Exception as e:
+            if expected and _is_conditional_check_failed(e):
+                return False
+            raise
+        return True
+
+    def scan_page(
+        self, cursor: Any = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Any]:
+        kwargs: Dict[str, Any] = {}
+        if cursor:
+            kwargs["ExclusiveStartKey"] = cursor
+        if limit:
+            kwargs["Limit"] = limit
+        resp = self.table.scan(**kwargs)
+        return resp.get("Items", []), resp.get("LastEvaluatedKey")
+
+    def _updated_days(self, since: str) -> Optional[List[str]]:
+        """The updated_day partitions to query for since, or None to scan."""
+        if not self.updated_index:
+            return None
+        try:
+            first = date.fromisoformat(since[:10])
+        except ValueError:
+            return None
+        # Through tomorrow: writers' clocks (and time zones in since) may be ahead
+        last = datetime.now(timezone.utc).date() + timedelta(days=1)
+        if (last - first).days > UPDATED_INDEX_MAX_DAYS:
+            return None
+        return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+    def changed_since(self, since: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        days = self._updated_days(since)
+        if days is not None:
+            out: List[Dict[str, Any]] = []
+            for day in days:
+                kwargs: Dict[str, Any] = {
+                    "IndexName": self.updated_index,
+                    "KeyConditionExpression": "#d = :d AND #u > :since",
+                    "ExpressionAttributeNames": {"#d": "updated_day", "#u": "updated_at"},
+                    "ExpressionAttributeValues": {":d": day, ":since": since},
+                }
+                while True:
+                    resp = self.table.query(**kwargs)
+                    out += resp.get("Items", [])
+                    # Days ascend and each day comes back in updated_at order
+                    if limit and len(out) >= limit:
+                        return out[:limit]
+                    if not resp.get("LastEvaluatedKey"):
+                        break
+                    kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+            return out
+
+        # No time-ordered index: a filtered scan costs the same read
+        # capacity as a client-side filter, so keep it simple.
+        out = [it for it in self.scan_all() if str(it.get("updated_at") or "") > since]
+        out.sort(key=lambda it: str(it.get("updated_at") or ""))
+        return out[:limit] if limit else out
+
+    def backfill_updated_day(self) -> int:
+        """
+        Set updated_day on items that predate the GSI. Only that attribute
+        is written, and only if updated_at hasn't moved since the scan (a
+        newer write sets updated_day itself). Returns how many were updated.
+        """
+        n = 0
+        for item in self.scan_all():
+            updated_at = item.get("updated_at")
+            if "updated_day" in item or not isinstance(updated_at, str) or len(updated_at) < 10:
+                continue
+            if self.update(item["user_id"], {"updated_day": updated_at[:10]}, expected={"updated_at": updated_at}):
+                n += 1
+        return n
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class SQLiteProfileStorage(ProfileStorage):
+    """
+    One row per user: the item as JSON plus indexed user_id / updated_at columns.
+
+    Indexes:
+      - user_id    (PRIMARY KEY)  -> get, batch_get, keyset-paginated scans
+      - updated_at (idx)          -> changed_since range queries
+    """
+
+    name = "sqlite"
+    time_indexed = True
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            " user_id TEXT PRIMARY KEY,"
+            " updated_at TEXT NOT NULL DEFAULT '',"
+            " item TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_profiles_updated_at ON profiles (updated_at)")
+
+    @staticmethod
+    def _row(item: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (
+            item["user_id"],
+            str(item.get("updated_at") or ""),
+            json.dumps(item, default=_json_default, ensure_ascii=False),
+        )
+
+    def _query(self, sql: str, params: Tuple[Any, ...] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, user_id: str, attributes: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT item FROM profiles WHERE user_id = ?", (user_id,))
+        if not rows:
+            return None
+        item = json.loads(rows[0][0])
+        if attributes:
+            return {a: item[a] for a in attributes if a in item}
+        return item
+
+    def batch_get(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        ids = list(dict.fromkeys(u for u in user_ids if u))
+        out: Dict[str, Dict[str, Any]] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for (raw,) in self._query(f"SELECT item FROM profiles WHERE user_id IN ({marks})", tuple(chunk)):
+                item = json.loads(raw)
+                out[item["user_id"]] = item
+        return out
+
+    def put(self, item: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, updated_at, item) VALUES (?, ?, ?)",
+                self._row(item),
+            )
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        rows = [self._row(it) for it in items]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO profiles (user_id, updated_at, item) VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def update(
+        self,
+        user_id: str,
+        updates: Dict[str, Any],
+        expected: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT item FROM profiles WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                item = json.loads(row[0]) if row else {"user_id": user_id}
+
+                for attr, val in (expected or {}).items():
+                    if val is None:
+                        ok = attr not in item
+                    else:
+                        ok = attr in item and item[attr] == json.loads(json.dumps(val, default=_json_default))
+                    if not ok:
+                        self._conn.execute("ROLLBACK")
+                        return False
+
+                item.update(updates)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO profiles (user_id, updated_at, item) VALUES (?, ?, ?)",
+                    self._row(item),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def scan_page(
+        self, cursor: Any = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Any]:
+        # Keyset pagination on the primary key: every page is an index seek
+        page_size = limit or 1000
+        rows = self._query(
+            "SELECT user_id, item FROM profiles WHERE user_id > ? ORDER BY user_id LIMIT ?",
+            (cursor or "", page_size),
+        )
+        items = [json.loads(raw) for _, raw in rows]
+        next_cursor = rows[-1][0] if len(rows) == page_size else None
+        return items, next_cursor
+
+    def changed_since(self, since: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        sql = "SELECT item FROM profiles WHERE updated_at > ? ORDER BY updated_at"
+        params: Tuple[Any, ...] = (since,)
+        if limit:
+            sql += " LIMIT ?"
+            params = (since, limit)
+        return [json.loads(raw) for (raw,) in self._query(sql, params)]
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM profiles")[0][0]
+
+
+def create_profile_storage(kind: Optional[str] = None, table_name: Optional[str] = None) -> ProfileStorage:
+    kind = (kind or os.environ.get("PROFILE_STORE") or "dynamodb").strip().lower()
+
+    if kind == "sqlite":
+        return SQLiteProfileStorage(os.environ.get("PROFILE_STORE_PATH") or DEFAULT_SQLITE_PATH)
+
+    if kind == "memory":
+        from local_table import LocalResource, LocalTable
+
+        table = LocalTable(name=table_name or "local-profiles", indexes={UPDATED_INDEX: ("updated_day", "updated_at")})
+        return DynamoProfileStorage(table, resource=LocalResource(table), name="memory", updated_index=UPDATED_INDEX)
+
+    if kind == "dynamodb":
+        # Imported here so local engines don't need boto3 installed
+        from dynamo_client import dynamodb
+
+        name = table_name or os.environ.get("TABLE_NAME") or "music-soulmate-profiles"
+        return DynamoProfileStorage(
+            dynamodb.Table(name), resource=dynamodb, updated_index=os.environ.get("DDB_UPDATED_INDEX") or None
+        )
+
+    raise ValueError(f"Unknown PROFILE_STORE: {kind!r} (expected dynamodb, sqlite or memory)")
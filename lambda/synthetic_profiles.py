@@ -0,0 +1,193 @@
+"""
+synthetic_profiles.py
+
+Realistic fake taste profiles for benchmarks and load tests.
+
+- Artist / genre / track popularity is Zipf-distributed (a few hugely
+  popular names, a long tail nobody else shares)
+- Profiles come in every shape matching.py accepts:
+    "day3"    - build_taste_profile output (sample.*, top_genres=[{"genre","count"}])
+    "preview" - top_artists_preview / top_genres_preview / top_tracks
+    "weights" - favorite_artists + genre_weights={genre: float} + tracks
+    "legacy"  - top_artists / top_genres as plain string lists
+- Track strings mix en dashes, hyphens and feat./ft. so _norm has real work
+
+Deterministic for a given seed. PURE Python.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from profile_items import item_fingerprint
+
+SHAPES = ("day3", "preview", "weights", "legacy")
+BASE_UPDATED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+_GENRE_WORDS = [
+    "pop", "k-pop", "r&b", "indie", "bedroom pop", "art pop", "hip hop", "k-rap",
+    "alt z", "dance pop", "rock", "edm", "soul", "jazz", "trap", "house",
+    "lo-fi", "emo", "shoegaze", "city pop", "j-pop", "latin", "afrobeats", "folk",
+]
+_DASHES = [" – ", " - ", " — ", "-"]
+_FEATS = ["feat.", "ft.", "ft", "featuring"]
+
+
+class ZipfSampler:
+    """Draw ranks 0..n-1 with P(rank) ~ 1 / (rank + 1) ** s."""
+
+    def __init__(self, n: int, s: float = 1.1):
+        self.n = n
+        self._cum = list(itertools.accumulate(1.0 / (r + 1) ** s for r in range(n)))
+
+    def sample(self, rng: random.Random) -> int:
+        return bisect.bisect_left(self._cum, rng.random() * self._cum[-1])
+
+    def sample_unique(self, rng: random.Random, k: int) -> List[int]:
+        k = min(k, self.n)
+        seen: Dict[int, None] = {}
+        # Zipf collides a lot at the head; fall back to uniform after a while
+        for _ in range(k * 20):
+            seen.setdefault(self.sample(rng), None)
+            if len(seen) == k:
+                return list(seen)
+        while len(seen) < k:
+            seen.setdefault(rng.randrange(self.n), None)
+        return list(seen)
+
+
+class SyntheticCatalog:
+    def __init__(
+        self,
+        n_artists: int = 20000,
+        n_genres: int = 400,
+        tracks_per_artist: int = 8,
+        zipf_s: float = 1.1,
+        seed: int = 0,
+    ):
+        rng = random.Random(seed)
+        self.genres = [
+            _GENRE_WORDS[i] if i < len(_GENRE_WORDS) else f"{rng.choice(_GENRE_WORDS)} {i}"
+            for i in range(n_genres)
+        ]
+        self.artists = [f"Artist {i}" for i in range(n_artists)]
+        self.tracks_per_artist = tracks_per_artist
+
+        genre_zipf = ZipfSampler(n_genres, zipf_s)
+        self.artist_genres = [
+            [self.genres[g] for g in genre_zipf.sample_unique(rng, rng.randint(1, 3))]
+            for _ in range(n_artists)
+        ]
+
+        self.artist_zipf = ZipfSampler(n_artists, zipf_s)
+        self.genre_zipf = genre_zipf
+
+    def track_title(self, rng: random.Random, artist_idx: int) -> str:
+        """'Song N – Artist', with dash / feat. spelling variants."""
+        song = rng.randrange(self.tracks_per_artist)
+        title = f"Song {artist_idx}.{song}"
+        if song == 0:
+            guest = self.artists[(artist_idx * 7 + 1) % len(self.artists)]
+            title += f" ({rng.choice(_FEATS)} {guest})"
+        return f"{title}{rng.choice(_DASHES)}{self.artists[artist_idx]}"
+
+
+def generate_profile(
+    rng: random.Random,
+    catalog: SyntheticCatalog,
+    shape: str = "day3",
+    n_artists: int = 5,
+    n_tracks: int = 5,
+    n_genres: int = 5,
+) -> Dict[str, Any]:
+    artist_ids = catalog.artist_zipf.sample_unique(rng, n_artists)
+    artists = [catalog.artists[a] for a in artist_ids]
+    tracks = [catalog.track_title(rng, rng.choice(artist_ids)) for _ in range(n_tracks)]
+
+    genre_counts: Dict[str, int] = {}
+    for a in artist_ids:
+        for g in catalog.artist_genres[a]:
+            genre_counts[g] = genre_counts.get(g, 0) + 1
+    genres = sorted(genre_counts, key=lambda g: -genre_counts[g])[:n_genres]
+
+    if shape == "day3":
+        return {
+            "user_id": "unknown-user",
+            "stats": {"artist_count": len(artists), "track_count": len(tracks), "genre_variety": len(genre_counts)},
+            "top_genres": [{"genre": g, "count": genre_counts[g]} for g in genres],
+            "sample": {"top_artists": artists, "top_tracks": tracks},
+        }
+    if shape == "preview":
+        return {
+            "top_artists_preview": artists,
+            "top_genres_preview": genres,
+            "top_tracks": tracks,
+        }
+    if shape == "weights":
+        total = float(sum(genre_counts[g] for g in genres)) or 1.0
+        return {
+            "favorite_artists": [{"name": a} for a in artists],
+            "genre_weights": {g: round(genre_counts[g] / total, 4) for g in genres},
+            "tracks": tracks,
+        }
+    if shape == "legacy":
+        return {
+            "top_artists": artists,
+            "top_genres": genres,
+            "top_tracks": tracks,
+        }
+    raise ValueError(f"Unknown shape: {shape!r} (expected one of {SHAPES})")
+
+
+def generate_build_input(rng: random.Random, catalog: SyntheticCatalog, n_items: int = 20) -> List[Dict[str, Any]]:
+    """Day 3 POST body 'items' list, for build_taste_profile benchmarks."""
+    out = []
+    for a in (catalog.artist_zipf.sample(rng) for _ in range(n_items)):
+        out.append(
+            {
+                "name": f"Song {a}",
+                "artist": catalog.artists[a],
+                "genres": catalog.artist_genres[a],
+                "popularity": rng.randint(1, 100),
+            }
+        )
+    return out
+
+
+def generate_items(
+    n: int,
+    seed: int = 0,
+    shapes: Sequence[str] = SHAPES,
+    catalog: Optional[SyntheticCatalog] = None,
+    user_prefix: str = "synthetic",
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stored-item shape (what POST /taste-profile writes), one per user.
+    Profile shapes rotate through `shapes`.
+    """
+    rng = random.Random(seed)
+    catalog = catalog or SyntheticCatalog(seed=seed)
+    for i in range(n):
+        profile = generate_profile(
+            rng,
+            catalog,
+            shape=shapes[i % len(shapes)],
+            n_artists=rng.randint(3, 10),
+            n_tracks=rng.randint(3, 10),
+        )
+        artists_preview = profile.get("top_artists_preview") or (profile.get("sample") or {}).get("top_artists") or []
+        item = {
+            "user_id": f"{user_prefix}_{i:07d}",
+            "profile": profile,
+            "updated_at": (BASE_UPDATED_AT + timedelta(seconds=i)).isoformat(),
+            "display_name": f"Synthetic {i}",
+            "bio": "",
+            "top_artists_preview": list(artists_preview)[:5],
+            "connections": [],
+        }
+        item["features_fp"] = item_fingerprint(item)
+        yield item
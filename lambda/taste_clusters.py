@@ -0,0 +1,357 @@
+"""
+taste_clusters.py
+
+Offline job: group users into taste clusters (spherical k-means on sparse
+artist/genre vectors) so GET /matches can score only the users in the
+requester's nearest few clusters instead of everyone.
+
+Vectors use the match weights - artist 3, genre 2 (tracks are too sparse to
+cluster on) - L2-normalized, so a dot product is cosine similarity.
+Centroids are kept sparse (top `centroid_terms` tokens), and assignment
+goes through an inverted index token -> [(cluster, weight)], so one
+iteration costs about one pass over the non-zeros.
+
+Each user's primary cluster plus their distances (1 - cosine) to the
+nearest `store_top` centroids are saved as compact JSON:
+  {"version": 1, "centroids": [[[token, w], ...], ...],
+   "assignments": {"user_id": [[cluster, distance], ...], ...}}
+
+At query time (handler, TASTE_CLUSTERS_PATH set) the requester's stored
+nearest clusters - or, for users newer than the build, the nearest
+centroids to their features - pick which clusters get scored. Users that
+aren't in the file are always scored, and the handler falls back to the
+exact path with ?exact=1 or when the probed clusters can't fill the limit.
+
+Env vars (handler):
+  TASTE_CLUSTERS_PATH     cluster file written by this job (unset = off, exact matching)
+  TASTE_CLUSTER_PROBES    how many nearest clusters to search (default 3)
+
+Run this from inside the 'lambda' folder with:
+    python taste_clusters.py --out taste_clusters.json                   # from PROFILE_STORE
+    python taste_clusters.py --synthetic 20000 --k 32 --eval-queries 50  # balance, rebuild time, recall
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from matching import MatchFeatures, extract_features, score_features
+from profile_items import profile_for_scoring
+
+FORMAT_VERSION = 1
+ARTIST_WEIGHT = 3.0
+GENRE_WEIGHT = 2.0
+
+TASTE_CLUSTERS_PATH = os.environ.get("TASTE_CLUSTERS_PATH", "")
+try:
+    PROBES = max(0, int(os.environ.get("TASTE_CLUSTER_PROBES", "3")))
+except ValueError:
+    PROBES = 3
+
+Vector = Dict[str, float]
+
+
+def taste_vector(features: MatchFeatures) -> Vector:
+    """Unit-length sparse vector: "a:<artist>" and "g:<genre>" tokens."""
+    norm = math.sqrt(len(features.artists) * ARTIST_WEIGHT ** 2 + len(features.genres) * GENRE_WEIGHT ** 2)
+    if norm == 0:
+        return {}
+    vec = {f"a:{a}": ARTIST_WEIGHT / norm for a in features.artists}
+    vec.update({f"g:{g}": GENRE_WEIGHT / norm for g in features.genres})
+    return vec
+
+
+def _normalize_top(acc: Dict[str, float], terms: int) -> Vector:
+    top = heapq.nlargest(terms, acc.items(), key=lambda kv: kv[1]) if len(acc) > terms else list(acc.items())
+    norm = math.sqrt(sum(w * w for _t, w in top))
+    return {t: w / norm for t, w in top} if norm else {}
+
+
+class TasteClusters:
+    def __init__(self, centroids: List[Vector], assignments: Dict[str, List[Tuple[int, float]]]):
+        self.centroids = centroids
+        self.assignments = assignments
+        self._index: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for c, centroid in enumerate(centroids):
+            for token, w in centroid.items():
+                self._index[token].append((c, w))
+        self.members: List[Set[str]] = [set() for _ in centroids]
+        for user_id, nearest in assignments.items():
+            if nearest:
+                self.members[nearest[0][0]].add(user_id)
+
+    def __len__(self) -> int:
+        return len(self.centroids)
+
+    def similarities(self, vec: Vector) -> Dict[int, float]:
+        """Cosine to every centroid sharing a token with vec (others are 0)."""
+        sims: Dict[int, float] = defaultdict(float)
+        index = self._index
+        for token, w in vec.items():
+            for c, cw in index.get(token, ()):
+                sims[c] += w * cw
+        return sims
+
+    def nearest(self, vec: Vector, n: int) -> List[Tuple[int, float]]:
+        """[(cluster, distance)] for the n nearest centroids, nearest first."""
+        sims = self.similarities(vec)
+        best = heapq.nlargest(n, sims.items(), key=lambda kv: (kv[1], -kv[0]))
+        return [(c, round(1.0 - s, 4)) for c, s in best]
+
+    def probe_clusters(self, user_id: str, features: MatchFeatures, probes: int) -> Set[int]:
+        stored = self.assignments.get(user_id)
+        if stored and len(stored) >= probes:
+            return {c for c, _d in stored[:probes]}
+        return {c for c, _d in self.nearest(taste_vector(features), probes)}
+
+    def allowed(self, clusters: Set[int]):
+        """Predicate on user_id: in one of `clusters`, or not clustered at all (newer than the build)."""
+        members = self.members
+        assignments = self.assignments
+
+        def check(user_id: str) -> bool:
+            nearest = assignments.get(user_id)
+            return not nearest or nearest[0][0] in clusters
+
+        check.count = sum(len(members[c]) for c in clusters)  # type: ignore[attr-defined]
+        return check
+
+    def balance(self) -> Dict[str, Any]:
+        sizes = [len(m) for m in self.members]
+        total = sum(sizes) or 1
+        mean = statistics.mean(sizes) if sizes else 0.0
+        return {
+            "clusters": len(sizes),
+            "users": sum(sizes),
+            "min": min(sizes, default=0),
+            "max": max(sizes, default=0),
+            "mean": round(mean, 1),
+            "cv": round(statistics.pstdev(sizes) / mean, 3) if mean else 0.0,
+            "largest_share": round(max(sizes, default=0) / total, 3),
+            "empty": sum(1 for s in sizes if s == 0),
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "centroids": [sorted(([t, round(w, 5)] for t, w in c.items()), key=lambda tw: -tw[1]) for c in self.centroids],
+            "assignments": {u: [[c, d] for c, d in nearest] for u, nearest in self.assignments.items()},
+        }
+
+    @classmethod
+    def from_json(cls, doc: Dict[str, Any]) -> "TasteClusters":
+        if doc.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported taste clusters version: {doc.get('version')}")
+        centroids = [{str(t): float(w) for t, w in c} for c in doc["centroids"]]
+        assignments = {str(u): [(int(c), float(d)) for c, d in nearest] for u, nearest in doc["assignments"].items()}
+        return cls(centroids, assignments)
+
+    @classmethod
+    def load(cls, path: str) -> "TasteClusters":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, separators=(",", ":"), ensure_ascii=False)
+
+
+def build_taste_clusters(
+    users: Iterable[Tuple[str, MatchFeatures]],
+    k: int = 32,
+    iterations: int = 10,
+    centroid_terms: int = 300,
+    store_top: int = 4,
+    seed: int = 0,
+) -> Tuple[TasteClusters, Dict[str, Any]]:
+    """users: (user_id, features) pairs. Returns (clusters, stats)."""
+    started = time.perf_counter()
+    ids: List[str] = []
+    vectors: List[Vector] = []
+    for user_id, features in users:
+        vec = taste_vector(features)
+        if vec:
+            ids.append(user_id)
+            vectors.append(vec)
+    if not vectors:
+        return TasteClusters([], {}), {"users": 0, "seconds": 0.0}
+
+    k = min(k, len(vectors))
+    rng = random.Random(seed)
+    centroids = [dict(vectors[i]) for i in rng.sample(range(len(vectors)), k)]
+    labels = [-1] * len(vectors)
+    moved_history: List[int] = []
+
+    for _ in range(iterations):
+        model = TasteClusters(centroids, {})
+        moved = 0
+        fit: List[float] = []
+        for n, vec in enumerate(vectors):
+            sims = model.similarities(vec)
+            best = max(sims.items(), key=lambda kv: (kv[1], -kv[0]), default=(0, 0.0))
+            if best[0] != labels[n]:
+                moved += 1
+                labels[n] = best[0]
+            fit.append(best[1])
+        moved_history.append(moved)
+
+        sums: List[Dict[str, float]] = [defaultdict(float) for _ in range(k)]
+        for label, vec in zip(labels, vectors):
+            acc = sums[label]
+            for token, w in vec.items():
+                acc[token] += w
+        # Empty clusters restart at the worst-fitting users
+        worst = iter(sorted(range(len(vectors)), key=lambda n: fit[n]))
+        centroids = [
+            _normalize_top(acc, centroid_terms) if acc else dict(vectors[next(worst)])
+            for acc in sums
+        ]
+        if moved <= len(vectors) * 0.005:
+            break
+
+    model = TasteClusters(centroids, {})
+    assignments = {user_id: model.nearest(vec, store_top) for user_id, vec in zip(ids, vectors)}
+    clusters = TasteClusters(centroids, assignments)
+    stats = {
+        "users": len(ids),
+        "k": k,
+        "iterations": len(moved_history),
+        "moved_per_iteration": moved_history,
+        "seconds": round(time.perf_counter() - started, 3),
+        "balance": clusters.balance(),
+    }
+    return clusters, stats
+
+
+# -------------------------
+# Handler side
+# -------------------------
+_active: Optional[TasteClusters] = None
+_active_loaded = False
+_active_lock = threading.Lock()
+
+
+def set_taste_clusters(clusters: Optional[TasteClusters]) -> None:
+    """Install clusters (or None for exact matching). Used by tests/benches."""
+    global _active, _active_loaded
+    with _active_lock:
+        _active = clusters
+        _active_loaded = True
+
+
+def taste_clusters() -> Optional[TasteClusters]:
+    """The clusters /matches probes, or None when matching is exact."""
+    global _active, _active_loaded
+    if _active_loaded:
+        return _active
+    with _active_lock:
+        if not _active_loaded:
+            if TASTE_CLUSTERS_PATH:
+                try:
+                    _active = TasteClusters.load(TASTE_CLUSTERS_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"TASTE_CLUSTERS_PATH={TASTE_CLUSTERS_PATH} could not be loaded ({e}); using exact matching")
+            _active_loaded = True
+    return _active
+
+
+# -------------------------
+# Offline evaluation
+# -------------------------
+def evaluate_recall(
+    clusters: TasteClusters,
+    users: Sequence[Tuple[str, MatchFeatures]],
+    queries: int,
+    probes: Sequence[int],
+    k: int = 10,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    recall@k of the clustered search vs scoring everyone, over matches with
+    a non-zero score (ties with the exact k-th score count as hits).
+    """
+    rng = random.Random(seed)
+    sample = rng.sample(range(len(users)), min(queries, len(users)))
+    rows = []
+    for n_probes in probes:
+        recalls: List[float] = []
+        scanned: List[float] = []
+        for q in sample:
+            me_id, me = users[q]
+            exact = [
+                (score_features(me, f)["match_score"], uid) for uid, f in users if uid != me_id
+            ]
+            exact = [e for e in exact if e[0] > 0]
+            if not exact:
+                continue
+            exact.sort(key=lambda e: -e[0])
+            top = exact[:k]
+            kth = top[-1][0]
+            allowed = clusters.allowed(clusters.probe_clusters(me_id, me, n_probes))
+            got = [e for e in exact if allowed(e[1])]
+            got.sort(key=lambda e: -e[0])
+            # Anything scoring >= the exact k-th best is as good as an exact hit
+            recalls.append(sum(1 for s, _uid in got[:k] if s >= kth) / len(top))
+            scanned.append(sum(1 for uid, _f in users if allowed(uid)) / len(users))
+        rows.append({
+            "probes": n_probes,
+            "recall_at_k": round(statistics.mean(recalls), 3) if recalls else None,
+            "scored_share": round(statistics.mean(scanned), 3) if scanned else None,
+        })
+    return rows
+
+
+def _users_from_items(items: Iterable[Dict[str, Any]]) -> List[Tuple[str, MatchFeatures]]:
+    return [
+        (it["user_id"], extract_features(profile_for_scoring(it)))
+        for it in items
+        if isinstance(it.get("user_id"), str)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build taste clusters for /matches.")
+    parser.add_argument("--out", default="taste_clusters.json")
+    parser.add_argument("--k", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--centroid-terms", type=int, default=300)
+    parser.add_argument("--store-top", type=int, default=4, help="nearest centroids saved per user")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N synthetic profiles instead of the store")
+    parser.add_argument("--eval-queries", type=int, default=0, help="also report recall vs exact over N queries")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic_profiles import generate_items
+
+        items: Iterable[Dict[str, Any]] = generate_items(args.synthetic, seed=args.seed)
+    else:
+        from storage import create_profile_storage
+
+        items = create_profile_storage().scan_all()
+    users = _users_from_items(items)
+
+    clusters, stats = build_taste_clusters(
+        users, args.k, args.iterations, args.centroid_terms, args.store_top, args.seed
+    )
+    clusters.save(args.out)
+    stats["out"] = args.out
+    if args.eval_queries:
+        stats["recall"] = evaluate_recall(
+            clusters, users, args.eval_queries, [p for p in (1, 2, 3, 5, 8) if p <= len(clusters)], seed=args.seed
+        )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
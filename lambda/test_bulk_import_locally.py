@@ -0,0 +1,86 @@
+"""
+Local test for bulk_import against the in-memory table stand-in.
+
+Run this from inside the 'lambda' folder with:
+    python test_bulk_import_locally.py
+"""
+
+import json
+import os
+
+from bulk_import import build_items, iter_records, load_items
+from local_table import LocalTable
+from storage import UPDATED_INDEX, DynamoProfileStorage
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+
+
+def test_saved_file_becomes_profile_item():
+    items = build_items(iter_records([DATA_DIR]))
+    item = next(it for it in items if it["user_id"] == "brianamay48")
+
+    assert item["top_artists_preview"] == []  # built profile keeps artists under sample
+    assert item["profile"]["sample"]["top_artists"][0] == "The Weeknd"
+    assert item["profile"]["sample"]["top_tracks"][0] == "JUMP – BLACKPINK"
+    assert item["profile"]["top_genres"][0] == {"genre": "k-pop", "count": 1}
+    assert item["connections"] == []
+
+
+def test_load_retries_unprocessed_items():
+    records = [
+        {"user_id": f"cohort_{i:04d}", "top_artists": [f"Artist {i % 37}"], "top_genres": ["pop"]}
+        for i in range(1000)
+    ]
+    table = LocalTable(unprocessed_every=5)
+    report = load_items(table, build_items(records), workers=4, chunk_size=50)
+
+    assert report["failed_items"] == 0
+    assert table.calls["unprocessed_items"] > 0
+    assert len(table) == 1000
+    assert table.get_item(Key={"user_id": "cohort_0999"})["Item"]["profile"]["sample"]["top_artists"] == ["Artist 0"]
+
+
+def test_imported_items_show_up_in_changed_since():
+    table = LocalTable(indexes={UPDATED_INDEX: ("updated_day", "updated_at")})
+    store = DynamoProfileStorage(table, updated_index=UPDATED_INDEX)
+    items = build_items({"user_id": f"new_{i}", "top_artists": ["NCT 127"]} for i in range(30))
+    load_items(table, items, workers=2, chunk_size=10)
+
+    # Start of the import's day: a GSI query, no scan
+    changed = store.changed_since(items[0]["updated_at"][:10])
+    assert sorted(it["user_id"] for it in changed) == sorted(it["user_id"] for it in items)
+    assert table.calls["scan"] == 0
+
+
+def test_reimport_keeps_connections():
+    table = LocalTable()
+    load_items(table, build_items([{"user_id": "a", "top_artists": ["Old"]}, {"user_id": "b"}]))
+    table.update_item(
+        Key={"user_id": "a"},
+        UpdateExpression="SET #c = :c",
+        ExpressionAttributeNames={"#c": "connections"},
+        ExpressionAttributeValues={":c": ["b"]},
+    )
+
+    report = load_items(table, build_items([{"user_id": "a", "top_artists": ["New"]}, {"user_id": "c"}]))
+    assert report["failed_items"] == 0
+    a = table.get_item(Key={"user_id": "a"})["Item"]
+    assert a["connections"] == ["b"] and a["profile"]["sample"]["top_artists"] == ["New"]
+    assert table.get_item(Key={"user_id": "c"})["Item"]["connections"] == []
+
+
+def main():
+    test_saved_file_becomes_profile_item()
+    test_load_retries_unprocessed_items()
+    test_imported_items_show_up_in_changed_since()
+    test_reimport_keeps_connections()
+
+    table = LocalTable()
+    records = [{"user_id": f"u{i}", "top_artists": ["NCT 127"], "top_genres": ["k-pop"]} for i in range(5000)]
+    print("=== Bulk import (local table, 5000 users) ===")
+    print(json.dumps(load_items(table, build_items(records), workers=8), indent=2))
+    print("\n✅ Bulk import tests passed.")
+
+
+if __name__ == "__main__":
+    main()
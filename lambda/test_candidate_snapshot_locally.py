@@ -0,0 +1,116 @@
+"""
+Local tests for candidate_snapshot.py: single-flight loads and
+stale-while-revalidate refreshes (fake clock, no AWS).
+
+Run this from inside the 'lambda' folder with:
+    python test_candidate_snapshot_locally.py
+"""
+
+import threading
+import time
+
+from candidate_snapshot import CandidateSnapshot
+from synthetic_profiles import generate_items
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _SlowLoader:
+    def __init__(self, items, delay=0.05):
+        self.items = items
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait()
+        time.sleep(self.delay)
+        return list(self.items)
+
+
+def test_concurrent_cold_gets_share_one_load():
+    loader = _SlowLoader(list(generate_items(20, seed=1)))
+    snapshot = CandidateSnapshot(loader, ttl_seconds=5, max_stale_seconds=30, clock=_Clock())
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(snapshot.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.calls == 1
+    assert len({id(r) for r in results}) == 1
+    assert len(results[0].items) == len(results[0].features) == 20
+    stats = snapshot.stats()
+    assert stats["refreshes"] == 1 and stats["blocking_waits"] == 8 and stats["coalesced_waits"] == 7
+
+
+def test_stale_snapshot_is_served_while_refreshing():
+    clock = _Clock()
+    loader = _SlowLoader(list(generate_items(10, seed=2)), delay=0)
+    snapshot = CandidateSnapshot(loader, ttl_seconds=5, max_stale_seconds=30, clock=clock)
+    first = snapshot.get()
+
+    clock.now += 3
+    assert snapshot.get() is first and loader.calls == 1
+
+    # Past the TTL: old data comes back immediately, one refresh starts
+    loader.items = list(generate_items(12, seed=2))
+    loader.release.clear()
+    clock.now += 5
+    assert snapshot.get() is first
+    assert snapshot.get() is first
+    assert snapshot.stats()["refreshing"]
+    loader.release.set()
+    snapshot._inflight.result()
+    assert loader.calls == 2
+    assert len(snapshot.get().items) == 12
+
+    # Past max staleness: the request waits for new data
+    clock.now += 60
+    loader.items = list(generate_items(15, seed=2))
+    assert len(snapshot.get().items) == 15
+    stats = snapshot.stats()
+    assert stats["stale_hits"] == 2 and stats["refreshes"] == 3
+
+
+def test_failed_refresh_keeps_old_snapshot():
+    clock = _Clock()
+    items = list(generate_items(5, seed=3))
+    fail = {"on": False}
+
+    def loader():
+        if fail["on"]:
+            raise RuntimeError("scan failed")
+        return items
+
+    snapshot = CandidateSnapshot(loader, ttl_seconds=5, max_stale_seconds=30, clock=clock)
+    first = snapshot.get()
+    fail["on"] = True
+    clock.now += 10
+    assert snapshot.get() is first
+    deadline = time.monotonic() + 5
+    while snapshot.stats()["refresh_errors"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert snapshot.stats()["refresh_errors"] >= 1
+    assert snapshot.get() is first
+
+
+def main():
+    test_concurrent_cold_gets_share_one_load()
+    test_stale_snapshot_is_served_while_refreshing()
+    test_failed_refresh_keeps_old_snapshot()
+    print("✅ Candidate snapshot tests passed.")
+
+
+if __name__ == "__main__":
+    main()
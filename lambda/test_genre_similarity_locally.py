@@ -0,0 +1,73 @@
+"""
+Local test for genre_similarity.py + soft genre credit in matching.py.
+
+Run this from inside the 'lambda' folder with:
+    python test_genre_similarity_locally.py
+"""
+
+import os
+import tempfile
+
+import matching
+from genre_similarity import GenreSimilarity, build_genre_similarity
+from matching import compute_match_score
+
+
+def _profiles():
+    # "bedroom pop" and "pop" co-occur a lot; "metal" never appears with them
+    out = []
+    for _ in range(8):
+        out.append({"top_genres": ["pop", "bedroom pop"]})
+    for _ in range(4):
+        out.append({"top_genres": ["k-pop", "k-rap"]})
+    for _ in range(3):
+        out.append({"top_genres": ["metal"]})
+    out.append({"top_genres": ["pop"]})
+    return out
+
+
+def test_build_and_roundtrip():
+    table, stats = build_genre_similarity(_profiles(), min_cooccurrence=2)
+    assert stats["profiles"] == 16
+    pop, bedroom, metal = table.ids["pop"], table.ids["bedroom pop"], table.ids["metal"]
+    assert table.similarity(pop, bedroom) > 0.9
+    assert table.similarity(pop, metal) == 0.0
+
+    path = os.path.join(tempfile.mkdtemp(), "gs.json")
+    table.save(path)
+    loaded = GenreSimilarity.load(path)
+    assert loaded.genres == table.genres
+    assert loaded.neighbors == table.neighbors
+
+
+def test_soft_credit_is_opt_in():
+    a = {"sample": {"top_artists": ["A"]}, "top_genres": ["bedroom pop"]}
+    b = {"sample": {"top_artists": ["B"]}, "top_genres": ["pop"]}
+
+    matching.set_genre_similarity(None)
+    exact = compute_match_score(a, b)
+    assert exact["match_percent"] == 0
+    assert "soft_genre_points" not in exact["explain"]
+
+    table, _ = build_genre_similarity(_profiles(), min_cooccurrence=2)
+    matching.set_genre_similarity(table)
+    try:
+        soft = compute_match_score(a, b)
+        assert soft["match_percent"] > 0
+        assert soft["explain"]["related_genres_sample"][0][:2] == ["bedroom pop", "pop"]
+        # Identical genres still get full (not extra) credit
+        same = compute_match_score(b, b)
+        assert same["match_percent"] == 100
+        assert same["explain"]["soft_genre_points"] == 0
+    finally:
+        matching.set_genre_similarity(None)
+
+
+def main():
+    test_build_and_roundtrip()
+    test_soft_credit_is_opt_in()
+    print("✅ Genre similarity tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,462 @@
+"""
+End-to-end test for handler.lambda_handler on a local storage engine
+(PROFILE_STORE=memory - no AWS needed).
+
+Run this from inside the 'lambda' folder with:
+    python test_handler_locally.py
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+os.environ.setdefault("PROFILE_STORE", "memory")
+
+import handler  # noqa: E402
+import taste_clusters  # noqa: E402
+from candidate_snapshot import CandidateSnapshot  # noqa: E402
+
+
+def _call(method: str, path: str, body=None, qs=None, path_params=None, headers=None, raw=False):
+    event = {
+        "requestContext": {"http": {"method": method, "path": path}},
+        "pathParameters": path_params,
+        "queryStringParameters": qs,
+        "headers": headers or {},
+        "body": json.dumps(body) if body is not None else None,
+    }
+    resp = handler.lambda_handler(event, None)
+    if raw:
+        return resp
+    return resp["statusCode"], json.loads(resp["body"]) if resp.get("body") else None
+
+
+def _seed():
+    users = {
+        "briana_test_001": (["NCT 127", "Taeyeon", "Red Velvet"], ["k-pop", "r&b"]),
+        "briana_test_002": (["NCT 127", "Red Velvet", "SZA"], ["k-pop", "pop"]),
+        "briana_test_003": (["Taylor Swift"], ["pop"]),
+        "briana_test_004": (["Metallica"], ["metal"]),
+    }
+    for user_id, (artists, genres) in users.items():
+        status, _ = _call(
+            "POST",
+            "/taste-profile",
+            body={
+                "user_id": user_id,
+                "top_artists": artists,
+                "top_genres": genres,
+                "top_tracks": [f"Hit – {artists[0]}"],
+            },
+        )
+        assert status == 200
+
+
+def test_routes_end_to_end():
+    _seed()
+
+    status, body = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+    assert status == 200
+    assert [m["user_id"] for m in body["matches"]] == ["briana_test_002", "briana_test_003", "briana_test_004"]
+    top = body["matches"][0]
+    assert top["shared_artists"] == ["nct 127", "red velvet"]
+    assert top["raw_score"] == 3 * 2 + 2 * 1 + 1
+
+    status, body = _call("GET", "/profiles/briana_test_002")
+    assert status == 200 and body["user_id"] == "briana_test_002"
+
+    status, body = _call("POST", "/connect", body={"from_user_id": "briana_test_001", "to_user_id": "briana_test_002"})
+    assert status == 200 and body["connections"] == ["briana_test_002"]
+
+    # Re-posting a profile keeps connections
+    _call("POST", "/taste-profile", body={"user_id": "briana_test_001", "top_artists": ["NCT 127"]})
+    assert handler.store.get("briana_test_001")["connections"] == ["briana_test_002"]
+
+    status, _ = _call("GET", "/matches/nobody")
+    assert status == 404
+
+
+def test_pair_cache_reuses_unchanged_pairs():
+    _seed()
+    handler.pair_cache.clear()
+
+    _, first = _call("GET", "/matches/briana_test_002", qs={"debug": "metrics"})
+    _, second = _call("GET", "/matches/briana_test_002", qs={"debug": "metrics"})
+    assert first["debug"]["metrics"]["counters"]["pair_cache_misses"] == 3
+    assert second["debug"]["metrics"]["counters"]["pair_cache_hits"] == 3
+    assert second["matches"] == first["matches"]
+
+    # A changed profile gets a new fingerprint: only that pair is rescored
+    _call("POST", "/taste-profile", body={"user_id": "briana_test_004", "top_artists": ["SZA"]})
+    _, third = _call("GET", "/matches/briana_test_002", qs={"debug": "metrics"})
+    assert third["debug"]["metrics"]["counters"]["pair_cache_misses"] == 1
+    assert third["debug"]["metrics"]["counters"]["pair_cache_hits"] == 2
+    assert "sza" in third["matches"][0]["shared_artists"]
+
+
+def test_unchanged_profile_is_not_rewritten():
+    body = {"user_id": "briana_test_005", "top_artists": ["IU"], "top_genres": ["k-pop"], "bio": "hi"}
+    status, first = _call("POST", "/taste-profile", body=body)
+    assert status == 200 and first["unchanged"] is False
+    saved = handler.store.get("briana_test_005")
+
+    status, again = _call("POST", "/taste-profile", body=body)
+    assert status == 200 and again["unchanged"] is True
+    assert handler.store.get("briana_test_005")["updated_at"] == saved["updated_at"]
+
+    status, changed = _call("POST", "/taste-profile", body=dict(body, bio="hello"))
+    assert changed["unchanged"] is False
+    assert handler.store.get("briana_test_005")["bio"] == "hello"
+
+    # Items stored before content hashes get one backfilled, updated_at untouched
+    legacy = {k: v for k, v in handler.store.get("briana_test_005").items() if k != "content_hash"}
+    handler.store.put(legacy)
+    _, legacy_again = _call("POST", "/taste-profile", body=dict(body, bio="hello"))
+    assert legacy_again["unchanged"] is True
+    stored = handler.store.get("briana_test_005")
+    assert stored["content_hash"] and stored["updated_at"] == legacy["updated_at"]
+
+    # Hashed but from before public_profile: the projection is backfilled too
+    no_public = {k: v for k, v in stored.items() if k != "public_profile"}
+    handler.store.put(no_public)
+    _, once_more = _call("POST", "/taste-profile", body=dict(body, bio="hello"))
+    assert once_more["unchanged"] is True
+    stored = handler.store.get("briana_test_005")
+    assert stored["public_profile"]["bio"] == "hello" and stored["updated_at"] == legacy["updated_at"]
+
+
+def test_profile_etag_and_projection():
+    _seed()
+    resp = _call("GET", "/profiles/briana_test_003", path_params={"user_id": "briana_test_003"}, raw=True)
+    assert resp["statusCode"] == 200
+    etag = resp["headers"]["ETag"]
+    assert json.loads(resp["body"])["user_id"] == "briana_test_003"
+
+    # Stored projection is what's served; the nested profile isn't read
+    stored = handler.store.get("briana_test_003", ["public_profile"])
+    assert set(stored) == {"public_profile"}
+
+    resp = _call("GET", "/profiles/briana_test_003", headers={"If-None-Match": etag}, raw=True)
+    assert resp["statusCode"] == 304 and resp["body"] == ""
+
+    # /connect changes the public view (connections) -> new ETag
+    _call("POST", "/connect", body={"from_user_id": "briana_test_003", "to_user_id": "briana_test_001"})
+    resp = _call("GET", "/profiles/briana_test_003", headers={"If-None-Match": etag}, raw=True)
+    assert resp["statusCode"] == 200 and resp["headers"]["ETag"] != etag
+    assert json.loads(resp["body"])["connections"] == ["briana_test_001"]
+
+    # Items from before the projection existed still work
+    legacy = {k: v for k, v in handler.store.get("briana_test_004").items() if k != "public_profile"}
+    handler.store.put(legacy)
+    status, body = _call("GET", "/profiles/briana_test_004")
+    assert status == 200 and body["user_id"] == "briana_test_004" and body["updated_at"] == legacy["updated_at"]
+    # ...and the fallback stores the projection for next time
+    stored = handler.store.get("briana_test_004")
+    assert stored["public_profile"] == body and stored["updated_at"] == legacy["updated_at"]
+
+
+def test_matches_from_candidate_snapshot():
+    _seed()
+    _, scanned = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+
+    saved = handler.candidate_snapshot
+    handler.candidate_snapshot = CandidateSnapshot(lambda: handler.store.scan_all(), ttl_seconds=60)
+    try:
+        status, body = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+        assert status == 200
+        assert [(m["user_id"], m["score"]) for m in body["matches"]] == [
+            (m["user_id"], m["score"]) for m in scanned["matches"]
+        ]
+        _call("GET", "/matches/briana_test_002")
+        stats = body["debug"]["candidate_snapshot"]
+        assert stats["refreshes"] == 1 and handler.candidate_snapshot.stats()["fresh_hits"] == 1
+
+        handler.candidate_snapshot = CandidateSnapshot(
+            lambda: handler.store.scan_all(), ttl_seconds=60, build_index=True
+        )
+        _, indexed = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+        assert indexed["debug"]["match_index"] is True
+        assert [(m["user_id"], m["score"]) for m in indexed["matches"]] == [
+            (m["user_id"], m["score"]) for m in scanned["matches"]
+        ]
+    finally:
+        handler.candidate_snapshot = saved
+
+
+def test_batch_taste_profiles():
+    _seed()
+    _call("POST", "/connect", body={"from_user_id": "briana_test_002", "to_user_id": "briana_test_001"})
+    before = handler.store.get("briana_test_003")
+
+    users = [
+        {"user_id": "briana_test_002", "top_artists": ["SZA"], "top_genres": ["r&b"]},
+        {"user_id": "briana_test_003", "top_artists": ["Taylor Swift"], "top_genres": ["pop"],
+         "top_tracks": ["Hit – Taylor Swift"]},
+        {"top_artists": ["nobody"]},
+        {"user_id": "batch_new_001", "top_artists": ["Metallica"]},
+        {"user_id": "batch_new_001", "top_artists": ["Slayer"]},
+    ]
+    status, body = _call("POST", "/taste-profiles/batch", body={"users": users})
+    assert status == 200
+    assert [(r["user_id"], r["status"]) for r in body["results"]] == [
+        ("briana_test_002", "saved"),
+        ("briana_test_003", "unchanged"),
+        (None, "error"),
+        ("batch_new_001", "saved"),
+        ("batch_new_001", "error"),
+    ]
+    assert (body["saved"], body["unchanged"], body["error"]) == (2, 1, 2)
+
+    # Same item the single route would have written; connections preserved
+    saved = handler.store.get("briana_test_002")
+    assert saved["connections"] == ["briana_test_001"]
+    assert saved["profile"]["sample"]["top_artists"] == ["SZA"]
+    assert handler.store.get("briana_test_003")["updated_at"] == before["updated_at"]
+    assert handler.store.get("batch_new_001")["profile"]["sample"]["top_artists"] == ["Metallica"]
+
+    status, body = _call("POST", "/taste-profiles/batch", body={"users": [{}] * (handler.TASTE_PROFILE_BATCH_MAX + 1)})
+    assert status == 400
+    status, _ = _call("POST", "/taste-profiles/batch", body={"users": []})
+    assert status == 400
+
+
+def test_recommendations_friends_of_friends():
+    _seed()
+    handler._social_graph = None
+    _call("POST", "/connect", body={"from_user_id": "briana_test_001", "to_user_id": "briana_test_002"})
+    _call("POST", "/connect", body={"from_user_id": "briana_test_002", "to_user_id": "briana_test_003"})
+
+    status, body = _call("GET", "/recommendations/briana_test_001")
+    assert status == 200
+    assert [(r["user_id"], r["mutual_connections"]) for r in body["recommendations"]] == [("briana_test_003", 1)]
+
+    # Graph is built now: new connects are applied in place, no rescan
+    _call("POST", "/connect", body={"from_user_id": "briana_test_001", "to_user_id": "briana_test_004"})
+    _call("POST", "/connect", body={"from_user_id": "briana_test_004", "to_user_id": "briana_test_003"})
+    status, body = _call("GET", "/recommendations/briana_test_001")
+    top = body["recommendations"][0]
+    assert top["user_id"] == "briana_test_003" and top["mutual_connections"] == 2
+    assert top["via"] == ["briana_test_002", "briana_test_004"]
+    assert top["graph_proximity"] == 1.0 and 0 <= top["recommendation_score"] <= 100
+    # Direct connections are never recommended
+    assert "briana_test_004" not in [r["user_id"] for r in body["recommendations"]]
+
+    status, _ = _call("GET", "/recommendations/nobody")
+    assert status == 404
+
+
+class _FakeContext:
+    aws_request_id = "local-test"
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def test_matches_deadline_returns_partial():
+    _seed()
+    status, body = _call("GET", "/matches/briana_test_001", qs={"budget_ms": "0"})
+    assert status == 200 and body["partial"] is True
+    assert body["candidates_covered"] == 0 and body["matches"] == []
+
+    status, body = _call("GET", "/matches/briana_test_001", qs={"budget_ms": "60000"})
+    assert body["partial"] is False and body["budget_ms"] == 60000
+    assert body["candidates_covered"] >= 3 and len(body["matches"]) >= 3
+
+    # Lambda context: remaining time minus the safety margin
+    event = {
+        "requestContext": {"http": {"method": "GET", "path": "/matches/briana_test_001"}},
+        "pathParameters": {"user_id": "briana_test_001"},
+    }
+    body = json.loads(handler.lambda_handler(event, _FakeContext(handler.MATCH_DEADLINE_MARGIN_MS + 5000))["body"])
+    assert body["budget_ms"] == 5000 and body["partial"] is False
+    body = json.loads(handler.lambda_handler(event, _FakeContext(10))["body"])
+    assert body["budget_ms"] == 0 and body["partial"] is True
+
+    saved = handler.candidate_snapshot
+    handler.candidate_snapshot = CandidateSnapshot(lambda: handler.store.scan_all(), ttl_seconds=60)
+    try:
+        _, body = _call("GET", "/matches/briana_test_001", qs={"budget_ms": "0"})
+        assert body["partial"] is True and body["candidates_covered"] == 0
+    finally:
+        handler.candidate_snapshot = saved
+
+
+def test_loose_context_budget_keeps_full_pages():
+    _seed()
+    page_sizes = []
+    scan_page = handler.store.scan_page
+
+    def recording_scan_page(cursor, page_size=None):
+        page_sizes.append(page_size)
+        return scan_page(cursor, page_size)
+
+    event = {
+        "requestContext": {"http": {"method": "GET", "path": "/matches/briana_test_001"}},
+        "pathParameters": {"user_id": "briana_test_001"},
+    }
+    handler.store.scan_page = recording_scan_page
+    try:
+        # A normal invocation's remaining time: a guard only, full pages
+        body = json.loads(handler.lambda_handler(event, _FakeContext(29000))["body"])
+        assert body["budget_ms"] == 29000 - handler.MATCH_DEADLINE_MARGIN_MS and body["partial"] is False
+        assert page_sizes == [None]
+
+        # Nearly out of time, or an explicit ?budget_ms: small pages
+        page_sizes.clear()
+        handler.lambda_handler(event, _FakeContext(handler.MATCH_DEADLINE_MARGIN_MS + 1000))
+        assert page_sizes and set(page_sizes) == {handler.MATCH_BUDGET_PAGE_SIZE}
+        page_sizes.clear()
+        _call("GET", "/matches/briana_test_001", qs={"budget_ms": "60000"})
+        assert page_sizes and set(page_sizes) == {handler.MATCH_BUDGET_PAGE_SIZE}
+    finally:
+        del handler.store.scan_page
+
+
+def test_matches_probe_nearest_taste_clusters():
+    _seed()
+    # k-pop fans in cluster 0, the others in 1; users not in the file are always scored
+    clusters = taste_clusters.TasteClusters(
+        [{"a:nct 127": 1.0}, {"g:pop": 0.6, "g:metal": 0.8}],
+        {
+            "briana_test_001": [(0, 0.2), (1, 0.9)],
+            "briana_test_002": [(0, 0.3), (1, 0.8)],
+            "briana_test_003": [(1, 0.4), (0, 1.0)],
+            "briana_test_004": [(1, 0.2), (0, 1.0)],
+        },
+    )
+    saved_probes = handler.TASTE_CLUSTER_PROBES
+    taste_clusters.set_taste_clusters(clusters)
+    handler.TASTE_CLUSTER_PROBES = 1
+    try:
+        _, exact = _call("GET", "/matches/briana_test_001", qs={"limit": "1", "exact": "1"})
+        assert exact["debug"]["taste_clusters_probed"] is None
+
+        _, body = _call("GET", "/matches/briana_test_001", qs={"limit": "1"})
+        assert body["debug"]["taste_clusters_probed"] == [0]
+        assert [m["user_id"] for m in body["matches"]] == ["briana_test_002"]
+        assert exact["candidates_covered"] - body["candidates_covered"] == 2
+
+        # Cluster 0 can't fill 3 matches on its own: exact path
+        _, body = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+        assert body["debug"]["taste_clusters_probed"] is None
+        assert body["candidates_covered"] == exact["candidates_covered"]
+
+        saved = handler.candidate_snapshot
+        handler.candidate_snapshot = CandidateSnapshot(lambda: handler.store.scan_all(), ttl_seconds=60)
+        try:
+            _, body = _call("GET", "/matches/briana_test_001", qs={"limit": "1"})
+            assert body["debug"]["taste_clusters_probed"] == [0]
+            assert [m["user_id"] for m in body["matches"]] == ["briana_test_002"]
+        finally:
+            handler.candidate_snapshot = saved
+    finally:
+        taste_clusters.set_taste_clusters(None)
+        handler.TASTE_CLUSTER_PROBES = saved_probes
+
+
+def test_matches_since_watermark():
+    _seed()
+    saved_skew = handler.MATCHES_SINCE_SKEW_SECONDS
+    handler.MATCHES_SINCE_SKEW_SECONDS = 0.0
+    path, params = "/matches/briana_test_001", {"user_id": "briana_test_001"}
+    try:
+        _, full = _call("GET", path, qs={"limit": "2"}, path_params=params)
+        assert full["watermark"] and "incremental" not in full
+        top = [m["user_id"] for m in full["matches"]]
+        assert "briana_test_004" not in top
+
+        _, body = _call("GET", path, qs={"limit": "2", "since": full["watermark"]}, path_params=params)
+        assert body["incremental"] is True and body["merged"] is True
+        assert body["candidates_scored"] == 0 and body["matches"] == [] and body["dropped"] == []
+        assert [r["user_id"] for r in body["ranking"]] == top
+
+        # briana_test_004 turns into a k-pop fan: the only candidate scored
+        _call("POST", "/taste-profile", body={
+            "user_id": "briana_test_004",
+            "top_artists": ["NCT 127", "Taeyeon", "Red Velvet"],
+            "top_genres": ["k-pop", "r&b"],
+        })
+        _, body = _call("GET", path, qs={"limit": "2", "since": body["watermark"]}, path_params=params)
+        assert body["candidates_scored"] == 1
+        assert [m["user_id"] for m in body["matches"]] == ["briana_test_004"]
+        assert body["dropped"] == [top[1]]
+        _, again = _call("GET", path, qs={"limit": "2"}, path_params=params)
+        assert [r["user_id"] for r in body["ranking"]] == [m["user_id"] for m in again["matches"]]
+
+        # Plain timestamp newer than the last top-k: changed candidates only
+        since = datetime.now(timezone.utc).isoformat()
+        _call("POST", "/taste-profile", body={"user_id": "briana_test_003", "top_artists": ["Taeyeon"]})
+        _, body = _call("GET", path, qs={"since": since}, path_params=params)
+        assert body["merged"] is False and [r["user_id"] for r in body["ranking"]] == ["briana_test_003"]
+        assert body["watermark"] >= since
+
+        # The requester changed: every score may have moved, full /matches
+        _call("POST", "/taste-profile", body={"user_id": "briana_test_001", "top_artists": ["SZA"]})
+        _, body = _call("GET", path, qs={"limit": "2", "since": again["watermark"], "debug": "metrics"}, path_params=params)
+        assert "incremental" not in body and body["watermark"]
+        assert body["debug"]["metrics"]["counters"]["matches_since_fallback"] == 1
+
+        status, _ = _call("GET", path, qs={"since": "yesterday"}, path_params=params)
+        assert status == 400
+    finally:
+        handler.MATCHES_SINCE_SKEW_SECONDS = saved_skew
+
+
+def test_sharded_matches_flag_unsupported_since():
+    _seed()
+    _, full = _call("GET", "/matches/briana_test_001", qs={"limit": "3"})
+    saved = handler.MATCH_SHARDS, handler._shard_pool
+    handler.MATCH_SHARDS, handler._shard_pool = 2, None
+    try:
+        params = {"user_id": "briana_test_001"}
+        qs = {"limit": "3", "since": full["watermark"], "debug": "metrics"}
+        status, body = _call("GET", "/matches/briana_test_001", qs=qs, path_params=params)
+        assert status == 200 and body["incremental"] is False
+        assert body["incremental_fallback_reason"] == "sharded"
+        # Shards break ties by user_id, so compare scores
+        assert [m["score"] for m in body["matches"]] == [m["score"] for m in full["matches"]]
+        status, _ = _call("GET", "/matches/briana_test_001", qs={"since": "nope"}, path_params=params)
+        assert status == 400
+    finally:
+        if handler._shard_pool is not None:
+            handler._shard_pool.close()
+        handler.MATCH_SHARDS, handler._shard_pool = saved
+
+
+def test_io_pool_records_into_request_metrics():
+    m = handler.metrics.begin("test")
+
+    def work():
+        with handler.metrics.current().stage("pool_stage"):
+            handler.metrics.current().incr("pool_calls")
+        return threading.get_ident()
+
+    thread_ids = [handler._submit_io(work).result() for _ in range(4)]
+    if handler.OVERLAP_IO:
+        assert threading.get_ident() not in thread_ids
+    assert m.counters["pool_calls"] == 4 and "pool_stage" in m.timings_ms
+
+
+def main():
+    test_routes_end_to_end()
+    test_pair_cache_reuses_unchanged_pairs()
+    test_unchanged_profile_is_not_rewritten()
+    test_profile_etag_and_projection()
+    test_matches_from_candidate_snapshot()
+    test_batch_taste_profiles()
+    test_recommendations_friends_of_friends()
+    test_matches_deadline_returns_partial()
+    test_loose_context_budget_keeps_full_pages()
+    test_matches_probe_nearest_taste_clusters()
+    test_matches_since_watermark()
+    test_sharded_matches_flag_unsupported_since()
+    test_io_pool_records_into_request_metrics()
+    print("\n✅ Handler end-to-end tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Local tests for match_index.MatchIndex: with singleton pruning and hot
+tokens its top-k must be exactly ranking.top_k_pruned's.
+
+Run this from inside the 'lambda' folder with:
+    python test_match_index_locally.py
+"""
+
+from match_index import MatchIndex
+from matching import MatchFeatures, extract_features, score_features
+from profile_items import profile_for_scoring
+from ranking import top_k_pruned
+from synthetic_profiles import generate_items
+
+
+def _ranked(got, field):
+    return [(i, s[field]) for i, s in got]
+
+
+def test_index_top_k_matches_pruned_scan():
+    features = [extract_features(profile_for_scoring(it)) for it in generate_items(1500, seed=23)]
+    indexes = [
+        MatchIndex(features),
+        MatchIndex(features, hot_fraction=0.01),
+        MatchIndex(features, hot_fraction=None, prune_singletons=False),
+    ]
+    stats = indexes[0].stats()
+    assert stats["genres"]["hot"] and stats["tracks"]["singletons"] > stats["tracks"]["posted"]
+
+    for q in (0, 17, 404, 999):
+        def score(i, q=q):
+            return score_features(features[q], features[i])
+
+        for rank_by, field in (("match_percent", "match_score"), ("raw_score", "raw_score")):
+            for k in (1, 10, 25):
+                expected, _ = top_k_pruned(features[q], features, k, rank_by=rank_by, exclude=lambda i: i == q)
+                for index in indexes:
+                    got, _ = index.top_k(features[q], k, score, rank_by=rank_by, exclude=lambda i: i == q)
+                    assert _ranked(got, field) == _ranked(expected, field), (q, rank_by, k)
+
+
+def test_requester_outside_the_index():
+    shared = MatchFeatures(frozenset({"a", "b"}), frozenset({"pop"}), frozenset())
+    features = [
+        MatchFeatures(frozenset({"a", "only-0"}), frozenset({"pop"}), frozenset({"t0"})),
+        MatchFeatures(frozenset({"b"}), frozenset({"pop", "jazz"}), frozenset()),
+        MatchFeatures(frozenset(), frozenset(), frozenset()),
+    ] + [shared] * 40
+    index = MatchIndex(features, hot_fraction=0.5)
+    assert index.hot["genres"] == {"pop": 1} and index.singletons["artists"] == {"only-0": 0}
+
+    # "only-0" is a singleton: found through the dict, not a posting list
+    me = MatchFeatures(frozenset({"only-0"}), frozenset({"jazz"}), frozenset({"t0"}))
+    got, _ = index.top_k(me, 3, lambda i: score_features(me, features[i]), rank_by="raw_score")
+    expected, _ = top_k_pruned(me, features, 3, rank_by="raw_score")
+    assert [i for i, _s in got] == [i for i, _s in expected] == [0, 1, 2]
+    assert index.top_k(me, 0, lambda i: {})[0] == []
+
+
+def main():
+    test_index_top_k_matches_pruned_scan()
+    test_requester_outside_the_index()
+    print("✅ Match index tests passed.")
+
+
+if __name__ == "__main__":
+    main()
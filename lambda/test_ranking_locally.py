@@ -0,0 +1,71 @@
+"""
+Local tests for ranking.top_k_pruned: bound-pruned top-k must be exactly the
+unpruned "score everyone, stable sort, slice" result.
+
+Run this from inside the 'lambda' folder with:
+    python test_ranking_locally.py
+"""
+
+import time
+
+from matching import MatchFeatures, extract_features, score_features
+from profile_items import profile_for_scoring
+from ranking import max_raw_score, top_k_pruned
+from synthetic_profiles import generate_items
+
+
+def _expected(me, features, k, field, exclude):
+    scored = [(i, score_features(me, f)) for i, f in enumerate(features) if i != exclude]
+    scored.sort(key=lambda t: t[1][field], reverse=True)  # stable: ties keep index order
+    return [(i, s[field]) for i, s in scored[:k]]
+
+
+def test_pruned_top_k_matches_full_sort():
+    items = list(generate_items(1500, seed=21))
+    features = [extract_features(profile_for_scoring(it)) for it in items]
+
+    pruned_total = 0
+    for q in (0, 17, 404, 999):
+        for rank_by, field in (("match_percent", "match_score"), ("raw_score", "raw_score")):
+            for k in (1, 10, 25):
+                got, stats = top_k_pruned(features[q], features, k, rank_by=rank_by, exclude=lambda i: i == q)
+                assert [(i, s[field]) for i, s in got] == _expected(features[q], features, k, field, q)
+                assert stats["candidates"] == len(items) - 1
+                assert stats["scored"] + stats["pruned"] == stats["candidates"]
+                pruned_total += stats["pruned"]
+    assert pruned_total > 0
+
+
+def test_ties_and_empty_profiles():
+    empty = MatchFeatures(frozenset(), frozenset(), frozenset())
+    same = MatchFeatures(frozenset({"a"}), frozenset({"pop"}), frozenset())
+    features = [empty, same, same, empty, same]
+    assert max_raw_score(same, empty) == 0
+
+    got, _ = top_k_pruned(same, features, 2, rank_by="raw_score")
+    assert [i for i, _s in got] == [1, 2]
+    got, _ = top_k_pruned(same, features, 5)
+    assert [i for i, _s in got] == [1, 2, 4, 0, 3]
+    assert top_k_pruned(same, features, 0)[0] == []
+
+
+def test_deadline_returns_partial_best_so_far():
+    items = list(generate_items(500, seed=22))
+    features = [extract_features(profile_for_scoring(it)) for it in items]
+
+    got, stats = top_k_pruned(features[0], features, 10, deadline=time.monotonic() - 1)
+    assert got == [] and stats["partial"] == 1 and stats["covered"] == 0
+
+    got, stats = top_k_pruned(features[0], features, 10, deadline=time.monotonic() + 60)
+    assert len(got) == 10 and stats["partial"] == 0 and stats["covered"] == stats["candidates"]
+
+
+def main():
+    test_pruned_top_k_matches_full_sort()
+    test_ties_and_empty_profiles()
+    test_deadline_returns_partial_best_so_far()
+    print("✅ Ranking tests passed.")
+
+
+if __name__ == "__main__":
+    main()
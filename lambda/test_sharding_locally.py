@@ -0,0 +1,103 @@
+"""
+Local multi-process test for sharding.py: sharded /matches must return the
+same top-k as scoring every candidate in one process.
+
+Run this from inside the 'lambda' folder with:
+    python test_sharding_locally.py
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from matching import extract_features, score_features
+from profile_items import profile_for_scoring
+from ranking import match_entry, merge_top_k
+from sharding import ShardIndex, ShardPool, shard_of
+from storage import SQLiteProfileStorage
+from synthetic_profiles import generate_items
+
+
+def test_sharded_top_k_matches_single_process():
+    items = list(generate_items(300, seed=5))
+    path = os.path.join(tempfile.mkdtemp(), "shards.sqlite3")
+    store = SQLiteProfileStorage(path)
+    store.put_many(items)
+
+    me = items[0]
+    me_features = extract_features(profile_for_scoring(me))
+    expected = merge_top_k(
+        [[match_entry(it, score_features(me_features, extract_features(profile_for_scoring(it)))) for it in items[1:]]],
+        10,
+    )
+
+    with ShardPool(3, ("sqlite", path)) as pool:
+        stats = pool.wait_ready()
+        assert sum(s["candidates"] for s in stats) == len(items)
+        assert all(s["candidates"] == sum(1 for it in items if shard_of(it["user_id"], 3) == s["shard"]) for s in stats)
+
+        got, coverage = pool.top_k(me_features, me["user_id"], 10)
+        assert [(m["user_id"], m["score"]) for m in got] == [(m["user_id"], m["score"]) for m in expected]
+        assert len(coverage.pop("shard_ms")) == 3
+        assert coverage == {"covered": len(items) - 1, "candidates": len(items) - 1,
+                            "missing_shards": 0, "partial": False}
+
+        # Deadline already gone: whatever comes back is flagged partial
+        _, coverage = pool.top_k(me_features, me["user_id"], 10, deadline=time.monotonic() - 1)
+        assert coverage["partial"]
+
+        # A shard stuck past a deadline is skipped, not queued behind
+        pool.wait_ready()
+        pool._executors[0].submit(time.sleep, 1.5)
+        _, coverage = pool.top_k(me_features, me["user_id"], 10, deadline=time.monotonic() + 0.2)
+        assert coverage["missing_shards"] == 1
+        t0 = time.monotonic()
+        _, coverage = pool.top_k(me_features, me["user_id"], 10)
+        assert coverage["missing_shards"] == 1 and time.monotonic() - t0 < 1.0
+        time.sleep(1.5)
+        got, coverage = pool.top_k(me_features, me["user_id"], 10)
+        assert coverage["missing_shards"] == 0 and [m["user_id"] for m in got] == [m["user_id"] for m in expected]
+
+
+def test_refresh_window_and_dynamodb_guard():
+    items = list(generate_items(20, seed=6))  # updated_at in the past
+    path = os.path.join(tempfile.mkdtemp(), "refresh.sqlite3")
+    SQLiteProfileStorage(path).put_many(items)
+
+    shard = ShardIndex(0, 1)
+    shard.load(("sqlite", path))
+    asked = []
+    changed_since = shard.store.changed_since
+    shard.store.changed_since = lambda since: asked.append(since) or changed_since(since)
+
+    # Nothing new: the window starts at load time, not at the newest item
+    assert shard.refresh(max_age=0) == 0
+    new = dict(items[0], user_id="fresh_user", updated_at=datetime.now(timezone.utc).isoformat())
+    shard.store.put(new)
+    assert shard.refresh(max_age=0) == 1 and "fresh_user" in shard.items
+    # Committed later but stamped before fresh_user: still picked up
+    late = dict(items[1], user_id="late_user", updated_at=(datetime.now(timezone.utc) - timedelta(seconds=2)).isoformat())
+    shard.store.put(late)
+    assert shard.refresh(max_age=0) >= 1 and "late_user" in shard.items
+    assert all(since > items[-1]["updated_at"] for since in asked)
+
+    saved = os.environ.pop("DDB_UPDATED_INDEX", None)
+    try:
+        ShardPool(2, ("dynamodb", "profiles"))
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    finally:
+        if saved is not None:
+            os.environ["DDB_UPDATED_INDEX"] = saved
+
+
+def main():
+    test_sharded_top_k_matches_single_process()
+    test_refresh_window_and_dynamodb_guard()
+    print("✅ Sharding tests passed.")
+
+
+if __name__ == "__main__":
+    main()
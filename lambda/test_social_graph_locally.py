@@ -0,0 +1,105 @@
+"""
+Local tests for social_graph.py (in-memory store, no AWS).
+
+Run this from inside the 'lambda' folder with:
+    python test_social_graph_locally.py
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+from social_graph import SocialGraph
+from storage import create_profile_storage
+
+
+def _item(user_id, connections, updated_at="2026-01-01T00:00:00+00:00"):
+    return {"user_id": user_id, "connections": connections, "updated_at": updated_at}
+
+
+def test_friends_of_friends_counts_paths():
+    graph = SocialGraph()
+    graph.load(
+        [
+            _item("me", ["a", "b", "c"]),
+            _item("a", ["x", "y", "me"]),
+            _item("b", ["x", "c"]),
+            _item("c", ["x", "y", "z"]),
+            _item("x", ["me"]),
+        ]
+    )
+    assert graph.stats()["edges"] == 12
+    fof = graph.friends_of_friends("me")
+    # c is a direct connection and me is me: neither is recommended
+    assert fof == [("x", 3, ["a", "b", "c"]), ("y", 2, ["a", "c"]), ("z", 1, ["c"])]
+    assert graph.friends_of_friends("me", limit=1, via_sample=1) == [("x", 3, ["a"])]
+    assert graph.friends_of_friends("nobody") == []
+
+    assert graph.add_edge("me", "z") and not graph.add_edge("me", "z")
+    assert [c for c, _n, _v in graph.friends_of_friends("me")] == ["x", "y"]
+
+
+def _now(seconds: float = 0.0) -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+def test_refresh_applies_changed_connections():
+    store = create_profile_storage("memory")
+    store.put_many([_item("me", ["a"]), _item("a", [])])
+    graph = SocialGraph()
+    graph.load(store.scan_all())
+    assert graph.friends_of_friends("me") == []
+
+    store.put(_item("a", ["b"], updated_at=_now()))
+    assert graph.refresh(store, max_age=0) == 1
+    assert graph.friends_of_friends("me") == [("b", 1, ["a"])]
+
+    # Connections replaced, not appended
+    store.put(_item("a", ["c"], updated_at=_now()))
+    graph.refresh(store, max_age=0)
+    assert graph.connections("a") == ["c"] and graph.stats()["edges"] == 2
+
+
+def test_refresh_window_catches_late_writes():
+    store = create_profile_storage("memory")
+    store.put(_item("me", ["a"]))
+    graph = SocialGraph()
+    graph.load(store.scan_all())
+    asked = []
+    changed_since = store.changed_since
+    store.changed_since = lambda since: asked.append(since) or changed_since(since)
+
+    store.put(_item("x", ["y"], updated_at=_now()))
+    # Committed after x but stamped a little earlier (another container)
+    store.put(_item("a", ["z"], updated_at=_now(-2)))
+    graph.refresh(store, max_age=0)
+    assert graph.connections("a") == ["z"] and graph.connections("x") == ["y"]
+    # The window starts at load time, not at the stored items' 2026-01-01
+    assert asked[0] > "2026-01-02"
+
+    # Concurrent callers don't both refresh
+    started, release = threading.Event(), threading.Event()
+
+    def slow_changed_since(since):
+        started.set()
+        release.wait(5)
+        return []
+
+    store.changed_since = slow_changed_since
+    worker = threading.Thread(target=graph.refresh, args=(store, 0))
+    worker.start()
+    assert started.wait(5)
+    assert graph.refresh(store, max_age=0) == 0
+    release.set()
+    worker.join()
+    assert not graph.refresh_due(max_age=60)
+
+
+def main():
+    test_friends_of_friends_counts_paths()
+    test_refresh_applies_changed_connections()
+    test_refresh_window_catches_late_writes()
+    print("✅ Social graph tests passed.")
+
+
+if __name__ == "__main__":
+    main()
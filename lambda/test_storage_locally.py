@@ -0,0 +1,160 @@
+"""
+Local contract test for storage.py: the same checks against every local engine.
+
+Run this from inside the 'lambda' folder with:
+    python test_storage_locally.py
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from local_table import LocalResource, LocalTable
+from storage import UPDATED_INDEX, DynamoProfileStorage, SQLiteProfileStorage, create_profile_storage
+
+
+def _engines():
+    tmp = tempfile.mkdtemp()
+    table = LocalTable()
+    return [
+        DynamoProfileStorage(LocalTable()),
+        DynamoProfileStorage(table, resource=LocalResource(table)),
+        create_profile_storage("memory"),
+        SQLiteProfileStorage(os.path.join(tmp, "profiles.sqlite3")),
+    ]
+
+
+def _item(i: int) -> dict:
+    return {
+        "user_id": f"user_{i:03d}",
+        "updated_at": f"2026-01-01T00:00:{i % 60:02d}+00:00",
+        "profile": {"sample": {"top_artists": [f"Artist {i}"]}},
+        "connections": [],
+    }
+
+
+def check_engine(store) -> None:
+    store.put_many([_item(i) for i in range(50)])
+    store.put(_item(50))
+
+    assert store.get("user_007")["profile"]["sample"]["top_artists"] == ["Artist 7"]
+    assert store.get("nobody") is None
+
+    got = store.batch_get(["user_001", "user_002", "nobody", "user_001"])
+    assert sorted(got) == ["user_001", "user_002"]
+
+    # Paginated scan sees every item exactly once
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.scan_page(cursor, limit=7)
+        seen += [it["user_id"] for it in page]
+        if cursor is None:
+            break
+    assert sorted(seen) == [f"user_{i:03d}" for i in range(51)]
+
+    # Conditional update
+    assert store.update("user_003", {"connections": ["user_004"]}, expected={"updated_at": _item(3)["updated_at"]})
+    assert not store.update("user_003", {"connections": []}, expected={"updated_at": "stale"})
+    assert not store.update("user_003", {"bio": "x"}, expected={"connections": None})
+    assert store.update("user_003", {"bio": "hi"}, expected={"bio": None})
+    assert store.get("user_003")["connections"] == ["user_004"]
+    assert store.get("user_003")["bio"] == "hi"
+
+    # changed_since: strictly newer, oldest first
+    changed = store.changed_since("2026-01-01T00:00:47+00:00")
+    assert [it["user_id"] for it in changed] == ["user_048", "user_049", "user_050"]
+
+
+def test_memory_and_sqlite_engines():
+    for store in _engines():
+        check_engine(store)
+
+
+def test_changed_since_uses_updated_index():
+    store = create_profile_storage("memory")
+    now = datetime.now(timezone.utc)
+    stamps = [(now - timedelta(days=3, minutes=-i)).isoformat() for i in range(4)]
+    stamps += [(now - timedelta(minutes=10 - i)).isoformat() for i in range(4)]
+    store.put_many([{"user_id": f"u{i}", "updated_at": t} for i, t in enumerate(stamps)])
+
+    # Moves u0 from 3 days ago to now; u7's non-time update keeps its place
+    store.update("u0", {"updated_at": now.isoformat()})
+    store.update("u7", {"bio": "hi"})
+    assert store.get("u0")["updated_day"] == now.date().isoformat()
+
+    scans = store.table.calls["scan"]
+    since = (now - timedelta(days=3)).isoformat()
+    assert [it["user_id"] for it in store.changed_since(since)] == ["u1", "u2", "u3", "u4", "u5", "u6", "u7", "u0"]
+    assert [it["user_id"] for it in store.changed_since(stamps[5])] == ["u6", "u7", "u0"]
+    assert [it["user_id"] for it in store.changed_since(since, limit=2)] == ["u1", "u2"]
+    assert store.table.calls["scan"] == scans and store.table.calls["query"] > 0
+    assert store.table.indexes == {UPDATED_INDEX: ("updated_day", "updated_at")}
+
+    # Too far back for per-day queries: scans instead
+    assert len(store.changed_since("2020-01-01T00:00:00+00:00")) == 8
+    assert store.table.calls["scan"] > scans
+
+
+def test_backfill_updated_day():
+    store = create_profile_storage("memory")
+    now = datetime.now(timezone.utc).isoformat()
+    # Written straight to the table before the index existed
+    for i in range(3):
+        store.table.put_item(Item={"user_id": f"old{i}", "updated_at": now, "bio": f"bio {i}"})
+    store.put({"user_id": "new", "updated_at": now})
+    since = now[:10]
+    assert [it["user_id"] for it in store.changed_since(since)] == ["new"]
+
+    assert store.backfill_updated_day() == 3
+    assert store.get("old1") == {"user_id": "old1", "updated_at": now, "bio": "bio 1", "updated_day": now[:10]}
+    assert len(store.changed_since(since)) == 4
+    assert store.backfill_updated_day() == 0
+
+
+class _ThrottledResource:
+    """Leaves every key but the first unprocessed, `throttled` times in a row."""
+
+    def __init__(self, table, throttled: int):
+        self.inner = LocalResource(table)
+        self.throttled = throttled
+
+    def batch_get_item(self, RequestItems):
+        if self.throttled <= 0:
+            return self.inner.batch_get_item(RequestItems=RequestItems)
+        self.throttled -= 1
+        (name, request), = RequestItems.items()
+        resp = self.inner.batch_get_item(RequestItems={name: {"Keys": request["Keys"][:1]}})
+        resp["UnprocessedKeys"] = {name: {"Keys": request["Keys"][1:]}} if len(request["Keys"]) > 1 else {}
+        return resp
+
+
+def test_batch_get_backs_off_on_unprocessed_keys():
+    table = LocalTable()
+    for i in range(5):
+        table.put_item(Item={"user_id": f"u{i}"})
+    slept = []
+
+    store = DynamoProfileStorage(table, resource=_ThrottledResource(table, 3), sleep=slept.append)
+    assert sorted(store.batch_get([f"u{i}" for i in range(5)])) == ["u0", "u1", "u2", "u3", "u4"]
+    assert slept == [0.05, 0.1, 0.2]
+
+    store = DynamoProfileStorage(table, resource=_ThrottledResource(table, 100), sleep=slept.append)
+    try:
+        store.batch_get([f"u{i}" for i in range(5)] * 2 + [f"x{i}" for i in range(10)])
+        raise AssertionError("expected RuntimeError")
+    except RuntimeError:
+        pass
+
+
+def main():
+    for store in _engines():
+        check_engine(store)
+        print(f"{store.name}: ok")
+    test_changed_since_uses_updated_index()
+    test_backfill_updated_day()
+    test_batch_get_backs_off_on_unprocessed_keys()
+    print("\n✅ Storage contract tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Local tests for taste_clusters: k-means on synthetic profiles, the saved
+file round-trip, and probing for users the build hasn't seen.
+
+Run this from inside the 'lambda' folder with:
+    python test_taste_clusters_locally.py
+"""
+
+import os
+import tempfile
+
+from matching import MatchFeatures
+from synthetic_profiles import generate_items
+from taste_clusters import TasteClusters, _users_from_items, build_taste_clusters, evaluate_recall, taste_vector
+
+
+def test_build_balance_and_round_trip():
+    users = _users_from_items(generate_items(800, seed=5))
+    clusters, stats = build_taste_clusters(users, k=8, iterations=6, seed=1)
+
+    balance = stats["balance"]
+    assert balance["clusters"] == 8 and balance["empty"] == 0
+    assert balance["users"] == stats["users"] == sum(1 for _u, f in users if f.artists or f.genres)
+    assert stats["iterations"] >= 1 and stats["seconds"] >= 0
+
+    user_id, features = next((u, f) for u, f in users if f.artists)
+    stored = clusters.assignments[user_id]
+    assert len(stored) == 4 and [d for _c, d in stored] == sorted(d for _c, d in stored)
+    assert clusters.nearest(taste_vector(features), 4) == stored
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clusters.json")
+        clusters.save(path)
+        loaded = TasteClusters.load(path)
+    assert loaded.assignments == clusters.assignments
+    assert [len(m) for m in loaded.members] == [len(m) for m in clusters.members]
+
+    rows = evaluate_recall(clusters, users, queries=10, probes=[1, 8])
+    assert rows[-1]["recall_at_k"] == 1.0 and rows[-1]["scored_share"] == 1.0
+    assert rows[0]["scored_share"] < 1.0
+
+
+def test_probing_and_unassigned_users():
+    clusters = TasteClusters(
+        [{"a:sza": 0.8, "g:r&b": 0.6}, {"g:metal": 1.0}],
+        {"u1": [(0, 0.1), (1, 1.0)], "u2": [(1, 0.0), (0, 1.0)]},
+    )
+    # Not in the file: nearest centroid from the features
+    newcomer = MatchFeatures(frozenset({"metallica"}), frozenset({"metal"}), frozenset())
+    assert clusters.probe_clusters("new", newcomer, 1) == {1}
+    assert clusters.probe_clusters("u1", newcomer, 1) == {0}
+
+    allowed = clusters.allowed({0})
+    assert allowed("u1") and not allowed("u2") and allowed("new")
+    assert allowed.count == 1
+    assert taste_vector(MatchFeatures(frozenset(), frozenset(), frozenset({"t"}))) == {}
+
+
+def main():
+    test_build_balance_and_round_trip()
+    test_probing_and_unassigned_users()
+    print("✅ Taste cluster tests passed.")
+
+
+if __name__ == "__main__":
+    main()
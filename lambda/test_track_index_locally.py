@@ -0,0 +1,81 @@
+"""
+Local test for track_index.py + canonical tracks in matching.py.
+
+Run this from inside the 'lambda' folder with:
+    python test_track_index_locally.py
+"""
+
+import json
+import os
+import tempfile
+
+import matching
+from matching import _norm, compute_match_score
+from track_index import TrackIndex, load_canonical_map
+
+TRACKS = [
+    "Sugar Talking – Sabrina Carpenter",
+    "Sugar Talking (Remastered 2011) – Sabrina Carpenter",
+    "Sugar Talking - Live at Wembley - Sabrina Carpenter",
+    "Sugar Talking (feat. Guest) – Sabrina Carpenter",
+    "Sugar Talknig – Sabrina Carpenter",  # typo
+    "Sugar Talking – BLACKPINK",  # same title, different artist
+    "Sugar – Sabrina Carpenter",  # different song
+]
+
+
+def test_clusters_variants_not_different_songs():
+    index = TrackIndex()
+    ids = [index.add(_norm(t)) for t in TRACKS]
+    assert len(set(ids[:5])) == 1
+    assert ids[5] != ids[0]
+    assert ids[6] != ids[0]
+
+    # Incremental: reload and keep adding
+    path = os.path.join(tempfile.mkdtemp(), "tracks.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(), f)
+    with open(path, "r", encoding="utf-8") as f:
+        reloaded = TrackIndex.from_json(json.load(f))
+    assert reloaded.add(_norm("SUGAR TALKING [Radio Edit] – Sabrina Carpenter")) == ids[0]
+    assert load_canonical_map(path)[_norm(TRACKS[1])] == _norm(TRACKS[0])
+
+
+def test_only_version_and_featuring_brackets_are_stripped():
+    index = TrackIndex()
+    part1, part2 = (index.add(_norm(t)) for t in ("Hope (Part 1) - X", "Hope (Part 2) - X"))
+    assert part1 != part2
+    assert index.add(_norm("Hope Part 2 - X")) == part2
+
+    intro, interlude = (index.add(_norm(t)) for t in ("Intro - BTS", "Intro (Interlude) - BTS"))
+    assert intro != interlude
+
+    assert index.add(_norm("Intro [with Halsey] - BTS")) == intro
+    assert index.add(_norm("Intro (2011 Remaster) - BTS")) == intro
+
+
+def test_canonical_tracks_in_matching():
+    a = {"sample": {"top_tracks": [TRACKS[1]]}}
+    b = {"sample": {"top_tracks": [TRACKS[0]]}}
+
+    matching.set_track_canonical(None)
+    assert compute_match_score(a, b)["shared_tracks"] == []
+
+    index = TrackIndex()
+    index.add_all(_norm(t) for t in TRACKS)
+    matching.set_track_canonical(index.canonical_map())
+    try:
+        assert compute_match_score(a, b)["shared_tracks"] == ["sugar talking - sabrina carpenter"]
+    finally:
+        matching.set_track_canonical(None)
+
+
+def main():
+    test_clusters_variants_not_different_songs()
+    test_only_version_and_featuring_brackets_are_stripped()
+    test_canonical_tracks_in_matching()
+    print("✅ Track index tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+track_index.py
+
+Trigram index that clusters near-duplicate track strings, e.g.
+  "Song (Remastered 2011) - Artist"  ~  "Song - Artist"
+  "Song - Live at Wembley - Artist"  ~  "Song - Artist"
+  "Song (feat. X) - Artist"          ~  "Song - Artist"
+
+Comparing every track with every other (edit distance) is quadratic, so:
+  1. each _norm'd track gets a match key: version/remaster/live/feat
+     decorations stripped, punctuation dropped
+  2. identical keys join the same cluster (dict lookup)
+  3. otherwise candidate clusters come from a trigram inverted index,
+     blocked by artist (same title by a different artist never merges):
+     the few with the best Dice similarity (>= threshold) are verified with
+     a bounded edit distance (typos, not different songs: "sugar" !~ "sugar sun")
+  4. no verified candidate -> new cluster
+
+Tracks are added incrementally; the result is a plain dict
+{normalized track -> canonical track} that matching._extract_tracks uses
+(TRACK_CANONICAL_PATH) with one dict lookup per track at match time.
+
+Run this from inside the 'lambda' folder with:
+    python track_index.py --out track_canonical.json                    # full build from PROFILE_STORE
+    python track_index.py --out track_canonical.json --update            # only profiles changed since last build
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from matching import _extract_tracks
+
+FORMAT_VERSION = 1
+
+# "(remastered 2011)", "[live]", "- 2011 remaster -", "(radio edit)" ...
+_VERSION_WORDS = (
+    r"remaster(?:ed)?|live|radio edit|edit|mono|stereo|version|mix|remix|demo|acoustic|deluxe|"
+    r"bonus track|explicit|single|anniversary|edition"
+)
+_BRACKETS_RE = re.compile(r"\s*[\(\[]([^\)\]]*)[\)\]]")
+_VERSION_SEGMENT_RE = re.compile(rf"^(?:\d{{4}}\s+)?(?:[\w' ]*\s)?(?:{_VERSION_WORDS})\b.*$")
+# "(feat. x)", "[ft x]", "(with x)"
+_FEATURING_RE = re.compile(r"^(?:feat|ft|featuring|with)\b")
+_DIGITS_RE = re.compile(r"\d+")
+_FEAT_RE = re.compile(r"\s+feat\s.*$")
+_PUNCT_RE = re.compile(r"[^\w ]+")
+
+
+def split_track(track: str) -> Tuple[str, str]:
+    """_norm'd "title - artist" -> (title, artist). Artist is "" if absent."""
+    head, sep, tail = track.rpartition(" - ")
+    if not sep:
+        return track, ""
+    return head, tail
+
+
+def _strip_tag(m: "re.Match[str]") -> str:
+    # Only version / featuring tags: "(part 2)" or "(interlude)" is another song
+    inner = m.group(1).strip()
+    if _VERSION_SEGMENT_RE.match(inner) or _FEATURING_RE.match(inner):
+        return ""
+    return m.group(0)
+
+
+def match_key(track: str) -> Tuple[str, str]:
+    """(artist, title key) used for clustering a _norm'd track string."""
+    title, artist = split_track(track)
+
+    # "song - 2011 remaster" -> "song"
+    parts = title.split(" - ")
+    while len(parts) > 1 and _VERSION_SEGMENT_RE.match(parts[-1]):
+        parts.pop()
+    title = " - ".join(parts)
+
+    title = _BRACKETS_RE.sub(_strip_tag, title)
+    title = _FEAT_RE.sub("", title)
+    title = " ".join(_PUNCT_RE.sub(" ", title).split())
+    artist = " ".join(_PUNCT_RE.sub(" ", _FEAT_RE.sub("", artist)).split())
+    return artist, title or track
+
+
+def trigrams(s: str) -> Set[str]:
+    padded = f"  {s} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(title: str) -> int:
+    """Typos tolerated for a title key of this length."""
+    return 1 if len(title) <= 12 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent swaps),
+    giving up with limit + 1 as soon as it must exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = v
+            row_min = min(row_min, v)
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class TrackIndex:
+    def __init__(self, threshold: float = 0.5, max_postings: int = 500, verify_top: int = 5):
+        self.threshold = threshold
+        self.verify_top = verify_top
+        # Trigrams shared by more clusters than this are skipped for candidate
+        # generation (they're in every title and don't discriminate)
+        self.max_postings = max_postings
+
+        self.canonical: Dict[str, int] = {}  # normalized track -> cluster id
+        self.clusters: List[str] = []  # cluster id -> canonical (first seen) track
+        self._keys: Dict[Tuple[str, str], int] = {}  # (artist, title key) -> cluster id
+        self._titles: List[str] = []  # cluster id -> title key
+        self._grams: List[Set[str]] = []  # cluster id -> trigrams of its title key
+        self._postings: Dict[Tuple[str, str], List[int]] = {}  # (artist, trigram) -> cluster ids
+        self.stats: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.canonical)
+
+    def add(self, track: str) -> int:
+        """Cluster id for a _norm'd track, creating a cluster if needed."""
+        cid = self.canonical.get(track)
+        if cid is not None:
+            self.stats["seen"] += 1
+            return cid
+
+        key = match_key(track)
+        cid = self._keys.get(key)
+        if cid is not None:
+            self.stats["key_hits"] += 1
+        else:
+            artist, title = key
+            grams = trigrams(title)
+            cid = self._best_candidate(artist, title, grams)
+            if cid is not None:
+                self.stats["trigram_hits"] += 1
+            else:
+                cid = self._new_cluster(track, artist, title, grams)
+                self.stats["new_clusters"] += 1
+            self._keys[key] = cid
+
+        self.canonical[track] = cid
+        return cid
+
+    def _new_cluster(self, track: str, artist: str, title: str, grams: Set[str]) -> int:
+        cid = len(self.clusters)
+        self.clusters.append(track)
+        self._titles.append(title)
+        self._grams.append(grams)
+        for g in grams:
+            self._postings.setdefault((artist, g), []).append(cid)
+        return cid
+
+    def _best_candidate(self, artist: str, title: str, grams: Set[str]) -> Optional[int]:
+        shared: Counter = Counter()
+        for g in grams:
+            posting = self._postings.get((artist, g))
+            if posting and len(posting) <= self.max_postings:
+                shared.update(posting)
+
+        n = len(grams)
+        scored = []
+        for cid, k in shared.items():
+            # Dice upper bound is 2k / (n + k); skip if it can't pass
+            if 2.0 * k / (n + k) < self.threshold:
+                continue
+            score = 2.0 * k / (n + len(self._grams[cid]))
+            if score >= self.threshold:
+                scored.append((score, cid))
+        scored.sort(reverse=True)
+
+        limit = max_edits(title)
+        numbers = _DIGITS_RE.findall(title)
+        for _score, cid in scored[: self.verify_top]:
+            self.stats["verified"] += 1
+            # "hope part 1" / "hope part 2" are one edit apart, but not a typo
+            if _DIGITS_RE.findall(self._titles[cid]) != numbers:
+                continue
+            if edit_distance(title, self._titles[cid], limit) <= limit:
+                return cid
+        return None
+
+    def add_all(self, tracks: Iterable[str]) -> None:
+        for t in tracks:
+            self.add(t)
+
+    def canonical_map(self) -> Dict[str, str]:
+        """{track -> canonical track}, only for tracks that aren't their own canonical."""
+        clusters = self.clusters
+        return {t: clusters[cid] for t, cid in self.canonical.items() if clusters[cid] != t}
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def to_json(self, built_through: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "threshold": self.threshold,
+            "built_through": built_through,
+            "clusters": self.clusters,
+            "tracks": {t: cid for t, cid in self.canonical.items()},
+            # What matching.py loads: only the tracks that get rewritten
+            "canonical": self.canonical_map(),
+        }
+
+    @classmethod
+    def from_json(cls, doc: Dict[str, Any]) -> "TrackIndex":
+        if doc.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported track index version: {doc.get('version')}")
+        index = cls(threshold=float(doc.get("threshold", 0.5)))
+        # Replay clusters first so ids are stable, then the members
+        for rep in doc["clusters"]:
+            artist, title = match_key(rep)
+            cid = index._new_cluster(rep, artist, title, trigrams(title))
+            index._keys[(artist, title)] = cid
+        for t, cid in doc["tracks"].items():
+            index.canonical[t] = int(cid)
+            index._keys.setdefault(match_key(t), int(cid))
+        return index
+
+
+def load_canonical_map(path: str) -> Dict[str, str]:
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported track index version: {doc.get('version')}")
+    return dict(doc.get("canonical") or {})
+
+
+def _item_tracks(item: Dict[str, Any]) -> Set[str]:
+    # _extract_tracks canonicalizes when a map is loaded; the index needs raw tracks
+    profile = item.get("profile") or {}
+    return _extract_tracks(profile, canonical=False) if isinstance(profile, dict) else set()
+
+
+def main():
+    from storage import create_profile_storage
+
+    parser = argparse.ArgumentParser(description="Build/update the canonical track map.")
+    parser.add_argument("--out", default="track_canonical.json")
+    parser.add_argument("--update", action="store_true", help="add profiles changed since the last build in --out")
+    parser.add_argument("--threshold", type=float, default=0.5, help="min trigram Dice for a candidate")
+    args = parser.parse_args()
+
+    store = create_profile_storage()
+    started = time.perf_counter()
+
+    since = None
+    if args.update and os.path.exists(args.out):
+        with open(args.out, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        index = TrackIndex.from_json(doc)
+        since = doc.get("built_through")
+    else:
+        index = TrackIndex(threshold=args.threshold)
+
+    built_through = since
+    items = store.changed_since(since) if since else store.scan_all()
+    n_items = 0
+    for item in items:
+        n_items += 1
+        index.add_all(sorted(_item_tracks(item)))
+        updated_at = item.get("updated_at")
+        if isinstance(updated_at, str) and (built_through is None or updated_at > built_through):
+            built_through = updated_at
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(built_through), f, separators=(",", ":"), ensure_ascii=False)
+
+    print(
+        json.dumps(
+            {
+                "profiles": n_items,
+                "tracks": len(index),
+                "clusters": len(index.clusters),
+                "rewritten": len(index.canonical_map()),
+                "built_through": built_through,
+                "seconds": round(time.perf_counter() - started, 3),
+                "out": args.out,
+                **dict(index.stats),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()